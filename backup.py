@@ -0,0 +1,287 @@
+import argparse
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List
+
+import config
+from db import Database
+from exceptions import ServiceError
+from logs import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def unpacked(path: Path) -> Iterator[Path]:
+    """
+    Путь к несжатой копии резервной копии
+
+    Для .gz-файлов копия распаковывается во временный файл,
+    который удаляется после выхода из контекста
+
+    :param path: Путь к резервной копии
+    :type path: Path
+    :returns: Путь к файлу базы данных
+    :type: Iterator[Path]
+    """
+
+    if path.suffix != ".gz":
+        yield path
+        return
+    fd, tmp = tempfile.mkstemp(suffix=".sql")
+    try:
+        with os.fdopen(fd, "wb") as out, gzip.open(path, "rb") as src:
+            shutil.copyfileobj(src, out)
+        yield Path(tmp)
+    finally:
+        os.remove(tmp)
+
+
+def verify_backup(path: str) -> int:
+    """
+    Проверка целостности резервной копии
+
+    :param path: Путь к резервной копии (.sql или .sql.gz)
+    :type path: str
+    :returns: Количество привычек в резервной копии
+    :type: int
+    :raises ServiceError: Если копия повреждена или не содержит данных бота
+    """
+
+    try:
+        with unpacked(Path(path)) as file:
+            conn = sqlite3.connect(
+                f"{file.resolve().as_uri()}?mode=ro", uri=True
+            )
+            try:
+                result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+                if result != "ok":
+                    raise ServiceError(
+                        f"Backup integrity check failed: {result}"
+                    )
+                return conn.execute("SELECT COUNT(*) FROM habits").fetchone()[
+                    0
+                ]
+            finally:
+                conn.close()
+    except ServiceError:
+        raise
+    except Exception as e:
+        raise ServiceError(f"Backup verify error: {e}")
+
+
+def restore_backup(path: str, db_path: str) -> int:
+    """
+    Восстановление базы данных из резервной копии
+
+    Копия предварительно проверяется. Бот на время восстановления
+    должен быть остановлен
+
+    :param path: Путь к резервной копии (.sql или .sql.gz)
+    :type path: str
+    :param db_path: Путь к восстанавливаемой базе данных
+    :type db_path: str
+    :returns: Количество привычек в восстановленной базе
+    :type: int
+    :raises ServiceError: Если копия повреждена или восстановление не удалось
+    """
+
+    habits = verify_backup(path)
+    try:
+        with unpacked(Path(path)) as file:
+            src = sqlite3.connect(file)
+            dst = sqlite3.connect(db_path)
+            try:
+                src.backup(dst)
+                dst.execute("PRAGMA journal_mode = WAL")
+            finally:
+                src.close()
+                dst.close()
+    except Exception as e:
+        raise ServiceError(f"Backup restore error: {e}")
+    logger.info("Database %s restored from %s", db_path, path)
+    return habits
+
+
+class BackupManager:
+    """
+    Онлайн-резервное копирование базы данных с ротацией копий
+
+    Копия снимается через SQLite backup API небольшими порциями страниц,
+    между порциями запись в базу не блокируется
+
+    :ivar db: База данных бота
+    :type db: Database
+    :ivar directory: Каталог резервных копий
+    :type directory: Path
+    :ivar keep: Количество хранимых копий
+    :type keep: int
+    :ivar compress: Сжимать копии gzip
+    :type compress: bool
+    :ivar pages: Количество страниц за один шаг копирования
+    :type pages: int
+    :ivar pause: Пауза между шагами в секундах
+    :type pause: float
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        directory: str = config.backup_dir,
+        keep: int = config.backup_keep,
+        compress: bool = config.backup_compress,
+        pages: int = config.backup_pages,
+        pause: float = config.backup_pause,
+    ):
+        self.db = db
+        self.directory = Path(directory)
+        self.keep = keep
+        self.compress = compress
+        self.pages = pages
+        self.pause = pause
+        self.prefix = Path(db.db).stem + "-"
+
+    def backups(self) -> List[Path]:
+        """
+        Список готовых резервных копий от старых к новым
+
+        :returns: Пути к резервным копиям
+        :type: List[Path]
+        """
+
+        if not self.directory.exists():
+            return []
+        return sorted(
+            path
+            for path in self.directory.iterdir()
+            if path.name.startswith(self.prefix)
+            and path.name.endswith((".sql", ".sql.gz"))
+        )
+
+    def backup(self) -> Path:
+        """
+        Создание резервной копии
+
+        :returns: Путь к созданной копии
+        :type: Path
+        :raises ServiceError: Если произошла ошибка при копировании
+            или удалении старых копий
+        """
+
+        start = time.perf_counter()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{self.prefix}{datetime.now():%Y%m%d-%H%M%S-%f}.sql"
+        part = self.directory / (name + ".part")
+        try:
+            target = sqlite3.connect(part)
+            try:
+                # fsync копии выполняется после копирования, а не на
+                # последнем шаге, пока удерживается блокировка записи
+                target.execute("PRAGMA journal_mode = OFF")
+                target.execute("PRAGMA synchronous = OFF")
+                self.db.backup(target, self.pages, self.pause)
+                # копия - самостоятельный файл без -wal и -shm
+                target.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                target.close()
+            with open(part, "rb+") as file:
+                os.fsync(file.fileno())
+
+            if self.compress:
+                path = self.directory / (name + ".gz")
+                with open(part, "rb") as src, gzip.open(path, "wb") as out:
+                    shutil.copyfileobj(src, out)
+                part.unlink()
+            else:
+                path = self.directory / name
+                part.rename(path)
+        except Exception as e:
+            part.unlink(missing_ok=True)
+            logger.error("Backup error: %s", e)
+            raise ServiceError(f"Backup error: {e}")
+
+        try:
+            self.rotate()
+        except Exception as e:
+            logger.error("Backup rotation error: %s", e)
+            raise ServiceError(f"Backup rotation error: {e}")
+        logger.info(
+            "Backup %s created in %.1f s", path, time.perf_counter() - start
+        )
+        return path
+
+    def rotate(self) -> None:
+        """
+        Удаление старых копий сверх self.keep
+        """
+
+        backups = self.backups()
+        for path in backups[: max(len(backups) - self.keep, 0)]:
+            path.unlink()
+            logger.info("Backup %s removed by rotation", path)
+
+    async def run_periodically(self, interval: float) -> None:
+        """
+        Периодическое создание копий в фоновом потоке
+
+        :param interval: Интервал между копиями в секундах
+        :type interval: float
+        """
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.backup)
+            except ServiceError as e:
+                logger.error("Periodic backup failed: %s", e)
+            except Exception:
+                logger.exception("Periodic backup error")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Habit tracker DB backups")
+    parser.add_argument("--db", default=config.db_file)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("create", help="create a backup now")
+    commands.add_parser("list", help="list existing backups")
+    verify = commands.add_parser("verify", help="check a backup file")
+    verify.add_argument("file")
+    restore = commands.add_parser(
+        "restore", help="restore --db from a backup (bot must be stopped)"
+    )
+    restore.add_argument("file")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "verify":
+            print(f"{args.file}: ok, {verify_backup(args.file)} habits")
+        elif args.command == "restore":
+            habits = restore_backup(args.file, args.db)
+            print(f"{args.db} restored from {args.file}: {habits} habits")
+        else:
+            manager = BackupManager(Database(args.db))
+            if args.command == "create":
+                print(manager.backup())
+            else:
+                for path in manager.backups():
+                    print(path)
+    except ServiceError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    setup_logging(
+        config.log_level, config.log_levels, config.log_format, config.log_json
+    )
+    main()
@@ -0,0 +1,118 @@
+"""
+Влияние онлайн-резервного копирования на задержку записи
+
+База дополняется таблицей-балластом до нужного размера, затем поток
+записи добавляет привычки с фиксированной частотой: сначала без копирования,
+затем во время BackupManager.backup()
+
+    python benchmarks/backup_bench.py [--size-mb 2048] [--pages 256] [--pause 0.005]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+from backup import BackupManager
+from db import Database
+
+
+def fill(db: Database, size_mb: int) -> None:
+    with db.writer() as conn:
+        conn.execute("CREATE TABLE ballast (data BLOB)")
+        rows = size_mb * 256  # 4 KiB на строку
+        conn.execute(
+            """
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            INSERT INTO ballast SELECT randomblob(4000) FROM n
+            """,
+            (rows,),
+        )
+        conn.commit()
+
+
+def write_latencies(db: Database, stop: threading.Event, rate: float) -> list:
+    latencies, n = [], 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        db.add_habit(1, f"habit {time.time_ns()} {n}")
+        latencies.append((time.perf_counter() - start) * 1000)
+        n += 1
+        time.sleep(1 / rate)
+    return latencies
+
+
+def summary(latencies: list) -> str:
+    latencies = sorted(latencies)
+    return (
+        f"n={len(latencies):<6} p50={statistics.median(latencies):7.3f} ms  "
+        f"p99={latencies[int(len(latencies) * 0.99)]:7.3f} ms  "
+        f"max={latencies[-1]:7.3f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--pages", type=int, default=256)
+    parser.add_argument("--pause", type=float, default=0.005)
+    parser.add_argument("--rate", type=float, default=200, help="writes/s")
+    parser.add_argument("--baseline-seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "habits.sql"))
+        start = time.perf_counter()
+        fill(db, args.size_mb)
+        size = os.path.getsize(db.db) / 2**20
+        print(
+            f"db: {size:.0f} MiB, filled in {time.perf_counter() - start:.1f} s"
+        )
+
+        stop = threading.Event()
+        result = {}
+        writer = threading.Thread(
+            target=lambda: result.update(
+                l=write_latencies(db, stop, args.rate)
+            )
+        )
+        writer.start()
+        time.sleep(args.baseline_seconds)
+        stop.set()
+        writer.join()
+        print(f"no backup:     {summary(result['l'])}")
+
+        stop.clear()
+        writer = threading.Thread(
+            target=lambda: result.update(
+                l=write_latencies(db, stop, args.rate)
+            )
+        )
+        manager = BackupManager(
+            db,
+            os.path.join(tmp, "backups"),
+            compress=False,
+            pages=args.pages,
+            pause=args.pause,
+        )
+        writer.start()
+        start = time.perf_counter()
+        manager.backup()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        writer.join()
+        print(f"during backup: {summary(result['l'])}")
+        print(
+            f"backup: {elapsed:.1f} s, pages/step={args.pages}, pause={args.pause} s"
+        )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Пропускная способность чтения во время всплесков записи
+
+Сравниваются разделение чтения/записи (пул read-only соединений, WAL)
+и исходная схема: новое соединение на каждый вызов и rollback journal
+
+    python benchmarks/concurrency_bench.py [--readers 8] [--seconds 3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+from db import Database
+
+USERS = 1000
+HABITS_PER_USER = 10
+
+
+class ConnectionPerCallDatabase(Database):
+    """
+    Исходная схема: соединение на каждый вызов, без WAL и блокировок
+    """
+
+    def migrations_up(self) -> None:
+        super().migrations_up()
+        conn = self.connect()
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+
+    @contextmanager
+    def writer(self):
+        conn = self.connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def reader(self):
+        conn = self.connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def fill(db: Database) -> None:
+    with db.writer() as conn:
+        conn.executemany(
+            "INSERT INTO habits (user_id, name) VALUES (?, ?)",
+            (
+                (uid, f"habit {n}")
+                for uid in range(USERS)
+                for n in range(HABITS_PER_USER)
+            ),
+        )
+        conn.commit()
+
+
+def run(db: Database, readers: int, seconds: float, writes: bool) -> dict:
+    stop = threading.Event()
+    stats = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def read_loop() -> None:
+        reads = errors = 0
+        while not stop.is_set():
+            try:
+                db.get_user_habits(random.randrange(USERS))
+                reads += 1
+            except Exception:
+                errors += 1
+        with lock:
+            stats["reads"] += reads
+            stats["errors"] += errors
+
+    def write_loop() -> None:
+        writes = errors = 0
+        while not stop.is_set():
+            # всплеск записи: пачка добавлений подряд, затем пауза
+            for _ in range(50):
+                try:
+                    db.add_habit(
+                        random.randrange(USERS), f"burst {random.random()}"
+                    )
+                    writes += 1
+                except Exception:
+                    errors += 1
+            time.sleep(0.05)
+        with lock:
+            stats["writes"] += writes
+            stats["errors"] += errors
+
+    threads = [threading.Thread(target=read_loop) for _ in range(readers)]
+    if writes:
+        threads.append(threading.Thread(target=write_loop))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {key: value / seconds for key, value in stats.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    print(f"reader threads: {args.readers}, {args.seconds} s per run")
+    print(f"{'mode':<22}{'reads/s':>10}{'writes/s':>10}{'errors/s':>10}")
+    for label, cls in (
+        ("connection per call", ConnectionPerCallDatabase),
+        ("read/write split", Database),
+    ):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = cls(os.path.join(tmp, "habits.sql"), readers=args.readers)
+            fill(db)
+            for writes in (False, True):
+                res = run(db, args.readers, args.seconds, writes)
+                name = f"{label}{' + writes' if writes else ''}"
+                print(
+                    f"{name:<22}{res['reads']:>10.0f}"
+                    f"{res['writes']:>10.0f}{res['errors']:>10.1f}"
+                )
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Даты выполнений строками YYYY-MM-DD против номеров дней
+
+Создается база в прежнем формате: completions со столбцом id, датами
+строками, уникальным индексом (habit_id, completion_date) и индексом
+по дате. Замеряются размер таблицы и индексов (dbstat), выборка
+диапазона дат, история одной привычки и группировка в серии. Затем
+база открывается через Database, миграция переводит даты в номера дней,
+и те же замеры повторяются
+
+    python benchmarks/day_numbers_bench.py [--habits 20000] [--days 365]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+from db import SQL_DAY, Database
+
+START = date(2025, 1, 1)
+
+
+def make_legacy(path: str, habits: int, days: int) -> int:
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        PRAGMA journal_mode = WAL;
+        CREATE TABLE habits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_completed DATE,
+            current_streak INTEGER DEFAULT 0,
+            total_completions INTEGER DEFAULT 0,
+            UNIQUE(user_id, name)
+        );
+        CREATE TABLE completions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            habit_id INTEGER NOT NULL,
+            completion_date DATE NOT NULL,
+            FOREIGN KEY (habit_id) REFERENCES habits (id) ON DELETE CASCADE,
+            UNIQUE(habit_id, completion_date)
+        );
+        CREATE INDEX idx_completions_date ON completions (completion_date);
+        """)
+    conn.executemany(
+        "INSERT INTO habits (user_id, name) VALUES (?, ?)",
+        ((i // 10, f"habit {i}") for i in range(habits)),
+    )
+    # ~80% дней с выполнением, вставка по дням, как в работающем боте
+    conn.execute(
+        """
+        WITH RECURSIVE d(i) AS (
+            SELECT 0 UNION ALL SELECT i + 1 FROM d WHERE i < ? - 1
+        )
+        INSERT INTO completions (habit_id, completion_date)
+        SELECT h.id, date(?, '+' || d.i || ' days')
+        FROM d, habits h
+        WHERE (h.id * 7 + d.i * 13) % 5 != 0
+        ORDER BY d.i, h.id
+        """,
+        (days, START.isoformat()),
+    )
+    conn.execute("""
+        UPDATE habits SET last_completed = (
+            SELECT MAX(completion_date) FROM completions
+            WHERE habit_id = habits.id
+        )
+        """)
+    conn.commit()
+    rows = conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+    conn.close()
+    return rows
+
+
+def sizes(conn: sqlite3.Connection) -> dict:
+    """
+    Размер в КиБ таблицы completions и ее индексов
+    """
+
+    return {name: size / 1024 for name, size in conn.execute("""
+            SELECT name, SUM(pgsize) FROM dbstat
+            WHERE name = 'completions' OR name IN (
+                SELECT name FROM sqlite_master
+                WHERE type = 'index' AND tbl_name = 'completions'
+            )
+            GROUP BY name
+            ORDER BY name
+            """)}
+
+
+def measure(func, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def queries(conn: sqlite3.Connection, day, habit_ids) -> dict:
+    """
+    Время запросов в мс, day переводит дату в значение столбца
+    """
+
+    since = day(START + timedelta(days=300))
+
+    def range_scan():
+        conn.execute(
+            """
+            SELECT COUNT(*), COUNT(DISTINCT habit_id) FROM completions
+            WHERE completion_date >= ?
+            """,
+            (since,),
+        ).fetchone()
+
+    def history():
+        for hid in habit_ids:
+            conn.execute(
+                """
+                SELECT completion_date FROM completions
+                WHERE habit_id = ? AND completion_date >= ?
+                ORDER BY completion_date
+                """,
+                (hid, since),
+            ).fetchall()
+
+    # номер дня для оконной функции: разбор строки или сам столбец
+    value = (
+        SQL_DAY.format("completion_date")
+        if isinstance(since, str)
+        else "completion_date"
+    )
+
+    def runs():
+        conn.execute(f"""
+            SELECT COUNT(*) FROM (
+                SELECT habit_id, MIN(d), MAX(d) FROM (
+                    SELECT habit_id, d, d - ROW_NUMBER() OVER (
+                        PARTITION BY habit_id ORDER BY d
+                    ) AS run
+                    FROM (SELECT habit_id, {value} AS d FROM completions)
+                )
+                GROUP BY habit_id, run
+            )
+            """).fetchone()
+
+    return {
+        "range scan, ms": measure(range_scan),
+        f"history x{len(habit_ids)}, ms": measure(history),
+        "streak runs, ms": measure(runs, repeat=2),
+    }
+
+
+def report(conn: sqlite3.Connection, path: str, day, habit_ids) -> dict:
+    result = {f"{name}, KiB": size for name, size in sizes(conn).items()}
+    result["file, KiB"] = os.path.getsize(path) / 1024
+    result.update(queries(conn, day, habit_ids))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--habits", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    habit_ids = random.Random(43).sample(
+        range(1, args.habits + 1), min(200, args.habits)
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "habits.sql")
+        rows = make_legacy(path, args.habits, args.days)
+        print(f"{args.habits} habits, {rows} completions")
+
+        conn = sqlite3.connect(path)
+        conn.execute("VACUUM")
+        before = report(conn, path, date.isoformat, habit_ids)
+        conn.close()
+
+        start = time.perf_counter()
+        Database(path).close()
+        print(f"migration {time.perf_counter() - start:.1f} s")
+
+        conn = sqlite3.connect(path)
+        conn.execute("VACUUM")
+        after = report(conn, path, date.toordinal, habit_ids)
+        conn.close()
+
+    keys = list(dict.fromkeys([*before, *after]))
+    width = max(map(len, keys))
+    print(f"{'':{width}} {'text':>10} {'day number':>11}")
+    for key in keys:
+        old, new = before.get(key), after.get(key)
+        print(
+            f"{key:{width}}"
+            f" {'-' if old is None else f'{old:.1f}':>10}"
+            f" {'-' if new is None else f'{new:.1f}':>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Локальная замена Telegram Bot API для нагрузочных прогонов
+
+Сервер отвечает на getMe, getUpdates и sendMessage, остальные методы
+(deleteWebhook, answerCallbackQuery и т.п.) просто возвращают True.
+Апдейты от виртуальных пользователей кладутся в очередь методом
+push_message, ответы бота доставляются в очередь чата и забираются
+методом wait_reply. Бот подключается к серверу через TG_API_BASE_URL
+"""
+
+import itertools
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, NamedTuple, Optional
+from urllib.parse import parse_qsl
+
+# Верхняя граница ожидания в getUpdates, чтобы бот быстро останавливался
+MAX_POLL_TIMEOUT = 1.0
+
+BOT_USER = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "Habit Tracker",
+    "username": "habit_tracker_test_bot",
+}
+
+
+class Reply(NamedTuple):
+    """
+    Сообщение, отправленное ботом
+
+    :ivar text: Текст сообщения
+    :ivar buttons: Кнопки клавиатуры (reply или inline) построчно
+    :ivar received: Время получения сервером (time.perf_counter())
+    """
+
+    text: str
+    buttons: List[str]
+    received: float
+
+
+def _buttons(markup: Any) -> List[str]:
+    if isinstance(markup, str):
+        markup = json.loads(markup)
+    if not markup:
+        return []
+    rows = markup.get("keyboard") or markup.get("inline_keyboard") or []
+    return [
+        btn if isinstance(btn, str) else btn.get("text", "")
+        for row in rows
+        for btn in row
+    ]
+
+
+class FakeBotApi:
+    """
+    HTTP сервер с подмножеством методов Bot API
+
+    :ivar calls: Количество вызовов по методам
+    :type calls: Dict[str, int]
+    :ivar polling: Событие первого вызова getUpdates
+    :type polling: threading.Event
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.calls: Dict[str, int] = {}
+        self.polling = threading.Event()
+        self._updates: List[dict] = []
+        self._cond = threading.Condition()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._chats: Dict[int, queue.Queue] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-bot-api", daemon=True
+        )
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    def start(self) -> "FakeBotApi":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeBotApi":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _chat(self, chat_id: int) -> queue.Queue:
+        with self._lock:
+            return self._chats.setdefault(chat_id, queue.Queue())
+
+    def push_message(self, user_id: int, text: str) -> None:
+        """
+        Сообщение от пользователя в личном чате с ботом
+
+        :param user_id: ID пользователя (он же ID чата)
+        :type user_id: int
+        :param text: Текст сообщения
+        :type text: str
+        """
+
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+            "text": text,
+        }
+        if text.startswith("/"):
+            command = text.split()[0]
+            message["entities"] = [
+                {"type": "bot_command", "offset": 0, "length": len(command)}
+            ]
+        with self._cond:
+            self._updates.append(
+                {"update_id": next(self._update_ids), "message": message}
+            )
+            self._cond.notify_all()
+
+    def wait_reply(self, chat_id: int, timeout: float) -> Optional[Reply]:
+        """
+        Ожидание следующего сообщения бота в чате
+
+        :param chat_id: ID чата
+        :type chat_id: int
+        :param timeout: Максимальное время ожидания в секундах
+        :type timeout: float
+        :returns: Сообщение бота или None по таймауту
+        :type: Reply или None
+        """
+
+        try:
+            return self._chat(chat_id).get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_updates(self, params: Dict[str, Any]) -> List[dict]:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = min(float(params.get("timeout") or 0), MAX_POLL_TIMEOUT)
+        self.polling.set()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            # подтвержденные через offset апдейты больше не нужны
+            self._updates = [
+                u for u in self._updates if u["update_id"] >= offset
+            ]
+            while not self._updates:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                self._cond.wait(left)
+            return self._updates[:limit]
+
+    def send_message(self, params: Dict[str, Any]) -> dict:
+        chat_id = int(params["chat_id"])
+        text = params.get("text", "")
+        self._chat(chat_id).put(
+            Reply(
+                text, _buttons(params.get("reply_markup")), time.perf_counter()
+            )
+        )
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": text,
+        }
+
+    def edit_message(self, params: Dict[str, Any]) -> dict:
+        chat_id = int(params.get("chat_id") or 0)
+        if "text" in params:
+            self._chat(chat_id).put(
+                Reply(
+                    params["text"],
+                    _buttons(params.get("reply_markup")),
+                    time.perf_counter(),
+                )
+            )
+        return {
+            "message_id": int(params.get("message_id") or 0),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": params.get("text", ""),
+        }
+
+    def call(self, method: str, params: Dict[str, Any]) -> Any:
+        """
+        Выполнение метода Bot API
+
+        :param method: Имя метода (getUpdates, sendMessage, ...)
+        :type method: str
+        :param params: Параметры запроса
+        :type params: Dict[str, Any]
+        :returns: Поле result ответа
+        """
+
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if method == "getMe":
+            return BOT_USER
+        if method == "getUpdates":
+            return self.get_updates(params)
+        if method == "sendMessage":
+            return self.send_message(params)
+        if method == "editMessageText":
+            return self.edit_message(params)
+        return True
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # заголовки и тело уходят разными send, без этого Nagle
+            # и отложенный ACK добавляют ~40 мс к каждому ответу
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode()
+                if "json" in (self.headers.get("Content-Type") or ""):
+                    params = json.loads(body or "{}")
+                else:
+                    params = dict(parse_qsl(body))
+                method = self.path.rsplit("/", 1)[-1]
+                try:
+                    payload = {"ok": True, "result": api.call(method, params)}
+                    status = 200
+                except Exception as e:
+                    payload = {
+                        "ok": False,
+                        "error_code": 400,
+                        "description": f"Bad Request: {e}",
+                    }
+                    status = 400
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
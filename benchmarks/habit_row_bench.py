@@ -0,0 +1,116 @@
+"""
+Сравнение dict(row) и записи Habit из row_factory по памяти и скорости
+
+    python benchmarks/habit_row_bench.py [--habits N] [--repeat N]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+from models import HABIT_COLUMNS, habit_row_factory
+
+QUERY = f"SELECT {HABIT_COLUMNS} FROM habits WHERE user_id = ? ORDER BY current_streak DESC, name"
+
+
+def make_db(habits: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE habits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_completed INTEGER,
+            current_streak INTEGER DEFAULT 0,
+            total_completions INTEGER DEFAULT 0,
+            longest_streak INTEGER DEFAULT 0,
+            schedule_kind INTEGER NOT NULL DEFAULT 0,
+            schedule_value INTEGER NOT NULL DEFAULT 0,
+            UNIQUE(user_id, name)
+        )
+        """)
+    conn.executemany(
+        "INSERT INTO habits (user_id, name, last_completed, current_streak, total_completions) VALUES (1, ?, 739602, ?, ?)",
+        ((f"habit {i}", i % 30, i) for i in range(habits)),
+    )
+    return conn
+
+
+def fetch_dicts(conn):
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    cursor.execute(QUERY, (1,))
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def fetch_records(conn):
+    cursor = conn.cursor()
+    cursor.row_factory = habit_row_factory
+    cursor.execute(QUERY, (1,))
+    return cursor.fetchall()
+
+
+def render_dicts(habits) -> int:
+    size = 0
+    for habit in habits:
+        size += len(
+            f'{habit.get("name", "Не найдено")} {habit.get("current_streak", 0)} {habit.get("total_completions", 0)} {habit.get("last_completed", "Никогда")} {habit.get("id", 0)}'
+        )
+    return size
+
+
+def render_records(habits) -> int:
+    size = 0
+    for habit in habits:
+        size += len(
+            f"{habit.name} {habit.current_streak} {habit.total_completions} {habit.last_completed} {habit.id}"
+        )
+    return size
+
+
+def memory(fetch, conn) -> int:
+    tracemalloc.start()
+    habits = fetch(conn)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del habits
+    return current
+
+
+def timing(fn, arg, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--habits", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    conn = make_db(args.habits)
+    dicts, records = fetch_dicts(conn), fetch_records(conn)
+    print(f"habits per user: {args.habits}")
+    print(f"{'':<10}{'memory, KiB':>14}{'fetch, us':>12}{'render, us':>12}")
+    for label, fetch, render, rows in (
+        ("dict", fetch_dicts, render_dicts, dicts),
+        ("Habit", fetch_records, render_records, records),
+    ):
+        print(
+            f"{label:<10}{memory(fetch, conn) / 1024:>14.1f}"
+            f"{timing(fetch, conn, args.repeat):>12.1f}"
+            f"{timing(render, rows, args.repeat):>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
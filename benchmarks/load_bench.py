@@ -0,0 +1,257 @@
+"""
+Сквозная нагрузка на бота через локальную замену Bot API
+
+Бот запускается обычным main.py в отдельном процессе с TG_API_BASE_URL,
+указывающим на fake_bot_api.FakeBotApi. Виртуальные пользователи
+проходят сценарий: /start, добавление привычек, список, выполнение
+и удаление. Каждое сообщение ждет ответа бота, замеряются обработанные
+апдейты в секунду, задержка ответа и доля ошибок
+
+    python benchmarks/load_bench.py [--users 20] [--rounds 5] [--habits 3]
+"""
+
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Union
+
+from fake_bot_api import FakeBotApi, Reply
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCHEDULES = ["Каждый день", "пн ср пт", "3 раза в неделю", "Каждые 2 дня"]
+
+
+class StepFailed(Exception):
+    pass
+
+
+class LoadStats:
+    """
+    Результаты прогона: задержки ответов и ошибки по видам
+    """
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors: Counter = Counter()
+        self.lock = threading.Lock()
+        self.elapsed = 0.0
+
+    def record(self, latency: Optional[float], error: str = "") -> None:
+        with self.lock:
+            if error:
+                self.errors[error] += 1
+            else:
+                self.latencies.append(latency)
+
+    @property
+    def steps(self) -> int:
+        return len(self.latencies) + sum(self.errors.values())
+
+    def percentile(self, p: float) -> float:
+        ordered = sorted(self.latencies)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class VirtualUser:
+    def __init__(
+        self,
+        api: FakeBotApi,
+        stats: LoadStats,
+        uid: int,
+        think: float,
+        timeout: float,
+    ):
+        self.api = api
+        self.stats = stats
+        self.uid = uid
+        self.think = think
+        self.timeout = timeout
+
+    def say(self, text: str, expect: Union[str, Sequence[str]]) -> Reply:
+        """
+        Отправка сообщения и ожидание ответа с ожидаемым текстом
+
+        :raises StepFailed: Если ответа нет или текст не тот
+        """
+
+        if self.think:
+            time.sleep(random.uniform(0, 2 * self.think))
+        start = time.perf_counter()
+        self.api.push_message(self.uid, text)
+        reply = self.api.wait_reply(self.uid, self.timeout)
+        if reply is None:
+            self.stats.record(None, "timeout")
+            raise StepFailed(f"no reply to {text!r}")
+        expected = (expect,) if isinstance(expect, str) else expect
+        if not any(e in reply.text for e in expected):
+            self.stats.record(None, "unexpected reply")
+            raise StepFailed(f"{text!r} -> {reply.text[:60]!r}")
+        self.stats.record(reply.received - start)
+        return reply
+
+    def drain(self) -> None:
+        # ответы, пришедшие после таймаута прошлого шага
+        while self.api.wait_reply(self.uid, 0) is not None:
+            pass
+
+    def session(self, round_no: int, habits: int) -> None:
+        self.say("/start", "Добро пожаловать")
+        for i in range(habits):
+            self.say("➕ Добавить привычку", "Введите название")
+            self.say(f"привычка {round_no}-{i}", "Как часто")
+            self.say(random.choice(SCHEDULES), "добавлена")
+        self.say("📋 Мои привычки", "Ваши привычки")
+
+        reply = self.say("✅ Выполнить привычку", ("Какую", "выполнены"))
+        for button in [b for b in reply.buttons if b.startswith("☑️")]:
+            self.say(button, "Поздравляем")
+
+        for _ in range(habits):
+            reply = self.say("🗑️ Удалить привычку", "Какую привычку")
+            button = next(b for b in reply.buttons if b.startswith("🗑️"))
+            self.say(button, "Вы уверены")
+            self.say("Да, удалить", "успешно удалена")
+
+    def run(self, rounds: int, habits: int) -> None:
+        for round_no in range(rounds):
+            try:
+                self.session(round_no, habits)
+            except StepFailed:
+                self.drain()
+                # сброс незавершенного диалога перед следующим раундом
+                self.api.push_message(self.uid, "/cancel")
+                time.sleep(self.timeout)
+                self.drain()
+
+
+def start_bot(api: FakeBotApi, workdir: str, log_path: str):
+    """
+    Запуск main.py с подключением к локальному Bot API
+
+    :returns: Процесс бота
+    :type: subprocess.Popen
+    """
+
+    env = dict(
+        os.environ,
+        TG_BOT_TOKEN="123456:LOAD-TEST",
+        TG_API_BASE_URL=api.base_url,
+        ADMIN_IDS="",
+    )
+    with open(log_path, "w") as log:
+        return subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "main.py")],
+            cwd=workdir,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+
+
+def stop_bot(proc) -> None:
+    proc.send_signal(signal.SIGINT)
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def run_load(
+    api: FakeBotApi,
+    users: int,
+    rounds: int,
+    habits: int,
+    think: float = 0.0,
+    timeout: float = 10.0,
+) -> LoadStats:
+    """
+    Прогон сценария всеми виртуальными пользователями одновременно
+
+    :returns: Результаты прогона
+    :type: LoadStats
+    """
+
+    stats = LoadStats()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        futures = [
+            executor.submit(
+                VirtualUser(api, stats, 1000 + i, think, timeout).run,
+                rounds,
+                habits,
+            )
+            for i in range(users)
+        ]
+        for future in futures:
+            future.result()
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def count_errors(log_path: str) -> int:
+    with open(log_path, errors="replace") as log:
+        return sum(" - ERROR - " in line for line in log)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--habits", type=int, default=3)
+    parser.add_argument(
+        "--think", type=float, default=0.0, help="mean pause between steps, s"
+    )
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, FakeBotApi() as api:
+        log_path = os.path.join(tmp, "bot.log")
+        proc = start_bot(api, tmp, log_path)
+        try:
+            if not api.polling.wait(30):
+                with open(log_path, errors="replace") as log:
+                    print(log.read())
+                sys.exit("bot did not start polling")
+            stats = run_load(
+                api,
+                args.users,
+                args.rounds,
+                args.habits,
+                args.think,
+                args.timeout,
+            )
+        finally:
+            stop_bot(proc)
+
+        failed = sum(stats.errors.values())
+        print(
+            f"{args.users} users x {args.rounds} rounds, "
+            f"{stats.steps} updates in {stats.elapsed:.2f} s"
+        )
+        print(f"updates/s      {stats.steps / stats.elapsed:10.1f}")
+        for name, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            print(f"latency {name}    {stats.percentile(p) * 1000:10.1f} ms")
+        print(
+            f"latency max    {max(stats.latencies, default=0) * 1000:10.1f} ms"
+        )
+        print(
+            f"failed steps   {failed:10d} "
+            f"({failed / max(stats.steps, 1):.2%}) {dict(stats.errors)}"
+        )
+        print(f"bot errors     {count_errors(log_path):10d} (ERROR log lines)")
+        print(f"api calls      {dict(sorted(api.calls.items()))}")
+
+
+if __name__ == "__main__":
+    main()
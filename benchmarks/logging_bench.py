@@ -0,0 +1,112 @@
+"""
+Микробенчмарк логирования: время, которое event loop тратит на логи одного апдейта
+
+Сравниваются исходная схема (basicConfig с уровнем DEBUG, f-строки,
+синхронная запись в файл) и очередь с фоновым слушателем и ленивыми аргументами
+
+    python benchmarks/logging_bench.py [--updates N]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+from logs import setup_logging
+
+uid, hid, name = 123456789, 42, "Утренняя зарядка"
+payload = {"update_id": 1, "message": {"text": "✅ Выполнить привычку"}}
+
+
+def update_eager() -> None:
+    # Так логирует апдейт библиотека + наш код при DEBUG и f-строках
+    logging.getLogger("httpx").debug(
+        f"HTTP Request: POST getUpdates {payload}"
+    )
+    logging.getLogger("telegram.ext").debug(f"Processing update {payload}")
+    logging.getLogger("db").info(
+        f"Habit {hid} of user {uid} completed: {name}"
+    )
+    logging.getLogger("httpx").info(
+        f"HTTP Request: POST sendMessage {uid} 200"
+    )
+
+
+def update_lazy() -> None:
+    logging.getLogger("httpx").debug(
+        "HTTP Request: POST getUpdates %s", payload
+    )
+    logging.getLogger("telegram.ext").debug("Processing update %s", payload)
+    logging.getLogger("db").info(
+        "Habit %s of user %s completed: %s", hid, uid, name
+    )
+    logging.getLogger("httpx").info(
+        "HTTP Request: POST sendMessage %s 200", uid
+    )
+
+
+def reset() -> None:
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    for name in ("httpx", "telegram", "telegram.ext", "db"):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+
+
+def measure(fn, updates: int) -> float:
+    start = time.perf_counter()
+    for _ in range(updates):
+        fn()
+    return (time.perf_counter() - start) / updates * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "sync.log"), "w", encoding="utf-8") as out:
+            logging.basicConfig(
+                format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+                level=logging.DEBUG,
+                stream=out,
+            )
+            sync_us = measure(update_eager, args.updates)
+            reset()
+
+        with open(
+            os.path.join(tmp, "queue.log"), "w", encoding="utf-8"
+        ) as out:
+            listener = setup_logging(
+                "INFO", {"httpx": "WARNING", "telegram": "INFO"}, stream=out
+            )
+            queue_us = measure(update_lazy, args.updates)
+            listener.stop()
+            reset()
+
+        with open(
+            os.path.join(tmp, "queue_debug.log"), "w", encoding="utf-8"
+        ) as out:
+            listener = setup_logging("DEBUG", stream=out)
+            queue_debug_us = measure(update_lazy, args.updates)
+            listener.stop()
+            reset()
+
+    print(f"updates: {args.updates}")
+    print(f"sync, DEBUG, f-strings:         {sync_us:8.2f} us/update")
+    print(f"queue, DEBUG, lazy args:        {queue_debug_us:8.2f} us/update")
+    print(f"queue, per-module levels, lazy: {queue_us:8.2f} us/update")
+    print(
+        f"saved on event loop:            {sync_us - queue_us:8.2f} us/update"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Стоимость выбора обработчика: цепочка filters.Text/Regex против TextRouter
+
+Для N кнопок собираются N MessageHandler с filters.Text и один
+с filters.Regex (как было в Handler.get_message_handlers) либо один
+TextRouter с теми же кнопками. Замеряется время выбора обработчика
+так, как это делает Application: check_update по порядку до первого
+совпадения. Худший случай для цепочки - последняя кнопка и текст,
+совпадающий только с регулярным выражением
+
+    python benchmarks/router_bench.py [--repeat 20000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+from telegram import Chat, Message, Update, User
+from telegram.ext import MessageHandler, filters
+
+from handlers import COMPLETE_PATTERN
+from router import TextRouter
+
+SIZES = (4, 16, 64, 256)
+
+
+async def callback(update, context):
+    pass
+
+
+def make_update(text: str) -> Update:
+    user = User(1, "User", False)
+    message = Message(
+        1, datetime.now(), Chat(1, "private"), from_user=user, text=text
+    )
+    return Update(1, message=message)
+
+
+def dispatch(handlers, update):
+    for handler in handlers:
+        check = handler.check_update(update)
+        if check is not None and check is not False:
+            return handler
+    return None
+
+
+def measure(handlers, update, repeat: int) -> float:
+    assert dispatch(handlers, update) is not None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        dispatch(handlers, update)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    regex_update = make_update("☑️ Зарядка (ID: 42)")
+    print(
+        f"{'buttons':>8} {'chain last':>12} {'router last':>12}"
+        f" {'chain regex':>12} {'router regex':>13}   us/update"
+    )
+    for size in SIZES:
+        labels = [f"Кнопка {i}" for i in range(size)]
+        chain = [
+            MessageHandler(filters.Text(label), callback) for label in labels
+        ]
+        chain.append(MessageHandler(filters.Regex(COMPLETE_PATTERN), callback))
+        router = [
+            TextRouter(
+                dict.fromkeys(labels, callback),
+                [(COMPLETE_PATTERN, callback)],
+            )
+        ]
+        last = make_update(labels[-1])
+        print(
+            f"{size:8d}"
+            f" {measure(chain, last, args.repeat):12.2f}"
+            f" {measure(router, last, args.repeat):12.2f}"
+            f" {measure(chain, regex_update, args.repeat):12.2f}"
+            f" {measure(router, regex_update, args.repeat):13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
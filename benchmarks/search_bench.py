@@ -0,0 +1,92 @@
+"""
+Задержка поиска привычек по trigram-индексу на большой таблице
+
+Таблица заполняется напрямую (триггеры поддерживают habits_fts),
+поиск выполняется через Database.search_habits
+
+    python benchmarks/search_bench.py [--habits 1000000] [--per-user 100]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+from db import Database
+
+WORDS = [
+    "Зарядка",
+    "Чтение",
+    "Бег",
+    "Медитация",
+    "Вода",
+    "Английский",
+    "Спорт",
+    "Сон",
+    "Прогулка",
+    "Дневник",
+]
+QUERIES = ["чтен", "зар", "медитация 5", "прогулка 1", "english"]
+BASE_UID = 100_000_000
+
+
+def fill(db: Database, habits: int, per_user: int) -> None:
+    conn = db.connect()
+    conn.executemany(
+        "INSERT INTO habits (user_id, name) VALUES (?, ?)",
+        (
+            (
+                BASE_UID + i // per_user,
+                f"{WORDS[i % len(WORDS)]} {i % per_user}",
+            )
+            for i in range(habits)
+        ),
+    )
+    conn.commit()
+    conn.execute("INSERT INTO habits_fts (habits_fts) VALUES ('optimize')")
+    conn.commit()
+    conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--habits", type=int, default=1_000_000)
+    parser.add_argument("--per-user", type=int, default=100)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    users = args.habits // args.per_user
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "habits.sql")
+        db = Database(path)
+        start = time.perf_counter()
+        fill(db, args.habits, args.per_user)
+        print(
+            f"filled {args.habits} habits in {time.perf_counter() - start:.1f} s"
+        )
+        print(f"db size: {os.path.getsize(path) / 2**20:.1f} MiB")
+
+        print(f"{'query':<14}{'p50, ms':>10}{'p99, ms':>10}{'avg hits':>10}")
+        for query in QUERIES:
+            timings, hits = [], 0
+            for _ in range(args.lookups):
+                uid = BASE_UID + random.randrange(users)
+                start = time.perf_counter()
+                hits += len(db.search_habits(uid, query))
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(
+                f"{query:<14}{statistics.median(timings):>10.3f}"
+                f"{timings[int(len(timings) * 0.99)]:>10.3f}"
+                f"{hits / args.lookups:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Сводная статистика и таблица лидеров: полный проход против сводных таблиц
+
+Создается база из N привычек с историей выполнений, затем сравнивается
+время запросов COUNT(*)/ORDER BY по всей таблице с Database.get_stats()
+и Database.top_streaks(), а также стоимость complete_habit с триггерами
+
+    python benchmarks/stats_bench.py [--habits 1000000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+from db import Database
+
+
+def fill(db: Database, habits: int) -> None:
+    today = date.today()
+    yesterday = (today - timedelta(days=1)).toordinal()
+    with db.writer() as conn:
+        conn.executemany(
+            """
+            INSERT INTO habits (user_id, name, created_at, last_completed,
+                                current_streak, longest_streak)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                (
+                    i // 10,
+                    f"habit {i}",
+                    today.isoformat(),
+                    yesterday,
+                    i % 97,
+                    i % 101,
+                )
+                for i in range(habits)
+            ),
+        )
+        conn.execute(
+            """
+            INSERT INTO completions (habit_id, completion_date)
+            SELECT id, ? FROM habits WHERE id % 3 = 0
+            """,
+            (today.toordinal(),),
+        )
+        conn.commit()
+
+
+def measure(func, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--habits", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "habits.sql"))
+        fill(db, args.habits)
+        today = date.today()
+
+        def naive_stats():
+            with db.reader() as conn:
+                conn.execute(
+                    """
+                    SELECT COUNT(DISTINCT h.user_id), COUNT(*)
+                    FROM completions c JOIN habits h ON h.id = c.habit_id
+                    WHERE c.completion_date = ?
+                    """,
+                    (today.toordinal(),),
+                ).fetchone()
+                conn.execute(
+                    "SELECT COUNT(*) FROM habits WHERE date(created_at) = ?",
+                    (today.isoformat(),),
+                ).fetchone()
+                conn.execute("SELECT COUNT(*) FROM habits").fetchone()
+                conn.execute("SELECT COUNT(*) FROM completions").fetchone()
+
+        def naive_top():
+            with db.reader() as conn:
+                conn.execute("""
+                    SELECT id, user_id, current_streak, name FROM habits
+                    ORDER BY current_streak DESC LIMIT 10
+                    """).fetchall()
+
+        print(f"{args.habits} habits")
+        print(f"naive stats      {measure(naive_stats):10.3f} ms")
+        print(f"get_stats()      {measure(db.get_stats):10.3f} ms")
+        print(f"naive top        {measure(naive_top):10.3f} ms")
+        db.top_streaks()
+        print(f"top_streaks()    {measure(db.top_streaks):10.3f} ms")
+
+        hids = [hid for hid in range(1, 3001) if hid % 3]
+        start = time.perf_counter()
+        for hid in hids:
+            db.complete_habit(hid, (hid - 1) // 10)
+        elapsed = time.perf_counter() - start
+        print(
+            f"complete_habit   {elapsed / len(hids) * 1000:10.3f} ms per call"
+        )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
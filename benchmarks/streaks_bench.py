@@ -0,0 +1,80 @@
+"""
+Стоимость инкрементального расчета серий и полного пересчета по истории
+
+Создается база из N привычек, у каждой история выполнений за D дней
+с пропусками. Сначала замеряется advance() на одно выполнение, затем
+Database.recompute_streaks() при разных размерах порции
+
+    python benchmarks/streaks_bench.py [--habits 100000] [--days 365]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import timeit
+from datetime import date
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+from db import Database
+from streaks import StreakState, advance
+
+
+def fill(db: Database, habits: int, days: int) -> int:
+    with db.writer() as conn:
+        conn.executemany(
+            "INSERT INTO habits (user_id, name) VALUES (?, ?)",
+            ((i // 10, f"habit {i}") for i in range(habits)),
+        )
+        # ~80% дней с выполнением, разрывы зависят от привычки
+        conn.execute(
+            """
+            WITH RECURSIVE d(i) AS (
+                SELECT 0 UNION ALL SELECT i + 1 FROM d WHERE i < ? - 1
+            )
+            INSERT INTO completions (habit_id, completion_date)
+            SELECT h.id, ? + d.i
+            FROM habits h, d
+            WHERE (h.id * 7 + d.i * 13) % 5 != 0
+            """,
+            (days, date(2025, 1, 1).toordinal()),
+        )
+        conn.commit()
+        return conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--habits", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    state = StreakState(5, 10, 739000)
+    n = 1_000_000
+    per_call = timeit.timeit(lambda: advance(state, 739001), number=n) / n
+    print(f"advance(): {per_call * 1e9:.0f} ns per completion")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "habits.sql"))
+        start = time.perf_counter()
+        rows = fill(db, args.habits, args.days)
+        print(
+            f"filled {args.habits} habits, {rows} completions "
+            f"in {time.perf_counter() - start:.1f} s"
+        )
+        for chunk in (100, 1000, 10000):
+            start = time.perf_counter()
+            db.recompute_streaks(chunk)
+            elapsed = time.perf_counter() - start
+            print(
+                f"recompute chunk={chunk:<6} {elapsed:6.2f} s  "
+                f"{rows / elapsed / 1e6:5.2f} M completions/s"
+            )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Конкурентная нагрузка на Database из нескольких процессов и потоков
+
+Каждый процесс открывает свой Database на общий файл и запускает потоки,
+выполняющие случайные операции: добавление, удаление, выполнение одной
+и нескольких привычек, чтение списков. После прогона проверяются
+инварианты базы:
+
+- total_completions каждой привычки равен числу строк истории выполнений
+- у привычки не больше одного выполнения в день
+- каждое успешное выполнение есть в истории, а лишних строк нет
+  (нет потерянных обновлений)
+- счетчики stats_totals совпадают с количеством строк
+
+Ожидаемые отказы (дубликат названия, привычка уже удалена или уже
+выполнена сегодня) считаются отдельно, любые другие исключения -
+ошибками прогона
+
+    python benchmarks/stress_bench.py [--processes 4] [--threads 4] [--ops 2000]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+from db import Database
+from exceptions import DBError
+
+# Сообщения ошибок, которые допустимы при гонке пользователей
+EXPECTED_ERRORS = (
+    "already exists",
+    "don't exist",
+    "not found",
+    "is completed today",
+)
+OPERATIONS = (
+    ("add", 3),
+    ("complete", 4),
+    ("complete_batch", 2),
+    ("delete", 1),
+    ("list", 3),
+)
+
+
+class WorkerResult(NamedTuple):
+    """
+    Итоги одного процесса
+
+    :ivar ops: Количество операций по исходу ("add ok", "delete expected")
+    :ivar completed: ID привычек по одному на каждое успешное выполнение
+    :ivar errors: Тексты неожиданных ошибок
+    """
+
+    ops: Counter
+    completed: List[int]
+    errors: List[str]
+
+
+def _worker(path: str, seed: int, threads: int, ops: int, users: int):
+    # ожидаемые отказы логируются как ошибки и засоряют вывод
+    logging.getLogger("db").setLevel(logging.CRITICAL)
+    db = Database(path)
+    outcomes: Counter = Counter()
+    completed: List[int] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+    names, weights = zip(*OPERATIONS)
+
+    def run(thread_seed: int) -> None:
+        rnd = random.Random(thread_seed)
+        for _ in range(ops):
+            uid = rnd.randrange(users)
+            op = rnd.choices(names, weights)[0]
+            done: List[int] = []
+            try:
+                if op == "add":
+                    db.add_habit(uid, f"habit {rnd.randrange(20)}")
+                elif op == "list":
+                    db.get_user_habits(uid)
+                    db.get_due_habits(uid)
+                else:
+                    hids = [h.id for h in db.get_user_habits(uid)]
+                    # ID соседнего пользователя тоже пробуем: чужая
+                    # привычка должна отклоняться
+                    hids.append(rnd.randrange(1, 50 * users))
+                    hid = rnd.choice(hids)
+                    if op == "complete":
+                        db.complete_habit(hid, uid)
+                        done.append(hid)
+                    elif op == "complete_batch":
+                        batch = rnd.sample(hids, min(3, len(hids)))
+                        done.extend(
+                            h.id for h in db.complete_habits(uid, batch)
+                        )
+                    else:
+                        db.delete_habit(uid, hid)
+                outcome = "ok"
+            except DBError as e:
+                if not any(msg in str(e) for msg in EXPECTED_ERRORS):
+                    with lock:
+                        errors.append(f"{op}: {e}")
+                    outcome = "error"
+                else:
+                    outcome = "expected"
+            with lock:
+                outcomes[f"{op} {outcome}"] += 1
+                completed.extend(done)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for future in [
+            executor.submit(run, seed * 1000 + i) for i in range(threads)
+        ]:
+            future.result()
+    db.close()
+    return WorkerResult(outcomes, completed, errors)
+
+
+def _worker_args(args):
+    return _worker(*args)
+
+
+def run_stress(
+    path: str,
+    processes: int = 4,
+    threads: int = 4,
+    ops: int = 500,
+    users: int = 5,
+    seed: int = 38,
+) -> Dict:
+    """
+    Прогон случайных операций из processes процессов по threads потоков
+
+    :param path: Путь к файлу базы (создается при необходимости)
+    :type path: str
+    :param ops: Количество операций на поток
+    :type ops: int
+    :param users: Количество пользователей, меньше - больше конфликтов
+    :type users: int
+    :returns: Счетчики исходов, успешные выполнения, ошибки и время
+    :type: Dict
+    """
+
+    Database(path).close()
+    jobs = [(path, seed + i, threads, ops, users) for i in range(processes)]
+    start = time.perf_counter()
+    if processes == 1:
+        results = [_worker_args(jobs[0])]
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(processes) as pool:
+            results = pool.map(_worker_args, jobs)
+    elapsed = time.perf_counter() - start
+
+    total = {"ops": Counter(), "completed": Counter(), "errors": []}
+    for result in results:
+        total["ops"].update(result.ops)
+        total["completed"].update(result.completed)
+        total["errors"].extend(result.errors)
+    total["elapsed"] = elapsed
+    return total
+
+
+def check_invariants(path: str, completed: Counter) -> List[str]:
+    """
+    Проверка инвариантов базы после прогона
+
+    :param path: Путь к файлу базы
+    :type path: str
+    :param completed: Количество успешных выполнений по ID привычек
+    :type completed: Counter
+    :returns: Описания нарушений (пустой список, если их нет)
+    :type: List[str]
+    """
+
+    violations = []
+    conn = sqlite3.connect(path)
+    for hid, total, rows, last, latest in conn.execute("""
+            SELECT h.id, h.total_completions, COUNT(c.habit_id),
+                   h.last_completed, MAX(c.completion_date)
+            FROM habits h
+            LEFT JOIN completion_history c ON c.habit_id = h.id
+            GROUP BY h.id
+            """):
+        if total != rows:
+            violations.append(f"habit {hid}: total {total} != {rows} rows")
+        if last != latest:
+            violations.append(f"habit {hid}: last {last} != {latest}")
+        if rows != completed.get(hid, 0):
+            violations.append(
+                f"habit {hid}: {rows} rows != "
+                f"{completed.get(hid, 0)} successful completions"
+            )
+    for hid, day, count in conn.execute("""
+            SELECT habit_id, completion_date, COUNT(*)
+            FROM completion_history
+            GROUP BY habit_id, completion_date
+            HAVING COUNT(*) > 1
+            """):
+        violations.append(f"habit {hid}: {count} completions on {day}")
+    habits, completions = conn.execute(
+        "SELECT habits, completions FROM stats_totals"
+    ).fetchone()
+    actual = conn.execute(
+        "SELECT (SELECT COUNT(*) FROM habits),"
+        " (SELECT COUNT(*) FROM completion_history)"
+    ).fetchone()
+    if (habits, completions) != actual:
+        violations.append(
+            f"stats_totals {(habits, completions)} vs counted {actual}"
+        )
+    conn.close()
+    return violations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "habits.sql")
+        result = run_stress(
+            path, args.processes, args.threads, args.ops, args.users
+        )
+        violations = check_invariants(path, result["completed"])
+
+    ops = result["ops"]
+    total = sum(ops.values())
+    print(
+        f"{args.processes} processes x {args.threads} threads, "
+        f"{total} ops in {result['elapsed']:.2f} s "
+        f"({total / result['elapsed']:.0f} ops/s)"
+    )
+    for key in sorted(ops):
+        print(f"  {key:<28} {ops[key]:8d}")
+    print(f"unexpected errors {len(result['errors'])}")
+    for error in Counter(result["errors"]).most_common(5):
+        print(f"  {error[1]:6d} x {error[0]}")
+    print(f"invariant violations {len(violations)}")
+    for violation in violations[:10]:
+        print(f"  {violation}")
+    if result["errors"] or violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,98 @@ db_file = "habits.sql"
 kb_btns = [
     ["➕ Добавить привычку", "📋 Мои привычки"],
     ["✅ Выполнить привычку", "🗑️ Удалить привычку"],
+    ["📝 Выполнить несколько", "🔍 Найти привычку"],
 ]
 back_btn_text = "⬅️ Назад"
+done_btn_text = "✅ Готово"
+cancel_btn_text = "✖️ Отмена"
 confirm_btns = [
     ["Да, удалить", "Нет, я передумал"],
     [back_btn_text],
 ]
+schedule_btns = [
+    ["Каждый день"],
+    ["пн ср пт", "3 раза в неделю"],
+    ["Каждые 2 дня"],
+    [back_btn_text],
+]
 
 
 wellcome_msg = "Добро пожаловать в телеграм трекер привычек!\nВоспользуйтесь клавишами для взаимодействия"
 no_habits_msg = "Вы еще не добавили ни одной привычки"
 no_habits_to_delete_msg = "У вас нет привычек для удаления"
+too_many_habits_msg = "Показаны первые {} привычек, остальные можно найти через «🔍 Найти привычку»"
+schedule_prompt_msg = "Как часто нужно выполнять привычку? Выберите вариант или напишите свой: дни недели (пн ср пт), «3 раза в неделю» или «каждые 2 дня»"
+schedule_invalid_msg = "Не удалось разобрать расписание. Примеры: «каждый день», «пн ср пт», «3 раза в неделю», «каждые 2 дня»"
+no_leaders_msg = "Сейчас ни у одной привычки нет текущей серии"
+admin_only_msg = "Команда доступна только администраторам"
+timezone_msg = "Ваш часовой пояс: {}. Изменить: /tz +3 или /tz UTC-05:00"
+timezone_set_msg = "Часовой пояс изменен на {}, сегодня у вас {}"
+timezone_invalid_msg = "Не удалось разобрать часовой пояс. Примеры: «/tz +3», «/tz -5», «/tz UTC+05:30»"
+
+# Максимум привычек в клавиатурах выполнения и удаления
+max_kb_habits = 30
+# Максимум пользователей в кэше клавиатур выполнения и удаления
+kb_cache_size = 10000
+# Максимум результатов поиска привычек
+search_limit = 10
+# Количество привычек в таблице лидеров /top
+leaderboard_size = 10
 
 
-db_date_format = "%Y-%m-%d"
 ui_date_format = "%d.%m.%Y"
+
+
+log_level = "INFO"
+# Уровни логирования для отдельных модулей (имя логгера -> уровень)
+log_levels = {
+    "httpx": "WARNING",
+    "httpcore": "WARNING",
+    "telegram": "INFO",
+    "db": "INFO",
+}
+log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+log_json = False
+
+
+backup_dir = "backups"
+# Интервал резервного копирования в секундах (0 - отключено)
+backup_interval = 6 * 60 * 60
+backup_keep = 7
+backup_compress = True
+# Страниц за один шаг онлайн-копирования и пауза между шагами в секундах
+backup_pages = 256
+backup_pause = 0.005
+
+
+# Глубина оперативной истории выполнений в днях, более старые
+# выполнения переносятся в архив
+completions_hot_days = 90
+# Интервал переноса в архив в секундах (0 - отключено)
+archive_interval = 24 * 60 * 60
+archive_batch = 5000
+
+
+# Профилирование по запросу (команда /profile и сигнал SIGUSR1)
+profile_dir = "profiles"
+# Режим по умолчанию: sample (снятие стеков) или cprofile
+profile_mode = "sample"
+# Длительность профилирования по умолчанию в секундах
+profile_seconds = 30
+# Интервал снятия стека в режиме sample в секундах
+profile_interval = 0.005
+
+
+# Рассылка отчетов (reports.py): пользователей в порции, процессов
+# построения отчетов, сообщений в секунду и файл контрольной точки
+report_chunk = 500
+report_workers = 4
+report_rate = 25
+report_checkpoint = "reports_checkpoint.json"
+
+
+# Часовой пояс пользователей без настройки: смещение от UTC в минутах
+# (None - часовой пояс сервера)
+default_utc_offset = None
+# Пользователей в порции при сбросе прерванных серий после полуночи
+rollover_chunk = 1000
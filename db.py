@@ -1,11 +1,64 @@
 import sqlite3
-from datetime import datetime, date
-from typing import List, Optional, Tuple
+import threading
+import time
+import queue
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import datetime, date, timezone
+from typing import Iterator, List, Optional, Tuple
 import logging
 from exceptions import DBError
+from leaderboard import Leaderboard, LeaderboardEntry
+from models import (
+    HABIT_COLUMNS,
+    DailyStats,
+    Habit,
+    habit_row_factory,
+    to_date,
+)
+from schedules import (
+    DAILY_SCHEDULE,
+    INTERVAL,
+    WEEKDAYS,
+    WEEKLY,
+    Schedule,
+)
+from streaks import (
+    JULIAN_DAY_OFFSET,
+    StreakState,
+    advance,
+    broken,
+    extend_run,
+)
 
 logger = logging.getLogger(__name__)
 
+# Номер дня (date.toordinal()) из даты или метки времени в SQL
+SQL_DAY = f"CAST(julianday(date({{}})) AS INTEGER) - {JULIAN_DAY_OFFSET}"
+# Текущий день пользователя {0} по его часовому поясу, для пользователя
+# без строки в users - день смещения по умолчанию {1}
+SQL_USER_TODAY = """COALESCE(
+    (
+        SELECT t.today FROM users u
+        JOIN timezones t ON t.utc_offset = u.utc_offset
+        WHERE u.user_id = {0}
+    ),
+    (SELECT today FROM timezones WHERE utc_offset = {1})
+)"""
+# Номер дня часового пояса timezones.utc_offset в момент :now (UTC)
+SQL_OFFSET_TODAY = SQL_DAY.format(":now, utc_offset || ' minutes'")
+
+
+def server_offset() -> int:
+    """
+    Смещение часового пояса сервера от UTC
+
+    :returns: Смещение в минутах
+    :type: int
+    """
+
+    return int(datetime.now().astimezone().utcoffset().total_seconds() // 60)
+
 
 class Database:
     """
@@ -14,36 +67,197 @@ class Database:
     Обеспечивает создание, чтение, обновление и удаление привычек,
     а также отслеживание их выполнения
 
+    Запись выполняется через единственное соединение, доступ к которому
+    сериализуется блокировкой, чтение - через пул read-only соединений.
+    База работает в режиме WAL, поэтому читатели не ждут писателя
+
+    Даты выполнений хранятся номерами дней (date.toordinal()), перевод
+    в date и обратно выполняется только в методах класса
+
+    Границей дня служит полночь часового пояса пользователя (таблица
+    users). Текущий день каждого встречающегося смещения хранится
+    в таблице timezones и сдвигается roll_days, поэтому проверки
+    "выполнено сегодня" сравнивают столбец с готовым номером дня
+
     :ivar db: Путь к файлу базы данных
     :type db: str
+    :ivar readers: Максимальный размер пула соединений на чтение
+    :type readers: int
+    :ivar utc_offset: Смещение в минутах для пользователей без настройки
+    :type utc_offset: int
     """
 
-    def __init__(self, db: str = "habits.db"):
+    def __init__(
+        self,
+        db: str = "habits.db",
+        readers: int = 4,
+        migrate: bool = True,
+        utc_offset: Optional[int] = None,
+    ):
         """
         Конструктор класса
 
         :param db: Путь к файлу базы данных (по умолчанию "habits.db")
         :type db: str
+        :param readers: Размер пула соединений на чтение (по умолчанию 4)
+        :type readers: int
+        :param migrate: Применить миграции (False - только чтение уже
+            созданной базы, например в процессах-обработчиках)
+        :type migrate: bool
+        :param utc_offset: Смещение от UTC в минутах для новых
+            пользователей (по умолчанию часовой пояс сервера)
+        :type utc_offset: int или None
         """
 
         self.db = db
-        self.migrations_up()
+        self.readers = readers
+        self.utc_offset = (
+            server_offset() if utc_offset is None else utc_offset
+        )
+        self._writer_conn: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.RLock()
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+        self._pool_size = 0
+        self._pool_lock = threading.Lock()
+        self.leaderboard = Leaderboard()
+        if migrate:
+            self.migrations_up()
 
-    def connect(self) -> sqlite3.Connection:
+    def connect(self, readonly: bool = False) -> sqlite3.Connection:
         """
         Установка соединения с базой данных
 
+        :param readonly: Открыть соединение только на чтение (mode=ro)
+        :type readonly: bool
         :returns: Объект соединения с БД
         :type: sqlite3.Connection
         :raises DBError: Если произошла ошибка при подключении к БД
         """
         try:
-            conn = sqlite3.connect(self.db)
+            if readonly:
+                uri = Path(self.db).resolve().as_uri() + "?mode=ro"
+                conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(self.db, check_same_thread=False)
             conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA busy_timeout = 5000")
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA synchronous = NORMAL")
             return conn
         except sqlite3.Error as e:
             raise DBError(f"Database connect error: {e}")
 
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Захват соединения на запись
+
+        Все изменения в процессе идут через одно соединение под блокировкой.
+        При исключении незавершенная транзакция откатывается
+
+        :returns: Соединение на запись
+        :type: Iterator[sqlite3.Connection]
+        """
+
+        with self._write_lock:
+            if self._writer_conn is None:
+                self._writer_conn = self.connect()
+            conn = self._writer_conn
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        Захват соединения на чтение из пула
+
+        Соединения создаются по требованию, но не больше self.readers.
+        Для базы в памяти чтение идет через соединение на запись
+
+        :returns: Соединение на чтение
+        :type: Iterator[sqlite3.Connection]
+        """
+
+        if self.db == ":memory:":
+            with self.writer() as conn:
+                yield conn
+            return
+
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                create = self._pool_size < self.readers
+                if create:
+                    self._pool_size += 1
+            if create:
+                try:
+                    conn = self.connect(readonly=True)
+                except Exception:
+                    with self._pool_lock:
+                        self._pool_size -= 1
+                    raise
+            else:
+                conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self) -> None:
+        """
+        Закрытие всех открытых соединений
+        """
+
+        with self._write_lock:
+            if self._writer_conn is not None:
+                self._writer_conn.close()
+                self._writer_conn = None
+        with self._pool_lock:
+            while True:
+                try:
+                    self._pool.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._pool_size = 0
+
+    def backup(
+        self, target: sqlite3.Connection, pages: int = 256, pause: float = 0.0
+    ) -> None:
+        """
+        Онлайн-копирование базы данных в другое соединение
+
+        Источником служит соединение на запись, поэтому изменения, сделанные
+        во время копирования, сразу попадают в копию и не перезапускают ее.
+        Блокировка записи удерживается только на время шага в pages страниц
+        и отпускается на паузу между шагами
+
+        :param target: Соединение с базой-приемником
+        :type target: sqlite3.Connection
+        :param pages: Количество страниц за один шаг
+        :type pages: int
+        :param pause: Пауза между шагами в секундах
+        :type pause: float
+        :raises DBError: Если произошла ошибка при копировании
+        """
+
+        def step_done(status: int, remaining: int, total: int) -> None:
+            self._write_lock.release()
+            try:
+                time.sleep(pause)
+            finally:
+                self._write_lock.acquire()
+
+        with self.writer() as conn:
+            try:
+                conn.backup(target, pages=pages, progress=step_done)
+            except Exception as e:
+                logger.error("DB backup error: %s", e)
+                raise DBError(f"DB backup error: {e}")
+
     def migrations_up(self) -> None:
         """
         Применение миграций базы данных
@@ -54,6 +268,7 @@ class Database:
         try:
             conn = self.connect()
             cursor = conn.cursor()
+            cursor.execute("PRAGMA journal_mode = WAL")
             cursor.execute(
                 """
                 CREATE TABLE IF NOT EXISTS habits (
@@ -61,31 +276,493 @@ class Database:
                     user_id INTEGER NOT NULL,
                     name TEXT NOT NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_completed DATE,
+                    last_completed INTEGER,
                     current_streak INTEGER DEFAULT 0,
                     total_completions INTEGER DEFAULT 0,
                     UNIQUE(user_id, name)
                 )
             """
             )
+            if not self._has_column(cursor, "habits", "longest_streak"):
+                cursor.execute(
+                    """
+                    ALTER TABLE habits
+                    ADD COLUMN longest_streak INTEGER DEFAULT 0
+                    """
+                )
+                cursor.execute(
+                    "UPDATE habits SET longest_streak = current_streak"
+                )
+            for column in ("schedule_kind", "schedule_value", "week_count"):
+                if not self._has_column(cursor, "habits", column):
+                    cursor.execute(
+                        f"""
+                        ALTER TABLE habits
+                        ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0
+                        """
+                    )
+            # таблица лидеров ранжирует текущие серии
+            cursor.execute("DROP INDEX IF EXISTS idx_habits_longest_streak")
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_habits_current_streak
+                ON habits (current_streak)
+            """
+            )
+            self.day_numbers_up(cursor)
             cursor.execute(
                 """
                 CREATE TABLE IF NOT EXISTS completions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
                     habit_id INTEGER NOT NULL,
-                    completion_date DATE NOT NULL,
+                    completion_date INTEGER NOT NULL,
                     FOREIGN KEY (habit_id) REFERENCES habits (id) ON DELETE CASCADE,
-                    UNIQUE(habit_id, completion_date)
-                )
+                    PRIMARY KEY (habit_id, completion_date)
+                ) WITHOUT ROWID
             """
             )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_completions_date
+                ON completions (completion_date)
+            """
+            )
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS completions_archive (
+                    habit_id INTEGER NOT NULL,
+                    completion_date INTEGER NOT NULL,
+                    FOREIGN KEY (habit_id) REFERENCES habits (id) ON DELETE CASCADE,
+                    PRIMARY KEY (habit_id, completion_date)
+                ) WITHOUT ROWID
+            """
+            )
+            cursor.execute(
+                """
+                CREATE VIEW IF NOT EXISTS completion_history AS
+                SELECT habit_id, completion_date FROM completions
+                UNION ALL
+                SELECT habit_id, completion_date FROM completions_archive
+            """
+            )
+            self.search_index_up(cursor)
+            # триггеры статистики берут день из timezones
+            self.timezones_up(cursor)
+            self.stats_up(cursor)
             conn.commit()
+            conn.close()
             logger.info("DB migrations successful up")
         except Exception as e:
-            logger.error(f"DB migrations up error: {e}")
+            logger.error("DB migrations up error: %s", e)
             raise DBError(f"DB migrations up error: {e}")
 
-    def add_habit(self, uid: int, name: str) -> int:
+    @staticmethod
+    def _has_column(cursor: sqlite3.Cursor, table: str, column: str) -> bool:
+        """
+        Проверка наличия столбца в таблице
+
+        :param cursor: Курсор соединения с БД
+        :type cursor: sqlite3.Cursor
+        :param table: Название таблицы
+        :type table: str
+        :param column: Название столбца
+        :type column: str
+        :returns: True если столбец существует
+        :type: bool
+        """
+
+        cursor.execute(
+            "SELECT 1 FROM pragma_table_info(?) WHERE name = ?",
+            (table, column),
+        )
+        return bool(cursor.fetchone())
+
+    def day_numbers_up(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Перевод дат выполнений из строк YYYY-MM-DD в номера дней
+
+        Применяется к базам, где completions еще хранится со столбцом id.
+        Таблица completions пересоздается как WITHOUT ROWID с первичным
+        ключом (habit_id, completion_date) вместо отдельного уникального
+        индекса, в completions_archive, habits.last_completed и сводных
+        таблицах статистики значения переводятся на месте. Представление
+        completion_history и триггеры статистики удаляются и создаются
+        заново дальнейшими миграциями. Все изменения выполняются одной
+        транзакцией
+
+        :param cursor: Курсор соединения, в котором применяются миграции
+        :type cursor: sqlite3.Cursor
+        """
+
+        if not self._has_column(cursor, "completions", "id"):
+            return
+        if not cursor.connection.in_transaction:
+            cursor.execute("BEGIN")
+        cursor.execute("DROP VIEW IF EXISTS completion_history")
+        cursor.execute("DROP TRIGGER IF EXISTS stats_completion_insert")
+        cursor.execute("DROP TRIGGER IF EXISTS stats_habit_insert")
+        cursor.execute(
+            f"""
+            UPDATE habits
+            SET last_completed = {SQL_DAY.format("last_completed")}
+            WHERE typeof(last_completed) = 'text'
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE completions_days (
+                habit_id INTEGER NOT NULL,
+                completion_date INTEGER NOT NULL,
+                FOREIGN KEY (habit_id) REFERENCES habits (id) ON DELETE CASCADE,
+                PRIMARY KEY (habit_id, completion_date)
+            ) WITHOUT ROWID
+            """
+        )
+        cursor.execute(
+            f"""
+            INSERT OR IGNORE INTO completions_days (habit_id, completion_date)
+            SELECT habit_id, {SQL_DAY.format("completion_date")}
+            FROM completions
+            """
+        )
+        cursor.execute("DROP TABLE completions")
+        cursor.execute("ALTER TABLE completions_days RENAME TO completions")
+        for table, column in (
+            ("completions_archive", "completion_date"),
+            ("stats_daily", "day"),
+            ("daily_active", "day"),
+        ):
+            cursor.execute(
+                """
+                SELECT 1 FROM sqlite_master
+                WHERE type = 'table' AND name = ?
+                """,
+                (table,),
+            )
+            if cursor.fetchone():
+                cursor.execute(
+                    f"""
+                    UPDATE {table} SET {column} = {SQL_DAY.format(column)}
+                    WHERE typeof({column}) = 'text'
+                    """
+                )
+        logger.info("DB dates converted to day numbers")
+
+    def search_index_up(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Создание полнотекстового индекса названий привычек
+
+        FTS5-таблица с токенизатором trigram хранит название привычки и
+        владельца в виде "#<user_id>#", поэтому поиск ограничивается
+        привычками одного пользователя внутри самого индекса. Индекс
+        синхронизируется с таблицей habits триггерами
+
+        :param cursor: Курсор соединения, в котором применяются миграции
+        :type cursor: sqlite3.Cursor
+        """
+
+        cursor.execute(
+            """
+            SELECT 1 FROM sqlite_master
+            WHERE type = 'table' AND name = 'habits_fts'
+            """
+        )
+        exists = cursor.fetchone()
+        cursor.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS habits_fts USING fts5(
+                name, owner, content = '', tokenize = 'trigram'
+            )
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS habits_fts_insert
+            AFTER INSERT ON habits BEGIN
+                INSERT INTO habits_fts (rowid, name, owner)
+                VALUES (new.id, new.name, '#' || new.user_id || '#');
+            END
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS habits_fts_delete
+            AFTER DELETE ON habits BEGIN
+                INSERT INTO habits_fts (habits_fts, rowid, name, owner)
+                VALUES ('delete', old.id, old.name, '#' || old.user_id || '#');
+            END
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS habits_fts_update
+            AFTER UPDATE OF name, user_id ON habits BEGIN
+                INSERT INTO habits_fts (habits_fts, rowid, name, owner)
+                VALUES ('delete', old.id, old.name, '#' || old.user_id || '#');
+                INSERT INTO habits_fts (rowid, name, owner)
+                VALUES (new.id, new.name, '#' || new.user_id || '#');
+            END
+        """
+        )
+        if not exists:
+            cursor.execute(
+                """
+                INSERT INTO habits_fts (rowid, name, owner)
+                SELECT id, name, '#' || user_id || '#' FROM habits
+                """
+            )
+
+    def stats_up(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Создание сводных таблиц статистики
+
+        stats_daily хранит по дням количество активных пользователей,
+        выполнений и созданных привычек, stats_totals - общее количество
+        привычек и выполнений. daily_active нужна, чтобы учитывать
+        пользователя активным один раз за день. Таблицы обновляются
+        триггерами в той же транзакции, что и изменение привычек,
+        и при создании заполняются по имеющимся данным
+
+        День статистики - текущий день пользователя по его часовому
+        поясу: выполнения учитываются по completion_date, созданные
+        привычки - по дню пояса пользователя из timezones. Триггер
+        stats_habit_insert пересоздается при каждом запуске, чтобы
+        пользователи без пояса учитывались по смещению utc_offset
+
+        :param cursor: Курсор соединения, в котором применяются миграции
+        :type cursor: sqlite3.Cursor
+        """
+
+        cursor.execute(
+            """
+            SELECT 1 FROM sqlite_master
+            WHERE type = 'table' AND name = 'stats_totals'
+            """
+        )
+        exists = cursor.fetchone()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stats_daily (
+                day INTEGER PRIMARY KEY,
+                active_users INTEGER NOT NULL DEFAULT 0,
+                completions INTEGER NOT NULL DEFAULT 0,
+                habits_created INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS daily_active (
+                day INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                PRIMARY KEY (day, user_id)
+            ) WITHOUT ROWID
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stats_totals (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                habits INTEGER NOT NULL DEFAULT 0,
+                completions INTEGER NOT NULL DEFAULT 0
+            )
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS stats_daily_active
+            AFTER INSERT ON daily_active BEGIN
+                INSERT INTO stats_daily (day, active_users) VALUES (new.day, 1)
+                ON CONFLICT (day) DO UPDATE SET active_users = active_users + 1;
+            END
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS stats_completion_insert
+            AFTER INSERT ON completions BEGIN
+                INSERT INTO stats_daily (day, completions)
+                VALUES (new.completion_date, 1)
+                ON CONFLICT (day) DO UPDATE SET completions = completions + 1;
+                UPDATE stats_totals SET completions = completions + 1;
+                INSERT OR IGNORE INTO daily_active (day, user_id)
+                SELECT new.completion_date, user_id
+                FROM habits WHERE id = new.habit_id;
+            END
+        """
+        )
+        created_day = SQL_USER_TODAY.format(
+            "new.user_id", int(self.utc_offset)
+        )
+        cursor.execute("DROP TRIGGER IF EXISTS stats_habit_insert")
+        cursor.execute(
+            f"""
+            CREATE TRIGGER stats_habit_insert
+            AFTER INSERT ON habits BEGIN
+                INSERT INTO stats_daily (day, habits_created)
+                VALUES ({created_day}, 1)
+                ON CONFLICT (day) DO UPDATE
+                SET habits_created = habits_created + 1;
+                UPDATE stats_totals SET habits = habits + 1;
+                INSERT OR IGNORE INTO daily_active (day, user_id)
+                VALUES ({created_day}, new.user_id);
+            END
+        """
+        )
+        # прежняя версия триггера не вычитала выполнения удаленной
+        # привычки, накопленное расхождение пересчитывается один раз
+        cursor.execute(
+            """
+            SELECT 1 FROM sqlite_master
+            WHERE type = 'trigger' AND name = 'stats_habit_delete'
+              AND sql NOT LIKE '%total_completions%'
+            """
+        )
+        if cursor.fetchone():
+            cursor.execute("DROP TRIGGER stats_habit_delete")
+            cursor.execute(
+                """
+                UPDATE stats_totals
+                SET completions = (SELECT COUNT(*) FROM completion_history)
+                """
+            )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS stats_habit_delete
+            AFTER DELETE ON habits BEGIN
+                UPDATE stats_totals
+                SET habits = habits - 1,
+                    completions = completions - old.total_completions;
+            END
+        """
+        )
+        if not exists:
+            cursor.execute(
+                """
+                INSERT INTO stats_totals (id, habits, completions)
+                VALUES (
+                    1,
+                    (SELECT COUNT(*) FROM habits),
+                    (SELECT COUNT(*) FROM completion_history)
+                )
+                """
+            )
+            cursor.execute(
+                """
+                INSERT INTO stats_daily (day, completions)
+                SELECT completion_date, COUNT(*)
+                FROM completion_history
+                WHERE true
+                GROUP BY completion_date
+                ON CONFLICT (day) DO UPDATE
+                SET completions = excluded.completions
+                """
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO stats_daily (day, habits_created)
+                SELECT {SQL_DAY.format("created_at")} AS created, COUNT(*)
+                FROM habits
+                WHERE date(created_at) IS NOT NULL
+                GROUP BY created
+                ON CONFLICT (day) DO UPDATE
+                SET habits_created = excluded.habits_created
+                """
+            )
+            # активные пользователи считаются триггером stats_daily_active
+            cursor.execute(
+                f"""
+                INSERT OR IGNORE INTO daily_active (day, user_id)
+                SELECT c.completion_date, h.user_id
+                FROM completion_history c
+                JOIN habits h ON h.id = c.habit_id
+                UNION
+                SELECT {SQL_DAY.format("created_at")}, user_id
+                FROM habits
+                WHERE date(created_at) IS NOT NULL
+                """
+            )
+
+    def timezones_up(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Создание таблиц часовых поясов пользователей
+
+        users хранит смещение от UTC в минутах, индекс по смещению
+        позволяет обходить пользователей одного пояса. timezones хранит
+        текущий день каждого смещения. Имеющиеся пользователи получают
+        смещение по умолчанию. Здесь добавляется только строка нового
+        смещения по умолчанию: дни уже известных смещений сдвигает
+        roll_days, чтобы пропущенная за время простоя полночь сбросила
+        прерванные серии (DayRollover)
+
+        :param cursor: Курсор соединения, в котором применяются миграции
+        :type cursor: sqlite3.Cursor
+        """
+
+        cursor.execute(
+            """
+            SELECT 1 FROM sqlite_master
+            WHERE type = 'table' AND name = 'users'
+            """
+        )
+        exists = cursor.fetchone()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                user_id INTEGER PRIMARY KEY,
+                utc_offset INTEGER NOT NULL
+            )
+        """
+        )
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_users_offset
+            ON users (utc_offset)
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS timezones (
+                utc_offset INTEGER PRIMARY KEY,
+                today INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """
+        )
+        if not exists:
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO users (user_id, utc_offset)
+                SELECT DISTINCT user_id, ? FROM habits
+                """,
+                (self.utc_offset,),
+            )
+        cursor.execute(
+            f"""
+            INSERT OR IGNORE INTO timezones (utc_offset, today)
+            VALUES (
+                :offset,
+                {SQL_DAY.format(":now, :offset || ' minutes'")}
+            )
+            """,
+            {"offset": self.utc_offset, "now": self._utc_now()},
+        )
+
+    @staticmethod
+    def _utc_now(now: Optional[datetime] = None) -> str:
+        """
+        Момент времени в UTC в формате, понятном функциям дат SQLite
+
+        :param now: Момент времени с часовым поясом (по умолчанию сейчас)
+        :type now: datetime или None
+        :returns: Строка YYYY-MM-DD HH:MM:SS
+        :type: str
+        """
+
+        now = now or datetime.now(timezone.utc)
+        return now.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+    def add_habit(
+        self, uid: int, name: str, schedule: Schedule = DAILY_SCHEDULE
+    ) -> int:
         """
         Добавление новой привычки для пользователя
 
@@ -93,6 +770,8 @@ class Database:
         :type uid: int
         :param name: Название привычки
         :type name: str
+        :param schedule: Расписание привычки (по умолчанию каждый день)
+        :type schedule: Schedule
         :returns: ID созданной привычки
         :type: int
         :raises DBError: Если привычка с таким названием уже существует или произошла ошибка БД
@@ -100,61 +779,346 @@ class Database:
 
         name = name.strip()
         try:
-            conn = self.connect()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT id FROM habits WHERE user_id = ? AND name = ?",
-                (uid, name),
-            )
-            if cursor.fetchone():
-                raise DBError("Habit with this name already exists")
-            cursor.execute(
-                """
-                INSERT INTO habits (user_id, name, created_at) 
-                VALUES (?, ?, ?)
-                """,
-                (uid, name, datetime.now()),
-            )
-            id = cursor.lastrowid
-            conn.commit()
-            return id
+            with self.writer() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT id FROM habits WHERE user_id = ? AND name = ?",
+                    (uid, name),
+                )
+                if cursor.fetchone():
+                    raise DBError("Habit with this name already exists")
+                # пояс пользователя нужен триггеру статистики
+                cursor.execute(
+                    """
+                    INSERT OR IGNORE INTO users (user_id, utc_offset)
+                    VALUES (?, ?)
+                    """,
+                    (uid, self.utc_offset),
+                )
+                cursor.execute(
+                    """
+                    INSERT INTO habits (
+                        user_id, name, created_at, schedule_kind, schedule_value
+                    )
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (uid, name, datetime.now().isoformat(" "), *schedule),
+                )
+                id = cursor.lastrowid
+                conn.commit()
+                self.leaderboard.update(LeaderboardEntry(id, uid, 0))
+                return id
         except Exception as e:
-            logger.error(f"Error while adding new habit: {e}")
+            logger.error("Error while adding new habit: %s", e)
             raise DBError(f"Error while adding new habit: {e}")
 
-    def get_user_habits(self, user_id: int) -> List[dict]:
+    def get_user_habits(self, user_id: int) -> List[Habit]:
         """
         Получение списка привычек пользователя
 
         :param user_id: ID пользователя
         :type user_id: int
         :returns: Список привычек пользователя
-        :type: List[dict]
+        :type: List[Habit]
         :raises DBError: Если произошла ошибка при получении привычек
         """
         try:
-            conn = self.connect()
-            cursor = conn.cursor()
+            with self.reader() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = habit_row_factory
 
-            cursor.execute(
-                """
-                SELECT 
-                    id, name, created_at, last_completed,
-                    current_streak, total_completions
-                FROM habits 
-                WHERE user_id = ? 
-                ORDER BY current_streak DESC, name
-                """,
-                (user_id,),
-            )
-            habits = []
-            for row in cursor.fetchall():
-                habits.append(dict(row))
-            return habits
+                cursor.execute(
+                    f"""
+                    SELECT {HABIT_COLUMNS}
+                    FROM habits 
+                    WHERE user_id = ? 
+                    ORDER BY current_streak DESC, name
+                    """,
+                    (user_id,),
+                )
+                return cursor.fetchall()
         except Exception as e:
-            logger.error(f"Get habits error: {e}")
+            logger.error("Get habits error: %s", e)
             raise DBError(f"Get habits error: {e}")
 
+    def get_user_ids(self, after: int = 0, limit: int = 1000) -> List[int]:
+        """
+        Получение порции ID пользователей, у которых есть привычки
+
+        Порции читаются по возрастанию ID (keyset), следующая порция
+        начинается после последнего ID предыдущей
+
+        :param after: ID, после которого начинается порция
+        :type after: int
+        :param limit: Размер порции
+        :type limit: int
+        :returns: ID пользователей по возрастанию
+        :type: List[int]
+        :raises DBError: Если произошла ошибка при получении пользователей
+        """
+
+        try:
+            with self.reader() as conn:
+                return [
+                    row[0]
+                    for row in conn.execute(
+                        """
+                        SELECT DISTINCT user_id FROM habits
+                        WHERE user_id > ?
+                        ORDER BY user_id
+                        LIMIT ?
+                        """,
+                        (after, limit),
+                    )
+                ]
+        except Exception as e:
+            logger.error("Get user ids error: %s", e)
+            raise DBError(f"Get user ids error: {e}")
+
+    def set_user_offset(self, uid: int, utc_offset: int) -> date:
+        """
+        Установка часового пояса пользователя
+
+        Для нового смещения в timezones добавляется его текущий день
+
+        :param uid: ID пользователя
+        :type uid: int
+        :param utc_offset: Смещение от UTC в минутах
+        :type utc_offset: int
+        :returns: Текущий день пользователя в новом часовом поясе
+        :type: date
+        :raises DBError: Если произошла ошибка при сохранении
+        """
+
+        try:
+            with self.writer() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    """
+                    INSERT INTO users (user_id, utc_offset) VALUES (?, ?)
+                    ON CONFLICT (user_id) DO UPDATE
+                    SET utc_offset = excluded.utc_offset
+                    """,
+                    (uid, utc_offset),
+                )
+                conn.execute(
+                    f"""
+                    INSERT OR IGNORE INTO timezones (utc_offset, today)
+                    VALUES (
+                        :offset,
+                        {SQL_DAY.format(":now, :offset || ' minutes'")}
+                    )
+                    """,
+                    {"offset": utc_offset, "now": self._utc_now()},
+                )
+                today = conn.execute(
+                    "SELECT today FROM timezones WHERE utc_offset = ?",
+                    (utc_offset,),
+                ).fetchone()[0]
+                conn.commit()
+                return date.fromordinal(today)
+        except Exception as e:
+            logger.error("Set user offset error: %s", e)
+            raise DBError(f"Set user offset error: {e}")
+
+    def get_user_offset(self, uid: int) -> int:
+        """
+        Получение часового пояса пользователя
+
+        :param uid: ID пользователя
+        :type uid: int
+        :returns: Смещение от UTC в минутах (по умолчанию utc_offset)
+        :type: int
+        :raises DBError: Если произошла ошибка при получении
+        """
+
+        try:
+            with self.reader() as conn:
+                row = conn.execute(
+                    "SELECT utc_offset FROM users WHERE user_id = ?", (uid,)
+                ).fetchone()
+                return self.utc_offset if row is None else row[0]
+        except Exception as e:
+            logger.error("Get user offset error: %s", e)
+            raise DBError(f"Get user offset error: {e}")
+
+    def get_user_today(self, uid: int) -> date:
+        """
+        Текущий день пользователя по его часовому поясу
+
+        :param uid: ID пользователя
+        :type uid: int
+        :returns: Дата
+        :type: date
+        :raises DBError: Если произошла ошибка при получении
+        """
+
+        try:
+            with self.reader() as conn:
+                today = conn.execute(
+                    f"SELECT {SQL_USER_TODAY.format('?', '?')}",
+                    (uid, self.utc_offset),
+                ).fetchone()[0]
+                return date.fromordinal(today)
+        except Exception as e:
+            logger.error("Get user today error: %s", e)
+            raise DBError(f"Get user today error: {e}")
+
+    def roll_days(self, now: Optional[datetime] = None) -> List[int]:
+        """
+        Сдвиг текущих дней часовых поясов
+
+        Одним запросом пересчитывается день каждого смещения, изменяются
+        только строки поясов, где уже наступила полночь
+
+        :param now: Момент времени с часовым поясом (по умолчанию сейчас)
+        :type now: datetime или None
+        :returns: Смещения, у которых начался новый день
+        :type: List[int]
+        :raises DBError: Если произошла ошибка при обновлении
+        """
+
+        try:
+            with self.writer() as conn:
+                rolled = [
+                    row[0]
+                    for row in conn.execute(
+                        f"""
+                        UPDATE timezones SET today = {SQL_OFFSET_TODAY}
+                        WHERE today <> {SQL_OFFSET_TODAY}
+                        RETURNING utc_offset
+                        """,
+                        {"now": self._utc_now(now)},
+                    ).fetchall()
+                ]
+                conn.commit()
+                return sorted(rolled)
+        except Exception as e:
+            logger.error("Roll days error: %s", e)
+            raise DBError(f"Roll days error: {e}")
+
+    def get_due_habits(
+        self, user_id: int, day: Optional[date] = None
+    ) -> List[Habit]:
+        """
+        Получение привычек пользователя, которые нужно выполнить в этот день
+
+        Расписание проверяется в самом запросе: для дней недели - битом
+        маски, для "N раз в неделю" - счетчиком выполнений текущей недели,
+        для "раз в K дней" - датой последнего выполнения. Условие совпадает
+        с Schedule.is_due. День по умолчанию - текущий день часового
+        пояса пользователя, он подставляется в запрос из timezones
+
+        :param user_id: ID пользователя
+        :type user_id: int
+        :param day: День (по умолчанию сегодня у пользователя)
+        :type day: date или None
+        :returns: Невыполненные привычки, запланированные на день
+        :type: List[Habit]
+        :raises DBError: Если произошла ошибка при получении привычек
+        """
+
+        try:
+            with self.reader() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = habit_row_factory
+                cursor.execute(
+                    f"""
+                    WITH d(today) AS (
+                        SELECT COALESCE(
+                            :day, {SQL_USER_TODAY.format(":uid", ":default")}
+                        )
+                    )
+                    SELECT {HABIT_COLUMNS}
+                    FROM habits, d
+                    WHERE user_id = :uid
+                      AND (last_completed IS NULL OR last_completed <> today)
+                      AND CASE schedule_kind
+                          WHEN {WEEKDAYS}
+                              THEN schedule_value & (1 << (today - 1) % 7)
+                          WHEN {WEEKLY} THEN last_completed IS NULL
+                              OR last_completed < today - (today - 1) % 7
+                              OR week_count < schedule_value
+                          WHEN {INTERVAL} THEN last_completed IS NULL
+                              OR today - last_completed >= schedule_value
+                          ELSE 1
+                      END
+                    ORDER BY current_streak DESC, name
+                    """,
+                    {
+                        "uid": user_id,
+                        "day": day.toordinal() if day else None,
+                        "default": self.utc_offset,
+                    },
+                )
+                return cursor.fetchall()
+        except Exception as e:
+            logger.error("Get due habits error: %s", e)
+            raise DBError(f"Get due habits error: {e}")
+
+    def search_habits(
+        self, uid: int, query: str, limit: int = 10
+    ) -> List[Habit]:
+        """
+        Поиск привычек пользователя по части названия
+
+        Запросы от трех символов выполняются по trigram-индексу habits_fts,
+        более короткие - фильтрацией привычек пользователя
+
+        :param uid: ID пользователя
+        :type uid: int
+        :param query: Часть названия привычки
+        :type query: str
+        :param limit: Максимальное количество результатов
+        :type limit: int
+        :returns: Найденные привычки, упорядоченные по названию
+        :type: List[Habit]
+        :raises DBError: Если произошла ошибка при поиске
+        """
+
+        query = query.strip()
+        if not query:
+            return []
+        try:
+            with self.reader() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = habit_row_factory
+                if len(query) >= 3:
+                    phrase = query.replace('"', '""')
+                    cursor.execute(
+                        f"""
+                        SELECT {HABIT_COLUMNS}
+                        FROM habits
+                        WHERE id IN (
+                            SELECT rowid FROM habits_fts WHERE habits_fts MATCH ?
+                        )
+                        ORDER BY name
+                        LIMIT ?
+                        """,
+                        (f'owner:"#{uid}#" AND name:"{phrase}"', limit),
+                    )
+                    return cursor.fetchall()
+
+                cursor.execute(
+                    f"""
+                    SELECT {HABIT_COLUMNS}
+                    FROM habits
+                    WHERE user_id = ?
+                    ORDER BY name
+                    """,
+                    (uid,),
+                )
+                needle = query.casefold()
+                return [
+                    habit
+                    for habit in cursor.fetchall()
+                    if needle in habit.name.casefold()
+                ][:limit]
+        except Exception as e:
+            logger.error("Search habits error: %s", e)
+            raise DBError(f"Search habits error: {e}")
+
     def delete_habit(self, uid: int, hid: int) -> bool:
         """
         Удаление привычки пользователя
@@ -169,96 +1133,635 @@ class Database:
         """
 
         try:
-            conn = self.connect()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT id FROM habits WHERE id = ? AND user_id = ?",
-                (hid, uid),
-            )
-            exist = cursor.fetchone()
-            if not exist:
-                raise DBError(f"Habit with id:{hid} don't exist")
-            cursor.execute(
-                "DELETE FROM habits WHERE id = ? AND user_id = ?", (hid, uid)
-            )
-            conn.commit()
-            return True
+            with self.writer() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT id FROM habits WHERE id = ? AND user_id = ?",
+                    (hid, uid),
+                )
+                exist = cursor.fetchone()
+                if not exist:
+                    raise DBError(f"Habit with id:{hid} don't exist")
+                cursor.execute(
+                    "DELETE FROM habits WHERE id = ? AND user_id = ?",
+                    (hid, uid),
+                )
+                conn.commit()
+                self.leaderboard.remove(hid)
+                return True
         except Exception as e:
-            logger.error(f"Delet habit error: {e}")
+            logger.error("Delet habit error: %s", e)
             raise DBError(f"Delete habit error: {e}")
 
-    def complete_habit(self, hid: int, uid: int) -> dict:
+    def complete_habit(
+        self, hid: int, uid: int, day: Optional[date] = None
+    ) -> dict:
         """
         Отметка выполнения привычки
 
-        Обновляет статистику привычки: текущую серию, общее количество выполнений,
-        дату последнего выполнения
+        Обновляет статистику привычки: текущую и лучшую серию, общее количество
+        выполнений, дату последнего выполнения
 
         :param hid: ID привычки
         :type hid: int
         :param uid: ID пользователя
         :type uid: int
+        :param day: Дата выполнения (по умолчанию сегодня)
+        :type day: date или None
         :returns: Обновленные данные привычки
         :type: dict
         :raises DBError: Если привычка не найдена, уже выполнена сегодня или произошла ошибка БД
         """
 
         try:
-            conn = self.connect()
-            cursor = conn.cursor()
-            try:
-                cursor.execute(
-                    "SELECT * FROM habits WHERE id = ? AND user_id = ?",
-                    (hid, uid),
-                )
-                habit = cursor.fetchone()
-            except Exception as e:
-                raise DBError(f"Habit not found error: {e}")
+            with self.writer() as conn:
+                # чтение и запись в одной транзакции: другой процесс
+                # не выполнит привычку между проверкой и обновлением
+                conn.execute("BEGIN IMMEDIATE")
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(
+                        f"""
+                    SELECT *, COALESCE(
+                        ?, {SQL_USER_TODAY.format("habits.user_id", "?")}
+                    ) AS today
+                    FROM habits
+                    WHERE id = ? AND user_id = ?
+                    """,
+                        (
+                            day.toordinal() if day else None,
+                            self.utc_offset,
+                            hid,
+                            uid,
+                        ),
+                    )
+                    habit = cursor.fetchone()
+                except Exception as e:
+                    raise DBError(f"Habit not found error: {e}")
+                if habit is None:
+                    raise DBError(f"Habit with id:{hid} not found")
 
-            try:
                 last_completed = habit["last_completed"]
-            except:
-                raise KeyError
-            today = datetime.now().date().isoformat()
-            if last_completed is not None and last_completed == today:
-                raise DBError("Habit is completed today")
-
-            if last_completed:
-                last_date = datetime.strptime(
-                    last_completed, "%Y-%m-%d"
-                ).date()
-                days_diff = (datetime.now().date() - last_date).days
-                if days_diff == 1:
-                    new_streak = habit.get("current_streak", 0) + 1
-                else:
-                    new_streak = 1
-            else:
-                new_streak = 1
+                today = habit["today"]
+                if last_completed is not None and last_completed == today:
+                    raise DBError("Habit is completed today")
 
-            try:
+                state = StreakState(
+                    habit["current_streak"],
+                    habit["longest_streak"],
+                    last_completed,
+                    habit["week_count"],
+                )
+                schedule = Schedule(
+                    habit["schedule_kind"], habit["schedule_value"]
+                )
+                state = advance(state, today, schedule)
+
+                try:
+                    cursor.execute(
+                        """
+                    UPDATE habits
+                    SET last_completed = ?,
+                        current_streak = ?,
+                        longest_streak = ?,
+                        week_count = ?,
+                        total_completions = total_completions + 1
+                    WHERE id = ? AND user_id = ?
+                    """,
+                        (
+                            today,
+                            state.current,
+                            state.longest,
+                            state.count,
+                            hid,
+                            uid,
+                        ),
+                    )
+                    cursor.execute(
+                        """
+                    INSERT INTO completions (habit_id, completion_date)
+                    VALUES (?, ?)
+                    """,
+                        (hid, today),
+                    )
+                except Exception as e:
+                    raise DBError(f"Habit update error: {e}")
+                try:
+                    cursor.execute(
+                        "SELECT * FROM habits WHERE id = ? AND user_id = ?",
+                        (hid, uid),
+                    )
+                    updated_habit = dict(cursor.fetchone())
+                    updated_habit["last_completed"] = to_date(
+                        updated_habit["last_completed"]
+                    )
+                except Exception as e:
+                    raise DBError(f"New habit get error: {e}")
+                conn.commit()
+                self.leaderboard.update(
+                    LeaderboardEntry(hid, uid, state.current)
+                )
+                return updated_habit
+        except Exception as e:
+            logger.error("Habit complete error: %s", e)
+            raise DBError(f"Habit complete error: {e}")
+
+    def complete_habits(
+        self, uid: int, hids: List[int], day: Optional[date] = None
+    ) -> List[Habit]:
+        """
+        Отметка выполнения нескольких привычек одной транзакцией
+
+        Привычки, уже выполненные сегодня или не принадлежащие пользователю,
+        пропускаются
+
+        :param uid: ID пользователя
+        :type uid: int
+        :param hids: ID привычек
+        :type hids: List[int]
+        :param day: Дата выполнения (по умолчанию сегодня)
+        :type day: date или None
+        :returns: Обновленные данные выполненных привычек
+        :type: List[Habit]
+        :raises DBError: Если произошла ошибка БД
+        """
+
+        hids = list(dict.fromkeys(hids))
+        if not hids:
+            return []
+        placeholders = ", ".join("?" * len(hids))
+        try:
+            with self.writer() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
                 cursor.execute(
+                    f"""
+                    SELECT id, current_streak, longest_streak, last_completed,
+                           week_count, schedule_kind, schedule_value,
+                           COALESCE(
+                               ?,
+                               {SQL_USER_TODAY.format("habits.user_id", "?")}
+                           )
+                    FROM habits
+                    WHERE user_id = ? AND id IN ({placeholders})
+                    """,
+                    (
+                        day.toordinal() if day else None,
+                        self.utc_offset,
+                        uid,
+                        *hids,
+                    ),
+                )
+                updates = []
+                for hid, *counters, kind, value, today in cursor.fetchall():
+                    state = StreakState(*counters)
+                    if state.last == today:
+                        continue
+                    state = advance(state, today, Schedule(kind, value))
+                    updates.append(
+                        (
+                            today,
+                            state.current,
+                            state.longest,
+                            state.count,
+                            hid,
+                            uid,
+                        )
+                    )
+
+                cursor.executemany(
                     """
-                UPDATE habits 
-                SET last_completed = ?,
-                    current_streak = ?,
-                    total_completions = total_completions + 1
-                WHERE id = ? AND user_id = ?
-                """,
-                    (today, new_streak, hid, uid),
+                    UPDATE habits
+                    SET last_completed = ?,
+                        current_streak = ?,
+                        longest_streak = ?,
+                        week_count = ?,
+                        total_completions = total_completions + 1
+                    WHERE id = ? AND user_id = ?
+                    """,
+                    updates,
                 )
-            except Exception as e:
-                raise DBError(f"Habit update error: {e}")
-            conn.commit()
-            try:
-                cursor.execute(
-                    "SELECT * FROM habits WHERE id = ? AND user_id = ?",
-                    (hid, uid),
+                completed = [update[4] for update in updates]
+                cursor.executemany(
+                    """
+                    INSERT INTO completions (habit_id, completion_date)
+                    VALUES (?, ?)
+                    """,
+                    [(update[4], update[0]) for update in updates],
                 )
-                updated_habit = cursor.fetchone()
+                habits = []
+                if updates:
+                    cursor.row_factory = habit_row_factory
+                    cursor.execute(
+                        f"""
+                        SELECT {HABIT_COLUMNS}
+                        FROM habits
+                        WHERE user_id = ?
+                          AND id IN ({", ".join("?" * len(completed))})
+                        ORDER BY current_streak DESC, name
+                        """,
+                        (uid, *completed),
+                    )
+                    habits = cursor.fetchall()
+                conn.commit()
+                for _, current, _, _, hid, _ in updates:
+                    self.leaderboard.update(
+                        LeaderboardEntry(hid, uid, current)
+                    )
+                return habits
+        except Exception as e:
+            logger.error("Habits batch complete error: %s", e)
+            raise DBError(f"Habits batch complete error: {e}")
 
-                return dict(updated_habit)
-            except Exception as e:
-                raise DBError(f"New habit get error: {e}")
+    def get_completion_history(
+        self, uid: int, hid: Optional[int] = None, since: Optional[date] = None
+    ) -> List[Tuple[int, date]]:
+        """
+        Получение истории выполнений привычек пользователя
+
+        История читается из представления completion_history, которое
+        объединяет оперативную таблицу completions и архив
+
+        :param uid: ID пользователя
+        :type uid: int
+        :param hid: ID привычки (по умолчанию все привычки пользователя)
+        :type hid: int или None
+        :param since: Начальная дата (включительно)
+        :type since: date или None
+        :returns: Пары (ID привычки, дата выполнения) по возрастанию даты
+        :type: List[Tuple[int, date]]
+        :raises DBError: Если произошла ошибка при получении истории
+        """
+
+        query = """
+            SELECT c.habit_id, c.completion_date
+            FROM completion_history c
+            JOIN habits h ON h.id = c.habit_id
+            WHERE h.user_id = ?
+        """
+        params: list = [uid]
+        if hid is not None:
+            query += " AND c.habit_id = ?"
+            params.append(hid)
+        if since is not None:
+            query += " AND c.completion_date >= ?"
+            params.append(since.toordinal())
+        query += " ORDER BY c.completion_date, c.habit_id"
+        try:
+            with self.reader() as conn:
+                return [
+                    (hid, date.fromordinal(day))
+                    for hid, day in conn.execute(query, params)
+                ]
         except Exception as e:
-            logger.error(f"Habit complete error: {e}")
-            raise DBError(f"Habit complete error: {e}")
+            logger.error("Get completion history error: %s", e)
+            raise DBError(f"Get completion history error: {e}")
+
+    def archive_completions(self, before: date, batch: int = 5000) -> int:
+        """
+        Перенос выполнений старше заданной даты в архив
+
+        Перенос идет порциями по batch строк, каждая порция - отдельная
+        транзакция, поэтому блокировка записи не удерживается надолго.
+        Агрегаты в habits (total_completions, серии) и сводная статистика
+        не пересчитываются и остаются корректными. Заодно удаляются
+        отметки daily_active старше той же даты
+
+        :param before: Дата, более ранние выполнения переносятся в архив
+        :type before: date
+        :param batch: Размер порции
+        :type batch: int
+        :returns: Количество перенесенных выполнений
+        :type: int
+        :raises DBError: Если произошла ошибка при переносе
+        """
+
+        moved = 0
+        before = before.toordinal()
+        try:
+            while True:
+                with self.writer() as conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    cursor = conn.cursor()
+                    cursor.row_factory = None
+                    cursor.execute(
+                        """
+                        SELECT habit_id, completion_date
+                        FROM completions
+                        WHERE completion_date < ?
+                        LIMIT ?
+                        """,
+                        (before, batch),
+                    )
+                    rows = cursor.fetchall()
+                    if not rows:
+                        # отметки активности нужны только для подсчета
+                        # активных пользователей за текущие дни
+                        cursor.execute(
+                            "DELETE FROM daily_active WHERE day < ?",
+                            (before,),
+                        )
+                        conn.commit()
+                        return moved
+                    cursor.executemany(
+                        """
+                        INSERT OR IGNORE INTO completions_archive
+                            (habit_id, completion_date)
+                        VALUES (?, ?)
+                        """,
+                        rows,
+                    )
+                    cursor.executemany(
+                        """
+                        DELETE FROM completions
+                        WHERE habit_id = ? AND completion_date = ?
+                        """,
+                        rows,
+                    )
+                    conn.commit()
+                    moved += len(rows)
+        except Exception as e:
+            logger.error("Archive completions error: %s", e)
+            raise DBError(f"Archive completions error: {e}")
+
+    def recompute_streaks(self, chunk: int = 1000) -> int:
+        """
+        Пересчет серий и счетчиков всех привычек по истории выполнений
+
+        Привычки обрабатываются порциями по chunk штук, каждая порция -
+        отдельная транзакция. История порции (оперативная и архивная)
+        группируется в серии дней подряд на стороне SQLite, в Python
+        сворачиваются только серии. Серии, прерванные к текущему дню
+        пользователя, сбрасываются, как это делает rollover_streaks
+
+        :param chunk: Размер порции привычек
+        :type chunk: int
+        :returns: Количество обработанных привычек
+        :type: int
+        :raises DBError: Если произошла ошибка при пересчете
+        """
+
+        processed = 0
+        last_id = 0
+        try:
+            while True:
+                with self.writer() as conn:
+                    # выполнение из другого процесса между чтением истории
+                    # и записью счетчиков было бы потеряно
+                    conn.execute("BEGIN IMMEDIATE")
+                    schedules, days = {}, {}
+                    for hid, kind, value, today in conn.execute(
+                        f"""
+                        SELECT id, schedule_kind, schedule_value,
+                               {SQL_USER_TODAY.format("habits.user_id", "?")}
+                        FROM habits
+                        WHERE id > ?
+                        ORDER BY id
+                        LIMIT ?
+                        """,
+                        (self.utc_offset, last_id, chunk),
+                    ):
+                        schedules[hid] = Schedule(kind, value)
+                        days[hid] = today
+                    ids = list(schedules)
+                    if not ids:
+                        conn.commit()
+                        self.leaderboard.invalidate()
+                        logger.info("Streaks recomputed: %d habits", processed)
+                        return processed
+
+                    states = dict.fromkeys(ids, StreakState())
+                    totals = dict.fromkeys(ids, 0)
+                    # дни подряд группируются в серии: у них совпадает
+                    # разность номера дня и номера строки
+                    runs = conn.cursor()
+                    runs.row_factory = None
+                    runs.execute(
+                        """
+                        SELECT habit_id, MIN(day), MAX(day)
+                        FROM (
+                            SELECT habit_id, completion_date AS day,
+                                   completion_date - ROW_NUMBER() OVER (
+                                       PARTITION BY habit_id
+                                       ORDER BY completion_date
+                                   ) AS run
+                            FROM completion_history
+                            WHERE habit_id BETWEEN ? AND ?
+                        )
+                        GROUP BY habit_id, run
+                        ORDER BY habit_id, run
+                        """,
+                        (ids[0], ids[-1]),
+                    )
+                    for hid, first, last in runs:
+                        states[hid] = extend_run(
+                            states[hid], first, last, schedules[hid]
+                        )
+                        totals[hid] += last - first + 1
+                    for hid, state in states.items():
+                        if broken(state, days[hid], schedules[hid]):
+                            states[hid] = state._replace(current=0)
+
+                    conn.executemany(
+                        """
+                        UPDATE habits
+                        SET last_completed = ?,
+                            current_streak = ?,
+                            longest_streak = ?,
+                            week_count = ?,
+                            total_completions = ?
+                        WHERE id = ?
+                        """,
+                        [
+                            (
+                                state.last,
+                                state.current,
+                                state.longest,
+                                state.count,
+                                totals[hid],
+                                hid,
+                            )
+                            for hid, state in states.items()
+                        ],
+                    )
+                    conn.commit()
+                processed += len(ids)
+                last_id = ids[-1]
+        except Exception as e:
+            logger.error("Recompute streaks error: %s", e)
+            raise DBError(f"Recompute streaks error: {e}")
+
+    def rollover_streaks(self, utc_offset: int, chunk: int = 1000) -> int:
+        """
+        Сброс прерванных серий пользователей одного часового пояса
+
+        Вызывается, когда в поясе начался новый день. Пользователи пояса
+        обходятся порциями по индексу смещения, серия сбрасывается, если
+        выполнение сегодня уже не продолжило бы ее (advance начинает
+        новую серию)
+
+        :param utc_offset: Смещение от UTC в минутах
+        :type utc_offset: int
+        :param chunk: Размер порции пользователей
+        :type chunk: int
+        :returns: Количество сброшенных серий
+        :type: int
+        :raises DBError: Если произошла ошибка при сбросе
+        """
+
+        reset = 0
+        last_uid = 0
+        try:
+            while True:
+                with self.writer() as conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    uids = [
+                        row[0]
+                        for row in conn.execute(
+                            """
+                            SELECT user_id FROM users
+                            WHERE utc_offset = ? AND user_id > ?
+                            ORDER BY user_id
+                            LIMIT ?
+                            """,
+                            (utc_offset, last_uid, chunk),
+                        )
+                    ]
+                    if not uids:
+                        conn.commit()
+                        return reset
+                    rows = conn.execute(
+                        f"""
+                        SELECT h.id, h.current_streak, h.longest_streak,
+                               h.last_completed, h.week_count,
+                               h.schedule_kind, h.schedule_value, t.today
+                        FROM habits h, timezones t
+                        WHERE t.utc_offset = ?
+                          AND h.user_id IN ({", ".join("?" * len(uids))})
+                          AND h.current_streak > 0
+                          AND h.last_completed < t.today
+                        """,
+                        (utc_offset, *uids),
+                    ).fetchall()
+                    streaks = [
+                        (hid,)
+                        for hid, *counters, kind, value, today in rows
+                        if broken(
+                            StreakState(*counters),
+                            today,
+                            Schedule(kind, value),
+                        )
+                    ]
+                    conn.executemany(
+                        "UPDATE habits SET current_streak = 0 WHERE id = ?",
+                        streaks,
+                    )
+                    conn.commit()
+                if streaks:
+                    self.leaderboard.invalidate()
+                reset += len(streaks)
+                last_uid = uids[-1]
+        except Exception as e:
+            logger.error("Rollover streaks error: %s", e)
+            raise DBError(f"Rollover streaks error: {e}")
+
+    def get_stats(self, day: Optional[date] = None) -> DailyStats:
+        """
+        Получение сводной статистики бота
+
+        Читаются только строки сводных таблиц, поэтому время не зависит
+        от количества привычек и выполнений. Дни статистики - дни
+        пользователей по их часовым поясам, по умолчанию берется текущий
+        день пояса utc_offset, а не дата сервера
+
+        :param day: День статистики (по умолчанию сегодня в поясе
+            utc_offset)
+        :type day: date или None
+        :returns: Статистика за день и за все время
+        :type: DailyStats
+        :raises DBError: Если произошла ошибка при получении статистики
+        """
+
+        try:
+            with self.reader() as conn:
+                if day is None:
+                    day = date.fromordinal(
+                        conn.execute(
+                            "SELECT today FROM timezones WHERE utc_offset = ?",
+                            (self.utc_offset,),
+                        ).fetchone()[0]
+                    )
+                daily = conn.execute(
+                    """
+                    SELECT active_users, completions, habits_created
+                    FROM stats_daily
+                    WHERE day = ?
+                    """,
+                    (day.toordinal(),),
+                ).fetchone()
+                totals = conn.execute(
+                    "SELECT habits, completions FROM stats_totals WHERE id = 1"
+                ).fetchone()
+                return DailyStats(day, *(daily or (0, 0, 0)), *totals)
+        except Exception as e:
+            logger.error("Get stats error: %s", e)
+            raise DBError(f"Get stats error: {e}")
+
+    def top_streaks(
+        self, limit: Optional[int] = None
+    ) -> List[Tuple[LeaderboardEntry, str]]:
+        """
+        Получение таблицы лидеров по текущей серии
+
+        Топ хранится в памяти и загружается из БД при первом обращении
+        по индексу idx_habits_current_streak. Из БД читаются только
+        названия привычек топа
+
+        :param limit: Количество привычек (по умолчанию размер топа)
+        :type limit: int или None
+        :returns: Пары (привычка топа, название привычки)
+        :type: List[Tuple[LeaderboardEntry, str]]
+        :raises DBError: Если произошла ошибка при получении топа
+        """
+
+        try:
+            if not self.leaderboard.loaded:
+                # загрузка под блокировкой записи, чтобы не пропустить
+                # выполнения между чтением и загрузкой топа
+                with self.writer() as conn:
+                    if not self.leaderboard.loaded:
+                        rows = conn.execute(
+                            """
+                            SELECT id, user_id, current_streak
+                            FROM habits
+                            ORDER BY current_streak DESC, id
+                            LIMIT ?
+                            """,
+                            (self.leaderboard.capacity,),
+                        )
+                        self.leaderboard.load(
+                            [LeaderboardEntry(*row) for row in rows]
+                        )
+
+            entries = self.leaderboard.top(limit)
+            if not entries:
+                return []
+            with self.reader() as conn:
+                names = dict(
+                    conn.execute(
+                        f"""
+                        SELECT id, name FROM habits
+                        WHERE id IN ({", ".join("?" * len(entries))})
+                        """,
+                        [entry.habit_id for entry in entries],
+                    ).fetchall()
+                )
+            return [
+                (entry, names[entry.habit_id])
+                for entry in entries
+                if entry.habit_id in names
+            ]
+        except Exception as e:
+            logger.error("Get top streaks error: %s", e)
+            raise DBError(f"Get top streaks error: {e}")
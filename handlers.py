@@ -1,19 +1,39 @@
 from db import Database
-from telegram import Update, ReplyKeyboardMarkup
+from telegram import (
+    Update,
+    ReplyKeyboardMarkup,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+)
 from telegram.ext import (
     ContextTypes,
     ConversationHandler,
     MessageHandler,
     CommandHandler,
+    CallbackQueryHandler,
     filters,
 )
 import config
 from exceptions import TGBotError, ServiceError
+from keyboards import COMPLETE_KB, DELETE_KB, KeyboardCache
+from profiling import MODES, Profiler, parse_limit
+from router import TextRouter
+from schedules import parse_schedule
+from timezones import format_offset, parse_offset
 import re
-from typing import List
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
+from typing import FrozenSet, List, Optional
+
+ADD_HABIT, DELETE_SELECT, DELETE_CONFIRM, SEARCH_QUERY, ADD_SCHEDULE = range(
+    5
+)
 
-ADD_HABIT, DELETE_SELECT, DELETE_CONFIRM = range(3)
+COMPLETE_PATTERN = r"☑️ .*\(ID: \d+\)"
+DELETE_PATTERN = r"🗑️ .*\(ID: \d+\)"
+
+BATCH_PREFIX = "batch:"
+BATCH_DONE = BATCH_PREFIX + "done"
+BATCH_CANCEL = BATCH_PREFIX + "cancel"
 
 
 class Handler:
@@ -24,10 +44,25 @@ class Handler:
     :type db: Database
     :ivar kb: Клавиатура по умолчанию для всех сообщений
     :type kb: ReplyKeyboardMarkup
+    :ivar admin_ids: ID пользователей, которым доступны команды /stats
+        и /profile
+    :type admin_ids: FrozenSet[int]
+    :ivar profiler: Профилировщик обработчиков для команды /profile
+    :type profiler: Profiler или None
+    :ivar keyboards: Кэш клавиатур выполнения и удаления привычек
+    :type keyboards: KeyboardCache
     """
 
-    def __init__(self, db: Database):
+    def __init__(
+        self,
+        db: Database,
+        admin_ids: FrozenSet[int] = frozenset(),
+        profiler: Optional[Profiler] = None,
+    ):
         self.db = db
+        self.admin_ids = admin_ids
+        self.profiler = profiler
+        self.keyboards = KeyboardCache()
         self.kb = ReplyKeyboardMarkup(
             config.kb_btns, resize_keyboard=True, one_time_keyboard=False
         )
@@ -42,19 +77,10 @@ class Handler:
 
         return self.kb
 
-    def format_date(self, date: str) -> str:
-        if not date:
+    def format_date(self, day: Optional[date]) -> str:
+        if day is None:
             return "Никогда"
-        try:
-            if "-" in date:
-                parts = date.split("-")
-                if len(parts[0]) == 4:
-                    return f"{parts[2]}.{parts[1]}.{parts[0]}"
-                elif len(parts[2]) == 4:
-                    return date
-            return date
-        except Exception as e:
-            raise ServiceError("Date format error")
+        return day.strftime(config.ui_date_format)
 
     def get_habit_id(self, text) -> int:
         match = re.search(r"\(ID\s*:\s*(\d+)\)", text)
@@ -62,6 +88,25 @@ class Handler:
             raise ServiceError(f"Invalid format data error")
         return int(match.group(1))
 
+    def user_today(self, uid: int) -> date:
+        """
+        Текущий день пользователя по его часовому поясу
+
+        Смещение пояса читается из базы один раз и хранится в кэше
+        клавиатур, поэтому повторное открытие списков не обращается к базе
+
+        :param uid: ID пользователя
+        :type uid: int
+        :returns: Дата
+        :type: date
+        """
+
+        offset = self.keyboards.offset(uid)
+        if offset is None:
+            offset = self.db.get_user_offset(uid)
+            self.keyboards.set_offset(uid, offset)
+        return (datetime.now(timezone.utc) + timedelta(minutes=offset)).date()
+
     async def start(
         self, update: Update, ctx: ContextTypes.DEFAULT_TYPE
     ) -> None:
@@ -122,25 +167,57 @@ class Handler:
         except Exception as e:
             raise TGBotError(f"Ошибка отправки сообщения: {str(e)}")
 
-    def get_message_handlers(self) -> List[MessageHandler]:
+    def get_message_handlers(self) -> List[TextRouter]:
         """
         Возвращает список обработчиков сообщений
 
+        Кнопки основной клавиатуры разбираются одним поиском в словаре,
+        регулярное выражение проверяется только для остальных сообщений
+
         :returns: Список обработчиков сообщений
-        :type: :List[MessageHandler]
+        :type: :List[TextRouter]
         """
 
         return [
-            MessageHandler(filters.Text("📋 Мои привычки"), self.habits_list),
-            MessageHandler(
-                filters.Text("✅ Выполнить привычку"),
-                self.habits_list_to_complete,
-            ),
-            MessageHandler(
-                filters.Regex(r"☑️ .*\(ID: \d+\)"), self.complete_habit
-            ),
-            MessageHandler(
-                filters.Text(config.back_btn_text), self.cancel_command
+            TextRouter(
+                {
+                    "📋 Мои привычки": self.habits_list,
+                    "✅ Выполнить привычку": self.habits_list_to_complete,
+                    "📝 Выполнить несколько": (
+                        self.habits_list_to_batch_complete
+                    ),
+                    config.back_btn_text: self.cancel_command,
+                },
+                [(COMPLETE_PATTERN, self.complete_habit)],
+            )
+        ]
+
+    def get_command_handlers(self) -> List[CommandHandler]:
+        """
+        Возвращает список обработчиков команд
+
+        :returns: Список обработчиков команд
+        :type: List[CommandHandler]
+        """
+
+        return [
+            CommandHandler("stats", self.stats_command),
+            CommandHandler("top", self.top_command),
+            CommandHandler("profile", self.profile_command),
+            CommandHandler("tz", self.timezone_command),
+        ]
+
+    def get_callback_handlers(self) -> List[CallbackQueryHandler]:
+        """
+        Возвращает список обработчиков нажатий inline-кнопок
+
+        :returns: Список обработчиков нажатий
+        :type: List[CallbackQueryHandler]
+        """
+
+        return [
+            CallbackQueryHandler(
+                self.batch_complete_callback, pattern=f"^{BATCH_PREFIX}"
             ),
         ]
 
@@ -152,11 +229,13 @@ class Handler:
         :type: list[ConversationHandler]
         """
 
+        cancel = [
+            TextRouter({config.back_btn_text: self.cancel_command}),
+            CommandHandler("cancel", self.cancel_command),
+        ]
         add_habit_dialog = ConversationHandler(
             entry_points=[
-                MessageHandler(
-                    filters.Text("➕ Добавить привычку"), self.start_add_habit
-                )
+                TextRouter({"➕ Добавить привычку": self.start_add_habit})
             ],
             states={
                 ADD_HABIT: [
@@ -164,29 +243,28 @@ class Handler:
                         filters.TEXT & ~filters.COMMAND, self.set_habit_name
                     )
                 ],
+                ADD_SCHEDULE: [
+                    MessageHandler(
+                        filters.TEXT & ~filters.COMMAND,
+                        self.set_habit_schedule,
+                    )
+                ],
             },
-            fallbacks=[
-                MessageHandler(
-                    filters.Text(config.back_btn_text), self.cancel_command
-                ),
-                CommandHandler("cancel", self.cancel_command),
-            ],
+            fallbacks=cancel,
         )
         delete_habit_dialog = ConversationHandler(
             entry_points=[
-                MessageHandler(
-                    filters.Text("🗑️ Удалить привычку"),
-                    self.habits_list_to_delete,
+                TextRouter(
+                    {"🗑️ Удалить привычку": self.habits_list_to_delete},
+                    [(DELETE_PATTERN, self.delete_confirm)],
                 )
             ],
             states={
                 DELETE_SELECT: [
-                    MessageHandler(
-                        filters.Regex(r"🗑️ .*\(ID: \d+\)"), self.delete_confirm
-                    ),
-                    MessageHandler(
-                        filters.Text(config.back_btn_text), self.cancel_command
-                    ),
+                    TextRouter(
+                        {config.back_btn_text: self.cancel_command},
+                        [(DELETE_PATTERN, self.delete_confirm)],
+                    )
                 ],
                 DELETE_CONFIRM: [
                     MessageHandler(
@@ -194,14 +272,23 @@ class Handler:
                     )
                 ],
             },
-            fallbacks=[
-                MessageHandler(
-                    filters.Text(config.back_btn_text), self.cancel_command
-                ),
-                CommandHandler("cancel", self.cancel_command),
+            fallbacks=cancel,
+        )
+        search_habit_dialog = ConversationHandler(
+            entry_points=[
+                TextRouter({"🔍 Найти привычку": self.start_search_habit})
             ],
+            states={
+                SEARCH_QUERY: [
+                    TextRouter({config.back_btn_text: self.cancel_command}),
+                    MessageHandler(
+                        filters.TEXT & ~filters.COMMAND, self.search_habit
+                    ),
+                ],
+            },
+            fallbacks=cancel,
         )
-        return [add_habit_dialog, delete_habit_dialog]
+        return [add_habit_dialog, delete_habit_dialog, search_habit_dialog]
 
     async def start_add_habit(
         self, update: Update, ctx: ContextTypes.DEFAULT_TYPE
@@ -247,27 +334,71 @@ class Handler:
         :type update: Update
         :param ctx: Контекст выполнения
         :type ctx: ContextTypes.DEFAULT_TYPE
-        :returns: Завершение диалога
+        :returns: Состояние выбора расписания или завершение диалога
         :type: int
-        :raises TGBotError: Если произошла ошибка при добавлении привычки в БД
         """
 
         habit_name = update.message.text.strip()
         if habit_name == config.back_btn_text:
             await self.reply(update, "Отмена добавления привычки")
             return ConversationHandler.END
+        if len(habit_name) < 5:
+            await self.reply(update, "Слишком короткое имя привычки")
+            return ConversationHandler.END
+        if len(habit_name) > 20:
+            await self.reply(update, "Слишком длинное имя привычки")
+            return ConversationHandler.END
+
+        ctx.user_data["new_habit"] = habit_name
+        await self.reply(
+            update,
+            config.schedule_prompt_msg,
+            ReplyKeyboardMarkup(config.schedule_btns, resize_keyboard=True),
+        )
+        return ADD_SCHEDULE
+
+    async def set_habit_schedule(
+        self, update: Update, ctx: ContextTypes.DEFAULT_TYPE
+    ) -> int:
+        """
+        Выбор расписания и сохранение новой привычки
+
+        :param update: Объект обновления от Telegram
+        :type update: Update
+        :param ctx: Контекст выполнения
+        :type ctx: ContextTypes.DEFAULT_TYPE
+        :returns: Повтор выбора расписания или завершение диалога
+        :type: int
+        :raises TGBotError: Если произошла ошибка при добавлении привычки в БД
+        """
+
+        text = update.message.text.strip()
+        if text == config.back_btn_text:
+            ctx.user_data.pop("new_habit", None)
+            await self.reply(update, "Отмена добавления привычки")
+            return ConversationHandler.END
         try:
-            if len(habit_name) < 5:
-                await self.reply(update, "Слишком короткое имя привычки")
-                return ConversationHandler.END
-            if len(habit_name) > 20:
-                await self.reply(update, "Слишком длинное имя привычки")
-                return ConversationHandler.END
-            self.db.add_habit(update.effective_user.id, habit_name)
+            schedule = parse_schedule(text)
+        except ValueError:
+            await self.reply(
+                update,
+                config.schedule_invalid_msg,
+                ReplyKeyboardMarkup(config.schedule_btns, resize_keyboard=True),
+            )
+            return ADD_SCHEDULE
+
+        habit_name = ctx.user_data.pop("new_habit")
+        try:
+            self.db.add_habit(update.effective_user.id, habit_name, schedule)
         except Exception as e:
             raise TGBotError(f"Error: {e}")
+        self.keyboards.bump(update.effective_user.id)
 
-        await self.reply(update, f"Привычка '{habit_name}' добавлена!")
+        await self.reply(
+            update,
+            f"Привычка '{habit_name}' добавлена! "
+            f"Расписание: {schedule.describe()}",
+        )
         return ConversationHandler.END
 
     """
@@ -298,11 +429,8 @@ class Handler:
             message = "📋Ваши привычки:\n\n"
 
             for habit in habits:
-                streak = habit.get("current_streak", 0)
-                last_date = self.format_date(
-                    habit.get("last_completed", "Никогда")
-                )
-                message += f'{habit.get("name", "Не найдено")}\n\n Статистика: \n\n📅 Серия: {streak} дней\n📊 Всего выполнено: {habit.get("total_completions", 0)} раз\n🗓️ Последнее выполнение: {last_date}\n#️⃣ ID: {habit.get("id", 0)}\n\n'
+                last_date = self.format_date(habit.last_completed)
+                message += f"{habit.name}\n\n Статистика: \n\n📆 Расписание: {habit.schedule.describe()}\n📅 Серия: {habit.current_streak} дней\n🏆 Лучшая серия: {habit.longest_streak} дней\n📊 Всего выполнено: {habit.total_completions} раз\n🗓️ Последнее выполнение: {last_date}\n#️⃣ ID: {habit.id}\n\n"
 
             await self.reply(
                 update,
@@ -330,26 +458,31 @@ class Handler:
         :type ctx: ContextTypes.DEFAULT_TYPE
         :raises TGBotError: Если произошла ошибка при получении привычек
         """
+        uid = update.effective_user.id
         try:
-            habits = self.db.get_user_habits(update.effective_user.id)
+            day = self.user_today(uid).toordinal()
+            cached = self.keyboards.get(uid, DELETE_KB, day)
+            if cached is not None:
+                await self.reply(update, *cached)
+                return DELETE_SELECT
+            habits = self.db.get_user_habits(uid)
             if not habits:
                 await self.reply(
                     update, config.no_habits_to_delete_msg, self.get_kb()
                 )
                 return ConversationHandler.END
             kb = []
-            for habit in habits:
-                kb.append(
-                    [
-                        f"🗑️ {habit.get("name", "Не найдено")} (ID: {habit.get("id", 0)})"
-                    ]
-                )
+            for habit in habits[: config.max_kb_habits]:
+                kb.append([f"🗑️ {habit.name} (ID: {habit.id})"])
             kb.append([config.back_btn_text])
-            await self.reply(
-                update,
-                "Какую привычку вы хотите удалить?",
-                ReplyKeyboardMarkup(kb, resize_keyboard=True),
-            )
+            message = "Какую привычку вы хотите удалить?"
+            if len(habits) > config.max_kb_habits:
+                message += "\n\n" + config.too_many_habits_msg.format(
+                    config.max_kb_habits
+                )
+            cached = (message, ReplyKeyboardMarkup(kb, resize_keyboard=True))
+            self.keyboards.put(uid, DELETE_KB, day, cached)
+            await self.reply(update, *cached)
             return DELETE_SELECT
         except Exception as e:
             await self.reply(
@@ -435,6 +568,7 @@ class Handler:
 
             is_deleted = self.db.delete_habit(update.effective_user.id, hid)
             if is_deleted:
+                self.keyboards.bump(update.effective_user.id)
                 await self.reply(
                     update, "Привычка успешно удалена", keyboard=self.get_kb()
                 )
@@ -454,6 +588,20 @@ class Handler:
     Реализация логики выполнения привычки
     """
 
+    async def reply_nothing_due(self, update: Update) -> None:
+        """
+        Ответ, когда на сегодня нет привычек для выполнения
+
+        :param update: Объект обновления от Telegram
+        :type update: Update
+        """
+
+        if self.db.get_user_habits(update.effective_user.id):
+            text = "Все привычки на сегодня выполнены! Вы молодец"
+        else:
+            text = config.no_habits_msg
+        await self.reply(update, text, self.get_kb())
+
     async def habits_list_to_complete(
         self, update: Update, ctx: ContextTypes.DEFAULT_TYPE
     ) -> None:
@@ -469,38 +617,29 @@ class Handler:
         :raises TGBotError: Если произошла ошибка при получении привычек
         """
 
+        uid = update.effective_user.id
         try:
-            habits = self.db.get_user_habits(update.effective_user.id)
-
-            if not habits: 
-                await self.reply(
-                    update, config.no_habits_msg, keyboard=self.get_kb()
-                )
+            today = self.user_today(uid)
+            cached = self.keyboards.get(uid, COMPLETE_KB, today.toordinal())
+            if cached is not None:
+                await self.reply(update, *cached)
                 return
-            kb = []
-            for habit in habits:
-                today = datetime.now().date().isoformat()
-                last_comp = habit.get("last_completed", "")
-                if not last_comp or last_comp != today:
-                    kb.append(
-                        [
-                            f"☑️ {habit.get("name", "Не найдено")} (ID: {habit.get("id", 0)})"
-                        ]
-                    )
-            if not kb:
-                await self.reply(
-                    update,
-                    "Все привычки на сегодня выполнены! Вы молодец",
-                    self.get_kb(),
-                )
+            habits = self.db.get_due_habits(uid, today)
+            if not habits:
+                await self.reply_nothing_due(update)
                 return ConversationHandler.END
+            kb = [[f"☑️ {habit.name} (ID: {habit.id})"] for habit in habits]
+            message = "Какую привычку вы хотите выполнить?"
+            if len(kb) > config.max_kb_habits:
+                kb = kb[: config.max_kb_habits]
+                message += "\n\n" + config.too_many_habits_msg.format(
+                    config.max_kb_habits
+                )
             kb.append([config.back_btn_text])
 
-            await self.reply(
-                update,
-                "Какую привычку вы хотите выполнить?",
-                ReplyKeyboardMarkup(kb, resize_keyboard=True),
-            )
+            cached = (message, ReplyKeyboardMarkup(kb, resize_keyboard=True))
+            self.keyboards.put(uid, COMPLETE_KB, today.toordinal(), cached)
+            await self.reply(update, *cached)
         except Exception as e:
             await self.reply(
                 update,
@@ -532,6 +671,7 @@ class Handler:
 
         try:
             res = self.db.complete_habit(hid, update.effective_user.id)
+            self.keyboards.bump(update.effective_user.id)
             await self.reply(
                 update,
                 f'Поздравляем! Привычка {res["name"]} выполнена!\n\nВы делаете это уже {res["current_streak"]} дней подряд!\n\nПродолжайте в том же духе!',
@@ -550,3 +690,389 @@ class Handler:
                     "Вы опережаете план, но привычка уже выполнена сегодня!",
                 )
                 raise TGBotError(f"Habit already completed today")
+
+    """
+    Реализация поиска привычек по названию
+    """
+
+    async def start_search_habit(
+        self, update: Update, ctx: ContextTypes.DEFAULT_TYPE
+    ) -> int:
+        """
+        Начало диалога поиска привычки
+
+        :param update: Объект обновления от Telegram
+        :type update: Update
+        :param ctx: Контекст выполнения
+        :type ctx: ContextTypes.DEFAULT_TYPE
+        :returns: Состояние ожидания поискового запроса
+        :type: int
+        """
+
+        back_keyboard = ReplyKeyboardMarkup(
+            [[config.back_btn_text]], resize_keyboard=True
+        )
+        await self.reply(
+            update, "Введите часть названия привычки: ", back_keyboard
+        )
+        return SEARCH_QUERY
+
+    async def search_habit(
+        self, update: Update, ctx: ContextTypes.DEFAULT_TYPE
+    ) -> int:
+        """
+        Поиск привычек по введенной части названия
+
+        Для каждой найденной привычки выводятся кнопки выполнения и удаления
+
+        :param update: Объект обновления от Telegram
+        :type update: Update
+        :param ctx: Контекст выполнения
+        :type ctx: ContextTypes.DEFAULT_TYPE
+        :returns: Завершение диалога или повторное ожидание запроса
+        :type: int
+        :raises TGBotError: Если произошла ошибка при поиске привычек
+        """
+
+        try:
+            habits = self.db.search_habits(
+                update.effective_user.id,
+                update.message.text,
+                config.search_limit,
+            )
+        except Exception as e:
+            await self.reply(update, "Ошибка поиска привычек")
+            raise TGBotError(f"Habit search error: {e}")
+
+        if not habits:
+            await self.reply(
+                update,
+                "Ничего не найдено, попробуйте другой запрос",
+                ReplyKeyboardMarkup(
+                    [[config.back_btn_text]], resize_keyboard=True
+                ),
+            )
+            return SEARCH_QUERY
+
+        kb = [
+            [
+                f"☑️ {habit.name} (ID: {habit.id})",
+                f"🗑️ {habit.name} (ID: {habit.id})",
+            ]
+            for habit in habits
+        ]
+        kb.append([config.back_btn_text])
+        await self.reply(
+            update,
+            "Найденные привычки:",
+            ReplyKeyboardMarkup(kb, resize_keyboard=True),
+        )
+        return ConversationHandler.END
+
+    """
+    Реализация выполнения нескольких привычек за раз
+    """
+
+    def batch_kb(self, batch: dict) -> InlineKeyboardMarkup:
+        """
+        Inline-клавиатура выбора привычек с отметками выбранных
+
+        :param batch: Состояние выбора: названия привычек и выбранные ID
+        :type batch: dict
+        :returns: Клавиатура выбора
+        :type: InlineKeyboardMarkup
+        """
+
+        kb = [
+            [
+                InlineKeyboardButton(
+                    f"{'✅' if hid in batch['selected'] else '⬜'} {name}",
+                    callback_data=f"{BATCH_PREFIX}{hid}",
+                )
+            ]
+            for hid, name in batch["names"].items()
+        ]
+        kb.append(
+            [
+                InlineKeyboardButton(
+                    config.done_btn_text, callback_data=BATCH_DONE
+                ),
+                InlineKeyboardButton(
+                    config.cancel_btn_text, callback_data=BATCH_CANCEL
+                ),
+            ]
+        )
+        return InlineKeyboardMarkup(kb)
+
+    async def habits_list_to_batch_complete(
+        self, update: Update, ctx: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        """
+        Отображение списка невыполненных привычек для множественного выбора
+
+        :param update: Объект обновления от Telegram
+        :type update: Update
+        :param ctx: Контекст выполнения
+        :type ctx: ContextTypes.DEFAULT_TYPE
+        :raises TGBotError: Если произошла ошибка при получении привычек
+        """
+
+        try:
+            habits = self.db.get_due_habits(update.effective_user.id)
+            if not habits:
+                await self.reply_nothing_due(update)
+                return
+            names = {habit.id: habit.name for habit in habits}
+            batch = {"names": names, "selected": set()}
+            ctx.user_data["batch"] = batch
+            await self.reply(
+                update,
+                "Отметьте выполненные привычки и нажмите «Готово»",
+                self.batch_kb(batch),
+            )
+        except Exception as e:
+            await self.reply(
+                update,
+                "Ошибка выполнения привычки",
+                self.get_kb(),
+            )
+            raise TGBotError(f"Error get habits list to batch complete: {e}")
+
+    async def batch_complete_callback(
+        self, update: Update, ctx: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        """
+        Обработчик нажатий в списке множественного выполнения
+
+        Нажатие на привычку переключает отметку, «Готово» выполняет
+        все отмеченные привычки одним запросом к БД
+
+        :param update: Объект обновления от Telegram
+        :type update: Update
+        :param ctx: Контекст выполнения
+        :type ctx: ContextTypes.DEFAULT_TYPE
+        :raises TGBotError: Если произошла ошибка при выполнении привычек
+        """
+
+        query = update.callback_query
+        batch = ctx.user_data.get("batch")
+        if batch and query.data == BATCH_DONE and not batch["selected"]:
+            await query.answer("Не выбрано ни одной привычки")
+            return
+        await query.answer()
+        if not batch:
+            await query.edit_message_text(
+                "Список устарел, откройте его заново"
+            )
+            return
+
+        if query.data == BATCH_CANCEL:
+            ctx.user_data.pop("batch", None)
+            await query.edit_message_text("Действие отменено!")
+            return
+
+        if query.data != BATCH_DONE:
+            hid = int(query.data[len(BATCH_PREFIX) :])
+            if hid in batch["selected"]:
+                batch["selected"].discard(hid)
+            elif hid in batch["names"]:
+                batch["selected"].add(hid)
+            await query.edit_message_reply_markup(self.batch_kb(batch))
+            return
+
+        ctx.user_data.pop("batch", None)
+        try:
+            completed = self.db.complete_habits(
+                update.effective_user.id, list(batch["selected"])
+            )
+        except Exception as e:
+            await query.edit_message_text("Ошибка выполнения привычек")
+            raise TGBotError(f"Habits batch complete error: {e}")
+        if completed:
+            self.keyboards.bump(update.effective_user.id)
+
+        message = f"Выполнено привычек: {len(completed)}\n\n"
+        for habit in completed:
+            message += f"☑️ {habit.name} — серия {habit.current_streak} дней\n"
+        skipped = batch["selected"] - {habit.id for habit in completed}
+        if skipped:
+            message += "\nУже были выполнены сегодня: " + ", ".join(
+                batch["names"][hid] for hid in skipped
+            )
+        await query.edit_message_text(message.strip())
+
+    """
+    Настройка часового пояса
+    """
+
+    async def timezone_command(
+        self, update: Update, ctx: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        """
+        Обработчик команды /tz: просмотр и изменение часового пояса
+
+        /tz - текущий пояс, /tz +3 или /tz UTC-05:00 - изменение.
+        От пояса зависит, когда для пользователя начинается новый день
+
+        :param update: Объект обновления от Telegram
+        :type update: Update
+        :param ctx: Контекст выполнения
+        :type ctx: ContextTypes.DEFAULT_TYPE
+        :raises TGBotError: Если произошла ошибка при сохранении пояса
+        """
+
+        uid = update.effective_user.id
+        args = ctx.args or []
+        try:
+            if not args:
+                offset = self.db.get_user_offset(uid)
+                await self.reply(
+                    update, config.timezone_msg.format(format_offset(offset))
+                )
+                return
+            try:
+                offset = parse_offset(" ".join(args))
+            except ValueError:
+                await self.reply(update, config.timezone_invalid_msg)
+                return
+            today = self.db.set_user_offset(uid, offset)
+            self.keyboards.set_offset(uid, offset)
+        except Exception as e:
+            await self.reply(update, "Ошибка изменения часового пояса")
+            raise TGBotError(f"Timezone error: {e}")
+
+        await self.reply(
+            update,
+            config.timezone_set_msg.format(
+                format_offset(offset), self.format_date(today)
+            ),
+        )
+
+    """
+    Реализация статистики и таблицы лидеров
+    """
+
+    async def stats_command(
+        self, update: Update, ctx: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        """
+        Обработчик команды /stats: сводная статистика для администраторов
+
+        :param update: Объект обновления от Telegram
+        :type update: Update
+        :param ctx: Контекст выполнения
+        :type ctx: ContextTypes.DEFAULT_TYPE
+        :raises TGBotError: Если произошла ошибка при получении статистики
+        """
+
+        if update.effective_user.id not in self.admin_ids:
+            await self.reply(update, config.admin_only_msg)
+            return
+        try:
+            stats = self.db.get_stats()
+        except Exception as e:
+            await self.reply(update, "Ошибка получения статистики")
+            raise TGBotError(f"Stats error: {e}")
+
+        await self.reply(
+            update,
+            f"📈 Статистика за {self.format_date(stats.day)}:\n\n"
+            f"👥 Активных пользователей: {stats.active_users}\n"
+            f"✅ Выполнений: {stats.completions}\n"
+            f"➕ Создано привычек: {stats.habits_created}\n\n"
+            f"📋 Всего привычек: {stats.total_habits}\n"
+            f"📊 Всего выполнений: {stats.total_completions}",
+        )
+
+    async def top_command(
+        self, update: Update, ctx: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        """
+        Обработчик команды /top: привычки с самыми длинными текущими сериями
+
+        Названия показываются только для привычек самого пользователя
+
+        :param update: Объект обновления от Telegram
+        :type update: Update
+        :param ctx: Контекст выполнения
+        :type ctx: ContextTypes.DEFAULT_TYPE
+        :raises TGBotError: Если произошла ошибка при получении топа
+        """
+
+        try:
+            leaders = self.db.top_streaks()
+        except Exception as e:
+            await self.reply(update, "Ошибка получения таблицы лидеров")
+            raise TGBotError(f"Top streaks error: {e}")
+
+        if not leaders:
+            await self.reply(update, config.no_leaders_msg)
+            return
+
+        uid = update.effective_user.id
+        message = "🏆 Текущие серии:\n\n"
+        for place, (entry, name) in enumerate(leaders, 1):
+            message += f"{place}. 🔥 {entry.streak} дней"
+            if entry.user_id == uid:
+                message += f" — {name} (вы)"
+            message += "\n"
+        await self.reply(update, message.strip())
+
+    async def profile_command(
+        self, update: Update, ctx: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        """
+        Обработчик команды /profile (только для администраторов)
+
+        /profile - состояние, /profile stop - остановка,
+        /profile [sample|cprofile] [30s|100] - запуск на 30 секунд
+        или 100 апдейтов. Результаты пишутся в config.profile_dir
+
+        :param update: Объект обновления от Telegram
+        :type update: Update
+        :param ctx: Контекст выполнения
+        :type ctx: ContextTypes.DEFAULT_TYPE
+        """
+
+        if update.effective_user.id not in self.admin_ids:
+            await self.reply(update, config.admin_only_msg)
+            return
+        if self.profiler is None:
+            await self.reply(update, "Профилирование недоступно")
+            return
+
+        args = list(ctx.args or [])
+        if not args:
+            if self.profiler.active:
+                text = f"Идет профилирование ({self.profiler.mode})"
+            else:
+                text = "Профилирование не запущено"
+                if self.profiler.last_files:
+                    text += "\n\nПоследние результаты:\n" + "\n".join(
+                        self.profiler.last_files
+                    )
+            await self.reply(update, text)
+            return
+        if args[0] == "stop":
+            files = self.profiler.stop()
+            await self.reply(
+                update,
+                "Профилирование остановлено\n\n"
+                + ("\n".join(files) or "Нет данных"),
+            )
+            return
+
+        mode = args.pop(0) if args[0] in MODES else config.profile_mode
+        try:
+            seconds, updates = parse_limit(args[0]) if args else (None, None)
+            self.profiler.start(mode, seconds, updates)
+        except ServiceError as e:
+            await self.reply(update, f"Профилирование не запущено: {e}")
+            return
+        if updates:
+            limit = f"{updates} апдейтов"
+        else:
+            limit = f"{seconds or config.profile_seconds:g} с"
+        await self.reply(
+            update, f"Профилирование ({mode}) запущено на {limit}"
+        )
@@ -0,0 +1,162 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import config
+
+COMPLETE_KB = "complete"
+DELETE_KB = "delete"
+KINDS = (COMPLETE_KB, DELETE_KB)
+# Разница текущих дней пользователей: от UTC-12 до UTC+14 в один момент
+# встречаются три соседние даты
+DAY_WINDOW = 2
+
+
+class KeyboardCache:
+    """
+    Кэш готовых клавиатур выполнения и удаления привычек
+
+    Запись действительна для ключа (пользователь, версия набора привычек,
+    день). Версия пользователя увеличивается через bump после добавления,
+    удаления и выполнения привычек, поэтому повторное открытие списка без
+    изменений отдает уже собранную клавиатуру без запроса к базе. День
+    берется по часовому поясу пользователя, смещение которого тоже
+    хранится в кэше (offset). При смене дня удаляются только записи
+    старше DAY_WINDOW дней, а при превышении size вытесняются давно
+    не использованные
+
+    :ivar size: Максимальное количество записей
+    :type size: int
+    :ivar day: Самый поздний учтенный день (date.toordinal())
+    :type day: int или None
+    :ivar hits: Количество попаданий в кэш
+    :type hits: int
+    :ivar misses: Количество промахов
+    :type misses: int
+    """
+
+    def __init__(self, size: int = config.kb_cache_size):
+        self.size = size
+        self.day: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._versions: Dict[int, int] = {}
+        self._offsets: Dict[int, int] = {}
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[int, int, Any]]"
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def version(self, uid: int) -> int:
+        """
+        Текущая версия набора привычек пользователя
+
+        :param uid: ID пользователя
+        :type uid: int
+        :returns: Версия
+        :type: int
+        """
+
+        return self._versions.get(uid, 0)
+
+    def offset(self, uid: int) -> Optional[int]:
+        """
+        Сохраненный часовой пояс пользователя
+
+        :param uid: ID пользователя
+        :type uid: int
+        :returns: Смещение от UTC в минутах или None, если не сохранено
+        :type: int или None
+        """
+
+        return self._offsets.get(uid)
+
+    def set_offset(self, uid: int, offset: int) -> None:
+        """
+        Сохранение часового пояса пользователя
+
+        :param uid: ID пользователя
+        :type uid: int
+        :param offset: Смещение от UTC в минутах
+        :type offset: int
+        """
+
+        self._offsets.pop(uid, None)
+        self._offsets[uid] = offset
+        # пояс не зависит от дня, вытесняются давно сохраненные
+        while len(self._offsets) > self.size:
+            del self._offsets[next(iter(self._offsets))]
+
+    def bump(self, uid: int) -> None:
+        """
+        Отметка изменения привычек пользователя
+
+        :param uid: ID пользователя
+        :type uid: int
+        """
+
+        self._versions[uid] = self.version(uid) + 1
+        for kind in KINDS:
+            self._entries.pop((uid, kind), None)
+
+    def get(self, uid: int, kind: str, day: int) -> Optional[Any]:
+        """
+        Получение клавиатуры из кэша
+
+        :param uid: ID пользователя
+        :type uid: int
+        :param kind: Вид клавиатуры (COMPLETE_KB или DELETE_KB)
+        :type kind: str
+        :param day: День (date.toordinal())
+        :type day: int
+        :returns: Сохраненное значение или None при промахе
+        :type: Any или None
+        """
+
+        self._rollover(day)
+        entry = self._entries.get((uid, kind))
+        if entry is None or entry[:2] != (self.version(uid), day):
+            self.misses += 1
+            return None
+        self._entries.move_to_end((uid, kind))
+        self.hits += 1
+        return entry[2]
+
+    def put(self, uid: int, kind: str, day: int, value: Any) -> None:
+        """
+        Сохранение клавиатуры в кэш
+
+        :param uid: ID пользователя
+        :type uid: int
+        :param kind: Вид клавиатуры (COMPLETE_KB или DELETE_KB)
+        :type kind: str
+        :param day: День (date.toordinal())
+        :type day: int
+        :param value: Клавиатура (и сопутствующие данные)
+        :type value: Any
+        """
+
+        self._rollover(day)
+        self._entries[(uid, kind)] = (self.version(uid), day, value)
+        self._entries.move_to_end((uid, kind))
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def _rollover(self, day: int) -> None:
+        if self.day is not None and day <= self.day:
+            return
+        self.day = day
+        stale = [
+            key
+            for key, entry in self._entries.items()
+            if entry[1] < day - DAY_WINDOW
+        ]
+        for key in stale:
+            del self._entries[key]
+        # версии нужны только для сравнения с записями
+        self._versions = {
+            uid: version
+            for uid, version in self._versions.items()
+            if (uid, COMPLETE_KB) in self._entries
+            or (uid, DELETE_KB) in self._entries
+        }
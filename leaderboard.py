@@ -0,0 +1,143 @@
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+import config
+
+
+class LeaderboardEntry(NamedTuple):
+    """
+    Привычка в таблице лидеров
+    """
+
+    habit_id: int
+    user_id: int
+    streak: int
+
+
+def _rank(entry: LeaderboardEntry) -> tuple:
+    # большая серия выше, при равенстве выше более старая привычка
+    return (-entry.streak, entry.habit_id)
+
+
+class Leaderboard:
+    """
+    Таблица лидеров по текущей серии, хранимая в памяти
+
+    Хранит точный топ из capacity привычек (с запасом над size, чтобы
+    удаление привычек не требовало обращения к БД). Рост серий и удаление
+    привычек учитываются на месте. Уменьшение серии отслеживаемой
+    привычки может поднять в топ привычку, которой нет в памяти, поэтому
+    топ перезагружается из БД; массовые сбросы серий (смена дня,
+    пересчет) сбрасывают его через invalidate. Пока топ не загружен из
+    БД, обновления игнорируются
+
+    :ivar size: Количество привычек в выдаче
+    :type size: int
+    :ivar capacity: Количество отслеживаемых привычек
+    :type capacity: int
+    :ivar loaded: Топ загружен и актуален
+    :type loaded: bool
+    """
+
+    def __init__(self, size: int = config.leaderboard_size):
+        self.size = size
+        self.capacity = size * 2
+        self.loaded = False
+        # в топе все привычки базы, а не только лучшие capacity
+        self._everything = False
+        self._entries: Dict[int, LeaderboardEntry] = {}
+        self._ranked: Optional[List[LeaderboardEntry]] = None
+        self._lock = threading.Lock()
+
+    def load(self, entries: List[LeaderboardEntry]) -> None:
+        """
+        Загрузка топа из БД
+
+        :param entries: Не более capacity лучших привычек
+        :type entries: List[LeaderboardEntry]
+        """
+
+        with self._lock:
+            self._entries = {entry.habit_id: entry for entry in entries}
+            self._everything = len(entries) < self.capacity
+            self._ranked = None
+            self.loaded = True
+
+    def invalidate(self) -> None:
+        """
+        Сброс топа, он будет загружен из БД при следующем чтении
+        """
+
+        with self._lock:
+            self.loaded = False
+            self._entries = {}
+            self._ranked = None
+
+    def update(self, entry: LeaderboardEntry) -> None:
+        """
+        Учет новой или изменившейся текущей серии привычки за O(capacity)
+
+        :param entry: Привычка с актуальной текущей серией
+        :type entry: LeaderboardEntry
+        """
+
+        with self._lock:
+            if not self.loaded:
+                return
+            entries = self._entries
+            old = entries.get(entry.habit_id)
+            if (
+                old is not None
+                and entry.streak < old.streak
+                and not self._everything
+            ):
+                # на освободившееся место может претендовать привычка из БД
+                self.loaded = False
+                self._entries = {}
+                self._ranked = None
+                return
+            if old is not None or self._everything:
+                entries[entry.habit_id] = entry
+            else:
+                lowest = max(entries.values(), key=_rank)
+                if _rank(entry) >= _rank(lowest):
+                    return
+                entries[entry.habit_id] = entry
+            if len(entries) > self.capacity:
+                del entries[max(entries.values(), key=_rank).habit_id]
+                self._everything = False
+            self._ranked = None
+
+    def remove(self, hid: int) -> None:
+        """
+        Удаление привычки из топа
+
+        :param hid: ID привычки
+        :type hid: int
+        """
+
+        with self._lock:
+            if not self.loaded or self._entries.pop(hid, None) is None:
+                return
+            self._ranked = None
+            if not self._everything and len(self._entries) < self.size:
+                # запас исчерпан, следующие привычки есть только в БД
+                self.loaded = False
+
+    def top(self, limit: Optional[int] = None) -> List[LeaderboardEntry]:
+        """
+        Лучшие привычки с ненулевой серией
+
+        :param limit: Количество привычек, не больше self.size
+        :type limit: int или None
+        :returns: Привычки по убыванию текущей серии
+        :type: List[LeaderboardEntry]
+        """
+
+        with self._lock:
+            if self._ranked is None:
+                self._ranked = sorted(
+                    (e for e in self._entries.values() if e.streak > 0),
+                    key=_rank,
+                )
+            return self._ranked[: min(limit or self.size, self.size)]
@@ -0,0 +1,104 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Dict, Optional, TextIO
+
+# Стандартные атрибуты LogRecord, которые не попадают в "extra" JSON-записи
+_RECORD_ATTRS = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime"}
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Обработчик, передающий записи в очередь без форматирования
+
+    Стандартный QueueHandler форматирует сообщение в вызывающем потоке.
+    Здесь запись кладется в очередь как есть, а подстановка аргументов
+    и вывод выполняются в потоке слушателя
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class LogListener(logging.handlers.QueueListener):
+    """
+    Слушатель очереди логов, допускающий повторную остановку
+    """
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            super().stop()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Форматтер, выводящий каждую запись одной JSON-строкой
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def setup_logging(
+    level: str = "INFO",
+    levels: Optional[Dict[str, str]] = None,
+    fmt: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    json_format: bool = False,
+    stream: Optional[TextIO] = None,
+) -> LogListener:
+    """
+    Настройка логирования через очередь и фоновый поток-слушатель
+
+    Вызывающий поток (event loop бота) только кладет запись в очередь,
+    форматирование и запись в поток вывода выполняет QueueListener
+
+    :param level: Уровень корневого логгера
+    :type level: str
+    :param levels: Уровни отдельных логгеров (имя логгера -> уровень)
+    :type levels: Dict[str, str] или None
+    :param fmt: Формат текстовых записей
+    :type fmt: str
+    :param json_format: Выводить записи в формате JSON
+    :type json_format: bool
+    :param stream: Поток вывода (по умолчанию sys.stderr)
+    :type stream: TextIO или None
+    :returns: Запущенный слушатель очереди
+    :type: LogListener
+    """
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(
+        JsonFormatter() if json_format else logging.Formatter(fmt)
+    )
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(LazyQueueHandler(log_queue))
+    root.setLevel(level)
+    for name, module_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    listener = LogListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
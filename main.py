@@ -1,20 +1,270 @@
+import argparse
+import asyncio
+import logging
 import os
 import sys
-from telegram.ext import Application, CommandHandler
-import logging
-from db import Database
-from handlers import Handler
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import FrozenSet, Iterator, List, Optional, Tuple
+
 import config
-from dotenv import load_dotenv
 from exceptions import TGBotError
+from logs import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Тяжелые зависимости (telegram, dotenv, handlers, db) импортируются лениво
+# внутри функций, чтобы не задерживать старт процесса
+
+
+class StartupProfiler:
+    """
+    Сбор длительности этапов запуска бота
+
+    :ivar stages: Список этапов: (название, поток, длительность в секундах)
+    :type stages: List[Tuple[str, str, float]]
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, str, float]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Замер длительности этапа
+
+        :param name: Название этапа
+        :type name: str
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append(
+                (
+                    name,
+                    threading.current_thread().name,
+                    time.perf_counter() - start,
+                )
+            )
+
+    def report(self) -> str:
+        """
+        Текстовый отчет по этапам запуска
+
+        :returns: Таблица этапов и общее время запуска
+        :type: str
+        """
+
+        lines = ["Startup profile:"]
+        for name, thread, elapsed in self.stages:
+            lines.append(f"  {name:<28} {thread:<14} {elapsed * 1000:9.1f} ms")
+        total = time.perf_counter() - self.started
+        lines.append(f"  {'total (wall)':<28} {'':<14} {total * 1000:9.1f} ms")
+        return "\n".join(lines)
+
 
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.DEBUG,
-)
+def init_db(profiler: StartupProfiler):
+    """
+    Создание объекта базы данных с применением миграций
 
+    Выполняется в отдельном потоке параллельно с импортом telegram
+    и подключением бота
 
-def main():
+    :param profiler: Профилировщик запуска
+    :type profiler: StartupProfiler
+    :returns: Объект базы данных
+    :type: Database
+    """
+
+    with profiler.stage("import db"):
+        from db import Database
+    with profiler.stage("db init (migrations)"):
+        return Database(config.db_file, utc_offset=config.default_utc_offset)
+
+
+def parse_admin_ids(value: Optional[str]) -> FrozenSet[int]:
+    """
+    Разбор списка ID администраторов из переменной окружения ADMIN_IDS
+
+    :param value: ID через запятую
+    :type value: str или None
+    :returns: Множество ID администраторов
+    :type: FrozenSet[int]
+    """
+
+    return frozenset(
+        int(item) for item in (value or "").split(",") if item.strip()
+    )
+
+
+def register_handlers(app, db, profiler: StartupProfiler) -> None:
+    """
+    Регистрация обработчиков бота
+
+    :param app: Приложение бота
+    :type app: Application
+    :param db: Объект базы данных
+    :type db: Database
+    :param profiler: Профилировщик запуска
+    :type profiler: StartupProfiler
+    """
+
+    from telegram.ext import CommandHandler
+
+    with profiler.stage("import handlers"):
+        from handlers import Handler
+        from profiling import Profiler
+    with profiler.stage("register handlers"):
+        app.bot_data["profiler"] = Profiler(app)
+        hndlr = Handler(
+            db,
+            parse_admin_ids(os.getenv("ADMIN_IDS")),
+            app.bot_data["profiler"],
+        )
+        app.add_handler(CommandHandler("start", hndlr.start))
+        for command_handler in hndlr.get_command_handlers():
+            app.add_handler(command_handler)
+
+        for msg_handler in hndlr.get_message_handlers():
+            app.add_handler(msg_handler)
+        for callback_handler in hndlr.get_callback_handlers():
+            app.add_handler(callback_handler)
+        for conv_handler in hndlr.get_conversation_handlers():
+            app.add_handler(conv_handler)
+
+
+def start_background_tasks(app, db) -> None:
+    """
+    Запуск фоновых задач бота (резервное копирование, архивация истории,
+    смена дня по часовым поясам)
+
+    Задачи создаются в цикле событий бота и отменяются в post_stop
+
+    :param app: Приложение бота
+    :type app: Application
+    :param db: Объект базы данных
+    :type db: Database
+    """
+
+    from timezones import DayRollover
+
+    tasks = app.bot_data.setdefault("background_tasks", [])
+    loop = asyncio.get_running_loop()
+    tasks.append(loop.create_task(DayRollover(db).run(), name="rollover"))
+    if config.backup_interval:
+        from backup import BackupManager
+
+        manager = BackupManager(db)
+        tasks.append(
+            loop.create_task(
+                manager.run_periodically(config.backup_interval),
+                name="backup",
+            )
+        )
+    if config.archive_interval:
+        from retention import CompletionArchiver
+
+        archiver = CompletionArchiver(db)
+        tasks.append(
+            loop.create_task(
+                archiver.run_periodically(config.archive_interval),
+                name="archive",
+            )
+        )
+
+
+async def stop_background_tasks(app) -> None:
+    """
+    Отмена фоновых задач бота и остановка профилирования
+
+    :param app: Приложение бота
+    :type app: Application
+    """
+
+    if "profiler" in app.bot_data:
+        app.bot_data["profiler"].stop()
+    tasks = app.bot_data.pop("background_tasks", [])
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def build_application(
+    token: str,
+    db_future: Future,
+    profiler: StartupProfiler,
+    base_url: Optional[str] = None,
+):
+    """
+    Сборка приложения бота
+
+    Обработчики регистрируются в post_init: к этому моменту бот уже
+    подключился к Telegram, а база данных прогрета в фоновом потоке
+
+    :param token: Токен бота
+    :type token: str
+    :param db_future: Результат фоновой инициализации базы данных
+    :type db_future: Future
+    :param profiler: Профилировщик запуска
+    :type profiler: StartupProfiler
+    :param base_url: Адрес Bot API вместо api.telegram.org, токен
+        дописывается в конец (например http://127.0.0.1:8081/bot)
+    :type base_url: str или None
+    :returns: Приложение бота
+    :type: Application
+    """
+
+    with profiler.stage("import telegram.ext"):
+        from telegram.ext import Application
+
+    async def post_init(app) -> None:
+        with profiler.stage("wait db"):
+            db = await asyncio.wrap_future(db_future)
+        register_handlers(app, db, profiler)
+        start_background_tasks(app, db)
+        app.bot_data["profiler"].install_signal()
+        logger.info(
+            "Bot started in %.3f s", time.perf_counter() - profiler.started
+        )
+
+    with profiler.stage("build application"):
+        builder = (
+            Application.builder()
+            .token(token)
+            .post_init(post_init)
+            .post_stop(stop_background_tasks)
+        )
+        if base_url:
+            builder = builder.base_url(base_url)
+        return builder.build()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Habit tracker telegram bot")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print import/initialization breakdown and exit without polling",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    profiler = StartupProfiler()
+    listener = setup_logging(
+        config.log_level,
+        config.log_levels,
+        config.log_format,
+        config.log_json,
+    )
+    with profiler.stage("import dotenv"):
+        from dotenv import load_dotenv
     load_dotenv()
     token = os.getenv("TG_BOT_TOKEN")
 
@@ -22,20 +272,25 @@ def main():
         print(f"no any token in env file: {token}")
         sys.exit(1)
     print("starting bot")
-    db = Database(config.db_file)
-    hndlr = Handler(db)
-    app = Application.builder().token(token).build()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-init")
+    db_future = executor.submit(init_db, profiler)
     try:
-        app.add_handler(CommandHandler("start", hndlr.start))
-
-        for msg_handler in hndlr.get_message_handlers():
-            app.add_handler(msg_handler)
-        for conv_handler in hndlr.get_conversation_handlers():
-            app.add_handler(conv_handler)
+        app = build_application(
+            token, db_future, profiler, os.getenv("TG_API_BASE_URL")
+        )
+        if args.profile_startup:
+            with profiler.stage("wait db"):
+                db = db_future.result()
+            register_handlers(app, db, profiler)
+            print(profiler.report())
+            return
         app.run_polling()
     except Exception as e:
-        logging.error(f"Bot init error: {e}")
+        logger.error("Bot init error: %s", e)
         raise TGBotError(f"Bot init error: {e}")
+    finally:
+        executor.shutdown(wait=False)
+        listener.stop()
 
 
 if __name__ == "__main__":
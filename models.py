@@ -0,0 +1,80 @@
+import sqlite3
+from datetime import date
+from typing import NamedTuple, Optional
+
+from schedules import Schedule
+
+
+class Habit(NamedTuple):
+    """
+    Запись привычки пользователя
+
+    Создается напрямую из строки результата запроса через habit_row_factory,
+    порядок полей совпадает с HABIT_COLUMNS. В базе даты хранятся номерами
+    дней, в Habit last_completed уже переведена в date
+    """
+
+    id: int
+    name: str
+    created_at: Optional[str]
+    last_completed: Optional[date]
+    current_streak: int
+    total_completions: int
+    longest_streak: int
+    schedule_kind: int
+    schedule_value: int
+
+    @property
+    def schedule(self) -> Schedule:
+        """
+        Расписание привычки
+        """
+
+        return Schedule(self.schedule_kind, self.schedule_value)
+
+
+class DailyStats(NamedTuple):
+    """
+    Сводная статистика бота за день и за все время
+    """
+
+    day: date
+    active_users: int
+    completions: int
+    habits_created: int
+    total_habits: int
+    total_completions: int
+
+
+# Список колонок для SELECT, из результата которого строится Habit
+HABIT_COLUMNS = ", ".join(Habit._fields)
+
+
+def to_date(day: Optional[int]) -> Optional[date]:
+    """
+    Перевод номера дня из базы в дату
+
+    :param day: Номер дня (date.toordinal())
+    :type day: int или None
+    :returns: Дата
+    :type: date или None
+    """
+
+    return date.fromordinal(day) if day is not None else None
+
+
+def habit_row_factory(cursor: sqlite3.Cursor, row: tuple) -> Habit:
+    """
+    Фабрика строк sqlite3, создающая Habit без промежуточного словаря
+
+    :param cursor: Курсор запроса
+    :type cursor: sqlite3.Cursor
+    :param row: Строка результата в порядке HABIT_COLUMNS
+    :type row: tuple
+    :returns: Запись привычки
+    :type: Habit
+    """
+
+    if row[3] is None:
+        return Habit._make(row)
+    return Habit(*row[:3], date.fromordinal(row[3]), *row[4:])
@@ -0,0 +1,355 @@
+import asyncio
+import cProfile
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+import time
+import types
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from telegram.ext import Application, BaseHandler, ConversationHandler
+
+import config
+from exceptions import ServiceError
+from router import TextRouter
+
+logger = logging.getLogger(__name__)
+
+MODES = ("sample", "cprofile")
+_LIMIT_RE = re.compile(r"(\d+)\s*(s|с|u)?")
+
+
+def parse_limit(text: str) -> Tuple[Optional[float], Optional[int]]:
+    """
+    Разбор ограничения профилирования: "30s" - секунды, "100" - апдейты
+
+    :param text: Текст ограничения
+    :type text: str
+    :returns: Длительность в секундах и количество апдейтов (одно из двух)
+    :type: Tuple[float или None, int или None]
+    :raises ServiceError: Если ограничение не распознано
+    """
+
+    match = _LIMIT_RE.fullmatch(text.strip().lower())
+    if not match or int(match.group(1)) <= 0:
+        raise ServiceError(f"Invalid profiling limit: {text}")
+    if match.group(2) in ("s", "с"):
+        return float(match.group(1)), None
+    return None, int(match.group(1))
+
+
+def _callback_name(callback: Callable) -> str:
+    func = getattr(callback, "__func__", callback)
+    return getattr(func, "__qualname__", repr(func))
+
+
+class Profiler:
+    """
+    Профилирование обработчиков работающего бота по запросу
+
+    На время профилирования колбэки всех обработчиков приложения (включая
+    вложенные в ConversationHandler и маршруты TextRouter) подменяются
+    обертками, которые помечают время каждого обработчика его именем.
+    После остановки исходные колбэки возвращаются на место, поэтому вне
+    профилирования накладных расходов нет.
+
+    Режимы:
+
+    - sample - фоновый поток раз в interval секунд снимает стек потока
+      event loop, результат - файл collapsed stacks (flamegraph.pl,
+      speedscope), первый элемент стека - имя обработчика
+    - cprofile - cProfile отдельно для каждого обработчика, результат -
+      файлы .pstats
+
+    Корутина обработчика выполняется по шагам между await, профиль и
+    метка обработчика включены только на время шагов. Задачи, которые
+    event loop выполняет, пока обработчик ждет (сеть, другие апдейты,
+    фоновые циклы), ему не приписываются, а ожидание сети в режиме
+    sample попадает в стеки (idle)
+
+    :ivar app: Приложение бота
+    :type app: Application
+    :ivar out_dir: Каталог для результатов
+    :type out_dir: str
+    :ivar interval: Интервал снятия стека в режиме sample, секунды
+    :type interval: float
+    """
+
+    def __init__(
+        self,
+        app: Application,
+        out_dir: str = config.profile_dir,
+        interval: float = config.profile_interval,
+    ):
+        self.app = app
+        self.out_dir = out_dir
+        self.interval = interval
+        self.mode: Optional[str] = None
+        self.last_files: List[str] = []
+        self._restore: List[Callable[[], None]] = []
+        self._tag: Optional[str] = None
+        self._updates_left: Optional[int] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._profiling = False
+        self._samples: Counter = Counter()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_sampling = threading.Event()
+        self._started = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.mode is not None
+
+    def start(
+        self,
+        mode: str = config.profile_mode,
+        seconds: Optional[float] = None,
+        updates: Optional[int] = None,
+    ) -> None:
+        """
+        Запуск профилирования
+
+        Вызывается из event loop бота. Без ограничений профилирование
+        длится config.profile_seconds секунд
+
+        :param mode: Режим: sample или cprofile
+        :type mode: str
+        :param seconds: Остановить через seconds секунд
+        :type seconds: float или None
+        :param updates: Остановить после updates обработанных апдейтов
+        :type updates: int или None
+        :raises ServiceError: Если профилирование уже идет или режим неизвестен
+        """
+
+        if self.active:
+            raise ServiceError(f"Profiling is already running ({self.mode})")
+        if mode not in MODES:
+            raise ServiceError(f"Unknown profiling mode: {mode}")
+        if seconds is None and updates is None:
+            seconds = config.profile_seconds
+
+        self.mode = mode
+        self._started = time.perf_counter()
+        self._updates_left = updates
+        self._profiles = {}
+        self._samples = Counter()
+        self._swap_callbacks()
+        if mode == "sample":
+            self._stop_sampling.clear()
+            self._sampler = threading.Thread(
+                target=self._sample,
+                args=(threading.get_ident(),),
+                name="profiler",
+                daemon=True,
+            )
+            self._sampler.start()
+        if seconds is not None:
+            self._timer = asyncio.get_running_loop().call_later(
+                seconds, self.stop
+            )
+        logger.info(
+            "Profiling started: mode=%s seconds=%s updates=%s",
+            mode,
+            seconds,
+            updates,
+        )
+
+    def stop(self) -> List[str]:
+        """
+        Остановка профилирования и запись результатов
+
+        :returns: Пути к записанным файлам
+        :type: List[str]
+        """
+
+        if not self.active:
+            return []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for restore in reversed(self._restore):
+            restore()
+        self._restore = []
+        if self._sampler is not None:
+            self._stop_sampling.set()
+            self._sampler.join()
+            self._sampler = None
+        try:
+            self.last_files = self._dump()
+        except OSError as e:
+            logger.error("Profile dump error: %s", e)
+            self.last_files = []
+        logger.info(
+            "Profiling stopped after %.1f s: %s",
+            time.perf_counter() - self._started,
+            ", ".join(self.last_files) or "no data",
+        )
+        self.mode = None
+        return self.last_files
+
+    def toggle(self) -> None:
+        """
+        Запуск с настройками по умолчанию или остановка (для сигнала)
+        """
+
+        if self.active:
+            self.stop()
+        else:
+            self.start()
+
+    def install_signal(self, signum: int = getattr(signal, "SIGUSR1", 0)):
+        """
+        Переключение профилирования сигналом (по умолчанию SIGUSR1)
+
+        Вызывается из event loop бота, на платформах без сигналов
+        ничего не делает
+
+        :param signum: Номер сигнала
+        :type signum: int
+        """
+
+        if not signum:
+            return
+        try:
+            asyncio.get_running_loop().add_signal_handler(signum, self.toggle)
+        except (NotImplementedError, RuntimeError) as e:
+            logger.warning("Profiling signal handler not installed: %s", e)
+
+    def _swap_callbacks(self) -> None:
+        seen = set()
+
+        def visit(handler: BaseHandler) -> None:
+            if id(handler) in seen:
+                return
+            seen.add(id(handler))
+            if isinstance(handler, ConversationHandler):
+                for child in handler.entry_points:
+                    visit(child)
+                for children in handler.states.values():
+                    for child in children:
+                        visit(child)
+                for child in handler.fallbacks:
+                    visit(child)
+            elif isinstance(handler, TextRouter):
+                routes = dict(handler.routes)
+                patterns = list(handler.patterns)
+                handler.routes.update(
+                    (text, self._wrap(callback))
+                    for text, callback in routes.items()
+                )
+                handler.patterns[:] = [
+                    (pattern, self._wrap(callback))
+                    for pattern, callback in patterns
+                ]
+
+                def restore() -> None:
+                    handler.routes.update(routes)
+                    handler.patterns[:] = patterns
+
+                self._restore.append(restore)
+            elif callable(handler.callback):
+                callback = handler.callback
+                handler.callback = self._wrap(callback)
+                self._restore.append(
+                    lambda: setattr(handler, "callback", callback)
+                )
+
+        for handlers in self.app.handlers.values():
+            for handler in handlers:
+                visit(handler)
+
+    def _wrap(self, callback: Callable) -> Callable:
+        name = _callback_name(callback)
+
+        async def profiled(update, context):
+            try:
+                return await self._steps(name, callback(update, context))
+            finally:
+                self._count_update()
+
+        return profiled
+
+    @types.coroutine
+    def _steps(self, name: str, coro):
+        # шаг корутины - участок между await, все остальное время event
+        # loop выполняет чужие задачи
+        steps = coro.__await__()
+        value, error = None, None
+        while True:
+            tag, self._tag = self._tag, name
+            profile = self._enable(name)
+            try:
+                if error is None:
+                    future = steps.send(value)
+                else:
+                    future = steps.throw(error)
+            except StopIteration as result:
+                return result.value
+            finally:
+                if profile is not None:
+                    profile.disable()
+                    self._profiling = False
+                self._tag = tag
+            try:
+                value, error = (yield future), None
+            except GeneratorExit:
+                steps.close()
+                raise
+            except BaseException as e:
+                value, error = None, e
+
+    def _enable(self, name: str) -> Optional[cProfile.Profile]:
+        # cProfile допускает только один активный профиль
+        if self.mode != "cprofile" or self._profiling:
+            return None
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+        try:
+            profile.enable()
+        except ValueError:
+            # профилировщик уже включен другим инструментом
+            return None
+        self._profiling = True
+        return profile
+
+    def _count_update(self) -> None:
+        if self._updates_left is None:
+            return
+        self._updates_left -= 1
+        if self._updates_left <= 0:
+            # остановка после выхода из текущего обработчика
+            asyncio.get_running_loop().call_soon(self.stop)
+
+    def _sample(self, thread_id: int) -> None:
+        while not self._stop_sampling.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{os.path.basename(code.co_filename)}:{code.co_name}"
+                )
+                frame = frame.f_back
+            stack.append(self._tag or "(idle)")
+            self._samples[";".join(reversed(stack))] += 1
+
+    def _dump(self) -> List[str]:
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        files = []
+        if self.mode == "sample" and self._samples:
+            path = os.path.join(self.out_dir, f"{stamp}-sample.collapsed")
+            with open(path, "w", encoding="utf-8") as out:
+                for stack, count in self._samples.most_common():
+                    out.write(f"{stack} {count}\n")
+            files.append(path)
+        for name, profile in self._profiles.items():
+            safe = re.sub(r"[^\w.-]+", "_", name)
+            path = os.path.join(self.out_dir, f"{stamp}-{safe}.pstats")
+            profile.dump_stats(path)
+            files.append(path)
+        return files
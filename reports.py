@@ -0,0 +1,642 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import config
+from db import SQL_DAY, Database
+from exceptions import DBError, ServiceError
+from logs import setup_logging
+from schedules import INTERVAL, WEEKDAYS, WEEKLY, Schedule, week_start, weekday
+from streaks import StreakState, advance, replay
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("weekly", "monthly")
+
+Sender = Callable[[int, str], Awaitable[None]]
+
+
+class HabitReport(NamedTuple):
+    """
+    Итоги привычки за период
+
+    :ivar name: Название привычки
+    :ivar completions: Выполнений за период
+    :ivar missed: Пропущенных запланированных выполнений
+    :ivar streak_before: Серия на начало периода
+    :ivar streak_after: Серия на конец периода
+    """
+
+    name: str
+    completions: int
+    missed: int
+    streak_before: int
+    streak_after: int
+
+
+class ReportStats(NamedTuple):
+    """
+    Итоги рассылки
+
+    :ivar users: Обработано пользователей
+    :ivar sent: Отправлено отчетов
+    :ivar skipped: Пользователей без привычек за период
+    :ivar failed: Отчетов, которые не удалось доставить
+    :ivar elapsed: Длительность в секундах
+    """
+
+    users: int
+    sent: int
+    skipped: int
+    failed: int
+    elapsed: float
+
+
+def period_bounds(
+    kind: str, today: Optional[date] = None
+) -> Tuple[date, date]:
+    """
+    Границы последнего завершенного периода отчета
+
+    :param kind: weekly - прошлая неделя (пн-вс), monthly - прошлый месяц
+    :type kind: str
+    :param today: Текущая дата (по умолчанию сегодня)
+    :type today: date или None
+    :returns: Первый и последний день периода (включительно)
+    :type: Tuple[date, date]
+    :raises ServiceError: Если вид отчета неизвестен
+    """
+
+    today = today or date.today()
+    if kind == "weekly":
+        first = today - timedelta(days=today.weekday() + 7)
+        return first, first + timedelta(days=6)
+    if kind == "monthly":
+        last = today.replace(day=1) - timedelta(days=1)
+        return last.replace(day=1), last
+    raise ServiceError(f"Unknown report kind: {kind}")
+
+
+def count_missed(
+    schedule: Schedule,
+    done: Set[int],
+    first: int,
+    last: int,
+    prev: Optional[int] = None,
+) -> int:
+    """
+    Количество пропущенных запланированных выполнений за дни first..last
+
+    Для "N раз в неделю" учитываются только недели, целиком попавшие
+    в период, для "раз в K дней" - каждые K дней без выполнения
+
+    :param schedule: Расписание привычки
+    :type schedule: Schedule
+    :param done: Номера дней с выполнением
+    :type done: Set[int]
+    :param first: Первый день периода
+    :type first: int
+    :param last: Последний день периода
+    :type last: int
+    :param prev: Последнее выполнение до периода
+    :type prev: int или None
+    :returns: Количество пропусков
+    :type: int
+    """
+
+    if first > last:
+        return 0
+    if schedule.kind == WEEKLY:
+        missed = 0
+        monday = week_start(first)
+        if monday < first:
+            monday += 7
+        while monday + 6 <= last:
+            count = sum(1 for d in range(monday, monday + 7) if d in done)
+            missed += max(0, schedule.value - count)
+            monday += 7
+        return missed
+    if schedule.kind == INTERVAL:
+        missed = 0
+        anchor = prev if prev is not None else first - schedule.value
+        for day in range(first, last + 1):
+            if day in done:
+                anchor = day
+            elif (day - anchor) % schedule.value == 0:
+                missed += 1
+        return missed
+    if schedule.kind == WEEKDAYS:
+        return sum(
+            1
+            for day in range(first, last + 1)
+            if day not in done and schedule.value >> weekday(day) & 1
+        )
+    return sum(1 for day in range(first, last + 1) if day not in done)
+
+
+def _streak_on(state: StreakState, day: int, schedule: Schedule) -> int:
+    # серия жива, если выполнение на следующий день ее продолжило бы
+    if advance(state, day + 1, schedule).current > state.current:
+        return state.current
+    return 0
+
+
+def habit_report(
+    name: str,
+    schedule: Schedule,
+    created: int,
+    days: List[int],
+    first: int,
+    last: int,
+) -> HabitReport:
+    """
+    Итоги привычки за период по ее истории выполнений
+
+    :param name: Название привычки
+    :type name: str
+    :param schedule: Расписание привычки
+    :type schedule: Schedule
+    :param created: День создания привычки
+    :type created: int
+    :param days: Дни выполнений по возрастанию, не позже last
+    :type days: List[int]
+    :param first: Первый день периода
+    :type first: int
+    :param last: Последний день периода
+    :type last: int
+    :returns: Итоги привычки
+    :type: HabitReport
+    """
+
+    before = [day for day in days if day < first]
+    inside = [day for day in days if first <= day <= last]
+    start = replay(before, schedule=schedule)
+    end = replay(inside, start, schedule)
+    return HabitReport(
+        name,
+        len(inside),
+        count_missed(
+            schedule, set(inside), max(first, created), last, start.last
+        ),
+        _streak_on(start, first - 1, schedule),
+        _streak_on(end, last, schedule),
+    )
+
+
+def render_report(
+    kind: str, first: date, last: date, habits: List[HabitReport]
+) -> str:
+    """
+    Текст отчета для пользователя
+
+    :param kind: Вид отчета (weekly или monthly)
+    :type kind: str
+    :param first: Первый день периода
+    :type first: date
+    :param last: Последний день периода
+    :type last: date
+    :param habits: Итоги привычек
+    :type habits: List[HabitReport]
+    :returns: Текст сообщения
+    :type: str
+    """
+
+    title = "Итоги недели" if kind == "weekly" else "Итоги месяца"
+    lines = [
+        f"📊 {title} {first.strftime(config.ui_date_format)}"
+        f" – {last.strftime(config.ui_date_format)}",
+        "",
+    ]
+    for habit in habits:
+        line = f"• {habit.name}: ✅ {habit.completions}"
+        if habit.missed:
+            line += f", пропущено {habit.missed}"
+        change = habit.streak_after - habit.streak_before
+        line += f", серия {habit.streak_before} → {habit.streak_after}"
+        if change:
+            line += f" ({change:+d})"
+        lines.append(line)
+    total = sum(habit.completions for habit in habits)
+    lines += ["", f"Всего выполнений: {total}"]
+    return "\n".join(lines)
+
+
+# База данных процесса-обработчика, открывается в _init_worker
+_worker_db: Optional[Database] = None
+
+
+def _init_worker(path: str) -> None:
+    global _worker_db
+    _worker_db = Database(path, readers=1, migrate=False)
+
+
+def build_reports(
+    user_ids: List[int], kind: str, first: date, last: date
+) -> List[Tuple[int, Optional[str]]]:
+    """
+    Построение отчетов для порции пользователей
+
+    Выполняется в процессе-обработчике через соединение только на чтение.
+    История выполнений читается двумя запросами на всю порцию
+
+    :param user_ids: ID пользователей по возрастанию
+    :type user_ids: List[int]
+    :param kind: Вид отчета (weekly или monthly)
+    :type kind: str
+    :param first: Первый день периода
+    :type first: date
+    :param last: Последний день периода
+    :type last: date
+    :returns: Пары (ID пользователя, текст отчета или None, если
+        у пользователя не было привычек в периоде)
+    :type: List[Tuple[int, str или None]]
+    """
+
+    if not user_ids:
+        return []
+    first_day, last_day = first.toordinal(), last.toordinal()
+    bounds = (user_ids[0], user_ids[-1])
+    with _worker_db.reader() as conn:
+        habits = conn.execute(
+            f"""
+            SELECT id, user_id, name, schedule_kind, schedule_value,
+                   {SQL_DAY.format("created_at")}
+            FROM habits
+            WHERE user_id BETWEEN ? AND ?
+              AND (created_at IS NULL OR date(created_at) <= ?)
+            ORDER BY user_id, name
+            """,
+            (*bounds, last.isoformat()),
+        ).fetchall()
+        history: Dict[int, List[int]] = {}
+        for hid, day in conn.execute(
+            """
+            SELECT c.habit_id, c.completion_date
+            FROM completion_history c
+            JOIN habits h ON h.id = c.habit_id
+            WHERE h.user_id BETWEEN ? AND ? AND c.completion_date <= ?
+            ORDER BY c.habit_id, c.completion_date
+            """,
+            (*bounds, last_day),
+        ):
+            history.setdefault(hid, []).append(day)
+
+    by_user: Dict[int, List[HabitReport]] = {}
+    for hid, uid, name, kind_, value, created in habits:
+        by_user.setdefault(uid, []).append(
+            habit_report(
+                name,
+                Schedule(kind_, value),
+                created if created is not None else first_day,
+                history.get(hid, []),
+                first_day,
+                last_day,
+            )
+        )
+    return [
+        (
+            uid,
+            (
+                render_report(kind, first, last, by_user[uid])
+                if uid in by_user
+                else None
+            ),
+        )
+        for uid in user_ids
+    ]
+
+
+class TokenBucket:
+    """
+    Ограничение частоты отправки: rate сообщений в секунду
+    с допустимым всплеском burst
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def load_checkpoint(path: Optional[str], kind: str, first: date) -> Dict:
+    """
+    Чтение контрольной точки рассылки
+
+    Контрольная точка другого периода или вида отчета игнорируется
+
+    :param path: Файл контрольной точки (None - начать сначала)
+    :type path: str или None
+    :param kind: Вид отчета
+    :type kind: str
+    :param first: Первый день периода
+    :type first: date
+    :returns: Состояние рассылки
+    :type: Dict
+    """
+
+    state = {
+        "kind": kind,
+        "period": first.isoformat(),
+        "last_user_id": 0,
+        "users": 0,
+        "sent": 0,
+        "skipped": 0,
+        "failed": 0,
+        "done": False,
+    }
+    if not path:
+        return state
+    try:
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        return state
+    except (OSError, ValueError) as e:
+        logger.warning("Report checkpoint ignored: %s", e)
+        return state
+    if saved.get("kind") == kind and saved.get("period") == state["period"]:
+        state.update(saved)
+    return state
+
+
+def save_checkpoint(path: str, state: Dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+async def run_reports(
+    db_path: str,
+    send: Sender,
+    kind: str = "weekly",
+    today: Optional[date] = None,
+    chunk: int = config.report_chunk,
+    workers: int = config.report_workers,
+    rate: float = config.report_rate,
+    checkpoint: Optional[str] = config.report_checkpoint,
+) -> ReportStats:
+    """
+    Рассылка отчетов всем пользователям
+
+    ID пользователей читаются порциями по chunk, отчеты порций строятся
+    параллельно в workers процессах и отправляются по порядку через
+    send с частотой не выше rate сообщений в секунду (0 - без
+    ограничения). После каждой порции и при остановке сохраняется
+    контрольная точка: ID последнего обработанного пользователя,
+    повторный запуск продолжает рассылку с него
+
+    :param db_path: Путь к файлу базы данных
+    :type db_path: str
+    :param send: Корутина отправки (ID пользователя, текст). ServiceError
+        считается недоставкой одному пользователю, остальные исключения
+        прерывают рассылку
+    :type send: Sender
+    :param kind: Вид отчета (weekly или monthly)
+    :type kind: str
+    :param today: Текущая дата (по умолчанию сегодня)
+    :type today: date или None
+    :param chunk: Размер порции пользователей
+    :type chunk: int
+    :param workers: Количество процессов построения отчетов
+    :type workers: int
+    :param rate: Сообщений в секунду
+    :type rate: float
+    :param checkpoint: Файл контрольной точки (None - без нее)
+    :type checkpoint: str или None
+    :returns: Итоги рассылки с учетом прошлых запусков
+    :type: ReportStats
+    :raises DBError: Если произошла ошибка чтения базы
+    """
+
+    first, last = period_bounds(kind, today)
+    state = load_checkpoint(checkpoint, kind, first)
+    if state["done"]:
+        logger.info("Reports %s %s already sent", kind, first)
+        return ReportStats(
+            state["users"], state["sent"], state["skipped"], state["failed"], 0
+        )
+
+    db = Database(db_path, readers=1, migrate=False)
+    limiter = TokenBucket(rate) if rate else None
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    users_before = state["users"]
+    pending: List[Tuple[int, asyncio.Future]] = []
+    after = state["last_user_id"]
+    ids_done = False
+
+    def submit(pool: ProcessPoolExecutor) -> None:
+        nonlocal after, ids_done
+        ids = db.get_user_ids(after, chunk)
+        if not ids:
+            ids_done = True
+            return
+        after = ids[-1]
+        pending.append(
+            (
+                ids[-1],
+                loop.run_in_executor(
+                    pool, build_reports, ids, kind, first, last
+                ),
+            )
+        )
+
+    try:
+        with ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(db_path,),
+        ) as pool:
+            while True:
+                # порции строятся наперед, пока отправляется текущая
+                while not ids_done and len(pending) <= workers:
+                    submit(pool)
+                if not pending:
+                    break
+                _, future = pending.pop(0)
+                for uid, text in await future:
+                    if text is None:
+                        state["skipped"] += 1
+                    else:
+                        if limiter is not None:
+                            await limiter.acquire()
+                        try:
+                            await send(uid, text)
+                            state["sent"] += 1
+                        except ServiceError as e:
+                            logger.warning("Report to %s failed: %s", uid, e)
+                            state["failed"] += 1
+                    state["users"] += 1
+                    state["last_user_id"] = uid
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    "Reports %s: %d users (%d sent, %d skipped, %d failed),"
+                    " %.1f users/s",
+                    kind,
+                    state["users"],
+                    state["sent"],
+                    state["skipped"],
+                    state["failed"],
+                    (state["users"] - users_before) / max(elapsed, 1e-9),
+                )
+                if checkpoint:
+                    save_checkpoint(checkpoint, state)
+            state["done"] = True
+    finally:
+        for _, future in pending:
+            future.cancel()
+        if checkpoint:
+            save_checkpoint(checkpoint, state)
+        db.close()
+
+    return ReportStats(
+        state["users"],
+        state["sent"],
+        state["skipped"],
+        state["failed"],
+        time.perf_counter() - start,
+    )
+
+
+def telegram_sender(bot) -> Sender:
+    """
+    Отправка отчетов через Telegram бота
+
+    При RetryAfter отправка повторяется после указанной паузы,
+    заблокировавшие бота и недоступные чаты считаются недоставкой
+
+    :param bot: Объект бота
+    :type bot: telegram.Bot
+    :returns: Корутина отправки для run_reports
+    :type: Sender
+    """
+
+    from telegram.error import BadRequest, Forbidden, RetryAfter
+
+    async def send(uid: int, text: str) -> None:
+        while True:
+            try:
+                await bot.send_message(uid, text)
+                return
+            except RetryAfter as e:
+                delay = e.retry_after
+                await asyncio.sleep(
+                    delay.total_seconds()
+                    if isinstance(delay, timedelta)
+                    else delay
+                )
+            except (BadRequest, Forbidden) as e:
+                raise ServiceError(f"Report not delivered: {e}")
+
+    return send
+
+
+async def _send_all(args: argparse.Namespace) -> ReportStats:
+    if args.dry_run:
+
+        async def send(uid: int, text: str) -> None:
+            pass
+
+        return await run_reports(
+            args.db,
+            send,
+            args.kind,
+            chunk=args.chunk,
+            workers=args.workers,
+            rate=0,
+            checkpoint=None,
+        )
+
+    from dotenv import load_dotenv
+    from telegram import Bot
+
+    load_dotenv()
+    token = os.getenv("TG_BOT_TOKEN")
+    if not token:
+        raise ServiceError("TG_BOT_TOKEN is not set")
+    base_url = os.getenv("TG_API_BASE_URL")
+    bot = Bot(token, base_url=base_url) if base_url else Bot(token)
+    async with bot:
+        return await run_reports(
+            args.db,
+            telegram_sender(bot),
+            args.kind,
+            chunk=args.chunk,
+            workers=args.workers,
+            rate=args.rate,
+            checkpoint=args.checkpoint,
+        )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Habit tracker reports")
+    commands = parser.add_subparsers(dest="command", required=True)
+    send = commands.add_parser(
+        "send", help="send reports for the last finished period"
+    )
+    send.add_argument("--kind", choices=KINDS, default="weekly")
+    send.add_argument("--db", default=config.db_file)
+    send.add_argument("--chunk", type=int, default=config.report_chunk)
+    send.add_argument("--workers", type=int, default=config.report_workers)
+    send.add_argument("--rate", type=float, default=config.report_rate)
+    send.add_argument("--checkpoint", default=config.report_checkpoint)
+    send.add_argument(
+        "--restart",
+        action="store_true",
+        help="ignore the checkpoint and start from the first user",
+    )
+    send.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="build reports without sending them",
+    )
+    args = parser.parse_args(argv)
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    try:
+        stats = asyncio.run(_send_all(args))
+    except (DBError, ServiceError) as e:
+        print(f"Reports error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(
+        f"{stats.users} users: {stats.sent} sent, {stats.skipped} skipped,"
+        f" {stats.failed} failed in {stats.elapsed:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    setup_logging(config.log_level, config.log_levels)
+    main()
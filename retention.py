@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+import config
+from db import Database
+from exceptions import DBError
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionArchiver:
+    """
+    Перенос старой истории выполнений в архивную таблицу
+
+    В оперативной таблице completions остаются выполнения за последние
+    hot_days дней, более старые переносятся в completions_archive.
+    Полная история доступна через Database.get_completion_history
+
+    :ivar db: База данных бота
+    :type db: Database
+    :ivar hot_days: Глубина оперативной истории в днях
+    :type hot_days: int
+    :ivar batch: Размер порции переноса
+    :type batch: int
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        hot_days: int = config.completions_hot_days,
+        batch: int = config.archive_batch,
+    ):
+        self.db = db
+        self.hot_days = hot_days
+        self.batch = batch
+
+    def horizon(self, today: Optional[date] = None) -> date:
+        """
+        Граница оперативной истории
+
+        :param today: Текущая дата (по умолчанию сегодня)
+        :type today: date или None
+        :returns: Дата, более ранние выполнения переносятся в архив
+        :type: date
+        """
+
+        today = today or date.today()
+        return today - timedelta(days=self.hot_days)
+
+    def archive(self, today: Optional[date] = None) -> int:
+        """
+        Перенос выполнений старше границы в архив
+
+        :param today: Текущая дата (по умолчанию сегодня)
+        :type today: date или None
+        :returns: Количество перенесенных выполнений
+        :type: int
+        :raises DBError: Если произошла ошибка при переносе
+        """
+
+        start = time.perf_counter()
+        moved = self.db.archive_completions(self.horizon(today), self.batch)
+        logger.info(
+            "Archived %s completions in %.1f s",
+            moved,
+            time.perf_counter() - start,
+        )
+        return moved
+
+    async def run_periodically(self, interval: float) -> None:
+        """
+        Периодический перенос в архив в фоновом потоке
+
+        :param interval: Интервал между запусками в секундах
+        :type interval: float
+        """
+
+        while True:
+            try:
+                await asyncio.to_thread(self.archive)
+            except DBError as e:
+                logger.error("Periodic archive failed: %s", e)
+            except Exception:
+                logger.exception("Periodic archive error")
+            await asyncio.sleep(interval)
@@ -0,0 +1,92 @@
+import re
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from telegram import Update
+from telegram.ext import BaseHandler
+
+Callback = Callable[[Update, Any], Awaitable[Any]]
+
+
+class TextRouter(BaseHandler):
+    """
+    Маршрутизация текстовых сообщений по точному тексту
+
+    Надписи кнопок ищутся в словаре за O(1) вместо последовательной
+    проверки цепочки filters.Text, регулярные выражения проверяются
+    только если текст не совпал ни с одной кнопкой. Можно использовать
+    как обычный обработчик приложения и внутри ConversationHandler:
+    значение, возвращенное колбэком, передается дальше как состояние
+
+    Обрабатываются только новые сообщения (update.message), как
+    и ожидают обработчики бота
+
+    :ivar routes: Колбэки по точному тексту сообщения
+    :type routes: Dict[str, Callback]
+    :ivar patterns: Регулярные выражения и их колбэки в порядке проверки
+    :type patterns: List[Tuple[re.Pattern, Callback]]
+    """
+
+    def __init__(
+        self,
+        routes: Dict[str, Callback],
+        patterns: Sequence[Tuple[str, Callback]] = (),
+        block: bool = True,
+    ):
+        """
+        Конструктор класса
+
+        :param routes: Колбэки по точному тексту сообщения
+        :type routes: Dict[str, Callback]
+        :param patterns: Пары (регулярное выражение, колбэк), проверяются
+            через re.search, как filters.Regex
+        :type patterns: Sequence[Tuple[str, Callback]]
+        :param block: Ждать ли завершения колбэка перед следующим апдейтом
+        :type block: bool
+        """
+
+        # колбэк выбирается для каждого апдейта в check_update
+        super().__init__(callback=None, block=block)
+        self.routes = dict(routes)
+        self.patterns = [
+            (re.compile(pattern), callback) for pattern, callback in patterns
+        ]
+
+    def check_update(
+        self, update: object
+    ) -> Optional[Tuple[Callback, Optional[re.Match]]]:
+        """
+        Выбор колбэка для апдейта
+
+        :param update: Входящий апдейт
+        :type update: object
+        :returns: Колбэк и совпадение регулярного выражения (None для
+            точного текста) или None, если апдейт не подходит
+        :type: Tuple[Callback, re.Match или None] или None
+        """
+
+        if not isinstance(update, Update) or update.message is None:
+            return None
+        text = update.message.text
+        if text is None:
+            return None
+        callback = self.routes.get(text)
+        if callback is not None:
+            return callback, None
+        for pattern, callback in self.patterns:
+            match = pattern.search(text)
+            if match:
+                return callback, match
+        return None
+
+    def collect_additional_context(
+        self, context, update, application, check_result
+    ) -> None:
+        match = check_result[1]
+        if match is not None:
+            context.matches = [match]
+
+    async def handle_update(self, update, application, check_result, context):
+        self.collect_additional_context(
+            context, update, application, check_result
+        )
+        return await check_result[0](update, context)
@@ -0,0 +1,180 @@
+import re
+from typing import NamedTuple, Optional
+
+# Виды расписаний (habits.schedule_kind)
+DAILY, WEEKDAYS, WEEKLY, INTERVAL = range(4)
+
+WEEKDAY_NAMES = ("пн", "вт", "ср", "чт", "пт", "сб", "вс")
+ALL_WEEKDAYS = (1 << 7) - 1
+
+_WEEKDAYS_RE = re.compile(r"(?:(?:пн|вт|ср|чт|пт|сб|вс)[\s,;]*)+")
+_WEEKLY_RE = re.compile(r"(\d+)\s*(?:раз[а]?\s*)?в\s*неделю")
+_INTERVAL_RE = re.compile(
+    r"(?:раз\s*в|кажд(?:ый|ые))\s*(\d+)\s*(?:день|дня|дней)"
+)
+
+
+def weekday(day: int) -> int:
+    """
+    День недели по номеру дня
+
+    :param day: Номер дня (date.toordinal())
+    :type day: int
+    :returns: День недели, понедельник - 0
+    :type: int
+    """
+
+    return (day - 1) % 7
+
+
+def week_start(day: int) -> int:
+    """
+    Номер понедельника недели, в которую входит день
+
+    :param day: Номер дня (date.toordinal())
+    :type day: int
+    :returns: Номер дня понедельника
+    :type: int
+    """
+
+    return day - weekday(day)
+
+
+class Schedule(NamedTuple):
+    """
+    Расписание привычки
+
+    Хранится в двух целых числах: виде расписания и его параметре.
+    Для WEEKDAYS параметр - битовая маска дней недели (бит 0 - понедельник),
+    для WEEKLY - количество выполнений в неделю, для INTERVAL - период
+    в днях, для DAILY параметр не используется
+    """
+
+    kind: int = DAILY
+    value: int = 0
+
+    def missed(self, last: int, day: int) -> bool:
+        """
+        Пропущен ли обязательный день между выполнениями
+
+        Для WEEKLY пропуски определяются по неделям и здесь не учитываются
+
+        :param last: День предыдущего выполнения
+        :type last: int
+        :param day: День нового выполнения
+        :type day: int
+        :returns: True если между last и day (не включая) был обязательный день
+        :type: bool
+        """
+
+        if self.kind == WEEKDAYS:
+            between = day - last - 1
+            if between < 0:
+                return True
+            if between >= 7:
+                return bool(self.value)
+            # маска дней недели с last + 1 по day - 1, свернутая в 7 бит
+            window = ((1 << between) - 1) << weekday(last + 1)
+            window = (window | window >> 7) & ALL_WEEKDAYS
+            return bool(window & self.value)
+        if self.kind == INTERVAL:
+            return not 0 < day - last <= self.value
+        if self.kind == WEEKLY:
+            return False
+        return day - last != 1
+
+    def is_due(self, last: Optional[int], count: int, day: int) -> bool:
+        """
+        Нужно ли выполнить привычку в этот день
+
+        Совпадает с условием, по которому Database.get_due_habits отбирает
+        привычки в SQL
+
+        :param last: День последнего выполнения
+        :type last: int или None
+        :param count: Количество выполнений за неделю последнего выполнения
+        :type count: int
+        :param day: Проверяемый день
+        :type day: int
+        :returns: True если привычка не выполнена и запланирована на день
+        :type: bool
+        """
+
+        if last == day:
+            return False
+        if self.kind == WEEKDAYS:
+            return bool(self.value >> weekday(day) & 1)
+        if self.kind == WEEKLY:
+            return (
+                last is None
+                or week_start(last) != week_start(day)
+                or count < self.value
+            )
+        if self.kind == INTERVAL:
+            return last is None or day - last >= self.value
+        return True
+
+    def describe(self) -> str:
+        """
+        Описание расписания для пользователя
+
+        :returns: Текст вида "пн, ср, пт" или "3 раза в неделю"
+        :type: str
+        """
+
+        if self.kind == WEEKDAYS:
+            return ", ".join(
+                name
+                for i, name in enumerate(WEEKDAY_NAMES)
+                if self.value >> i & 1
+            )
+        if self.kind == WEEKLY:
+            return f"{self.value} раз(а) в неделю"
+        if self.kind == INTERVAL:
+            return f"раз в {self.value} дн."
+        return "каждый день"
+
+
+DAILY_SCHEDULE = Schedule()
+
+
+def parse_schedule(text: str) -> Schedule:
+    """
+    Разбор расписания, введенного пользователем
+
+    Поддерживаются "каждый день", дни недели ("пн ср пт"),
+    "3 раза в неделю" и "каждые 2 дня"
+
+    :param text: Текст расписания
+    :type text: str
+    :returns: Расписание
+    :type: Schedule
+    :raises ValueError: Если расписание не распознано
+    """
+
+    text = text.strip().casefold()
+    if text in ("", "каждый день", "ежедневно"):
+        return DAILY_SCHEDULE
+    if _WEEKDAYS_RE.fullmatch(text):
+        mask = 0
+        for i, name in enumerate(WEEKDAY_NAMES):
+            if name in text:
+                mask |= 1 << i
+        return (
+            DAILY_SCHEDULE
+            if mask == ALL_WEEKDAYS
+            else Schedule(WEEKDAYS, mask)
+        )
+    match = _WEEKLY_RE.fullmatch(text)
+    if match:
+        times = int(match.group(1))
+        if not 1 <= times <= 7:
+            raise ValueError(f"Invalid times per week: {times}")
+        return DAILY_SCHEDULE if times == 7 else Schedule(WEEKLY, times)
+    match = _INTERVAL_RE.fullmatch(text)
+    if match:
+        days = int(match.group(1))
+        if days < 1:
+            raise ValueError(f"Invalid interval: {days}")
+        return DAILY_SCHEDULE if days == 1 else Schedule(INTERVAL, days)
+    raise ValueError(f"Unknown schedule: {text}")
@@ -0,0 +1,178 @@
+import argparse
+import sys
+import time
+from typing import Iterable, NamedTuple, Optional
+
+import config
+from exceptions import DBError
+from logs import setup_logging
+from schedules import DAILY_SCHEDULE, WEEKLY, Schedule, week_start, weekday
+
+# Разница между CAST(julianday(d) AS INTEGER) в SQLite и date.toordinal()
+JULIAN_DAY_OFFSET = 1721424
+
+
+class StreakState(NamedTuple):
+    """
+    Состояние серии выполнений привычки
+
+    Дни задаются целыми порядковыми номерами (date.toordinal()),
+    поэтому переход к следующему выполнению - целочисленная арифметика.
+    count - количество выполнений за неделю последнего выполнения,
+    по нему оцениваются расписания "N раз в неделю"
+    """
+
+    current: int = 0
+    longest: int = 0
+    last: Optional[int] = None
+    count: int = 0
+
+
+def advance(
+    state: StreakState, day: int, schedule: Schedule = DAILY_SCHEDULE
+) -> StreakState:
+    """
+    Учет одного выполнения привычки за O(1)
+
+    Повторное выполнение в тот же день ничего не меняет. Серия
+    продолжается, если между выполнениями не было пропущено ни одного
+    дня по расписанию, для расписания "N раз в неделю" - если
+    выполнение в той же неделе или предыдущая неделя выполнена
+    полностью. Иначе начинается новая серия
+
+    :param state: Состояние серии до выполнения
+    :type state: StreakState
+    :param day: День выполнения
+    :type day: int
+    :param schedule: Расписание привычки (по умолчанию каждый день)
+    :type schedule: Schedule
+    :returns: Состояние серии после выполнения
+    :type: StreakState
+    """
+
+    if state.last is None:
+        current, count = 1, 1
+    else:
+        if day - state.last == 0:
+            return state
+        weeks = week_start(day) - week_start(state.last)
+        count = state.count + 1 if weeks == 0 else 1
+        if schedule.kind == WEEKLY:
+            kept = weeks == 0 or (weeks == 7 and state.count >= schedule.value)
+        else:
+            kept = not schedule.missed(state.last, day)
+        current = state.current + 1 if kept else 1
+    return StreakState(current, max(state.longest, current), day, count)
+
+
+def broken(
+    state: StreakState, day: int, schedule: Schedule = DAILY_SCHEDULE
+) -> bool:
+    """
+    Проверка, прервана ли серия к наступившему дню
+
+    Серия прервана, если выполнение в этот день уже не продолжило бы ее
+
+    :param state: Состояние серии
+    :type state: StreakState
+    :param day: Текущий день
+    :type day: int
+    :param schedule: Расписание привычки (по умолчанию каждый день)
+    :type schedule: Schedule
+    :returns: True если текущую серию нужно сбросить
+    :type: bool
+    """
+
+    if state.current == 0 or state.last is None or state.last >= day:
+        return False
+    return advance(state, day, schedule).current == 1
+
+
+def extend_run(
+    state: StreakState,
+    first: int,
+    last: int,
+    schedule: Schedule = DAILY_SCHEDULE,
+) -> StreakState:
+    """
+    Учет выполнений подряд с first по last день
+
+    Результат совпадает с вызовом advance для каждого дня. Внутри
+    серии дней подряд обязательных дней не пропущено, поэтому для всех
+    расписаний, кроме "N раз в неделю", учет выполняется за O(1).
+    Используется при пересчете, когда дни подряд уже сгруппированы
+    на стороне SQLite
+
+    :param state: Состояние серии до выполнений, state.last < first
+    :type state: StreakState
+    :param first: Первый день серии
+    :type first: int
+    :param last: Последний день серии
+    :type last: int
+    :param schedule: Расписание привычки (по умолчанию каждый день)
+    :type schedule: Schedule
+    :returns: Состояние серии после выполнений
+    :type: StreakState
+    """
+
+    if schedule.kind == WEEKLY:
+        return replay(range(first, last + 1), state, schedule)
+    state = advance(state, first, schedule)
+    extra = last - first
+    current = state.current + extra
+    if week_start(last) == week_start(first):
+        count = state.count + extra
+    else:
+        count = weekday(last) + 1
+    return StreakState(current, max(state.longest, current), last, count)
+
+
+def replay(
+    days: Iterable[int],
+    state: StreakState = StreakState(),
+    schedule: Schedule = DAILY_SCHEDULE,
+) -> StreakState:
+    """
+    Последовательный учет выполнений
+
+    :param days: Дни выполнений по возрастанию
+    :type days: Iterable[int]
+    :param state: Начальное состояние серии
+    :type state: StreakState
+    :param schedule: Расписание привычки (по умолчанию каждый день)
+    :type schedule: Schedule
+    :returns: Итоговое состояние серии
+    :type: StreakState
+    """
+
+    for day in days:
+        state = advance(state, day, schedule)
+    return state
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Habit streaks maintenance")
+    parser.add_argument("--db", default=config.db_file)
+    parser.add_argument("--chunk", type=int, default=1000)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "recompute", help="rebuild streaks and counters from history"
+    )
+    args = parser.parse_args(argv)
+
+    from db import Database
+
+    start = time.perf_counter()
+    try:
+        habits = Database(args.db).recompute_streaks(args.chunk)
+    except DBError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print(f"recomputed {habits} habits in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    setup_logging(
+        config.log_level, config.log_levels, config.log_format, config.log_json
+    )
+    main()
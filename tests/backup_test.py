@@ -0,0 +1,133 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)  # Указание пути к корню проекта для импорта из директорий на уровень выше
+from backup import BackupManager, restore_backup, verify_backup
+from db import Database
+from exceptions import ServiceError
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "habits.sql"))
+    db.add_habit(12345, "qwerty1")
+    db.add_habit(12345, "qwerty2")
+    yield db
+    db.close()
+
+
+def test_backup_compressed_and_verify(db, tmp_path):
+    """
+    Сжатая резервная копия создается и проходит проверку
+    """
+
+    manager = BackupManager(db, str(tmp_path / "backups"), compress=True)
+    path = manager.backup()
+
+    assert path.name.endswith(".sql.gz")
+    assert manager.backups() == [path]
+    assert verify_backup(str(path)) == 2
+
+
+def test_backup_rotation(db, tmp_path):
+    """
+    Хранятся только последние keep копий
+    """
+
+    manager = BackupManager(
+        db, str(tmp_path / "backups"), keep=2, compress=False
+    )
+    paths = [manager.backup() for _ in range(3)]
+
+    assert manager.backups() == paths[1:]
+    assert not paths[0].exists()
+
+
+def test_backup_rotation_error(db, tmp_path, monkeypatch):
+    """
+    Ошибка удаления старой копии не останавливает периодическое копирование
+    """
+
+    manager = BackupManager(db, str(tmp_path / "backups"), keep=1)
+    calls = []
+
+    def rotate():
+        calls.append(1)
+        if len(calls) == 3:
+            raise asyncio.CancelledError
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(manager, "rotate", rotate)
+    with pytest.raises(ServiceError, match="rotation"):
+        manager.backup()
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(manager.run_periodically(0))
+    assert len(calls) == 3
+
+
+def test_restore_backup(db, tmp_path):
+    """
+    Восстановление базы из резервной копии
+    """
+
+    path = BackupManager(db, str(tmp_path / "backups")).backup()
+    target = str(tmp_path / "restored.sql")
+
+    assert restore_backup(str(path), target) == 2
+    restored = Database(target)
+    assert [h.name for h in restored.get_user_habits(12345)] == [
+        "qwerty1",
+        "qwerty2",
+    ]
+
+
+def test_verify_broken_backup(tmp_path):
+    """
+    Поврежденная копия не проходит проверку
+    """
+
+    path = tmp_path / "habits-broken.sql"
+    path.write_bytes(b"not a database" * 100)
+    with pytest.raises(ServiceError):
+        verify_backup(str(path))
+
+
+def test_backup_does_not_block_writes(db, tmp_path):
+    """
+    Запись во время копирования не ждет окончания копии и попадает в нее
+    """
+
+    with db.writer() as conn:
+        conn.executemany(
+            "INSERT INTO habits (user_id, name) VALUES (?, ?)",
+            ((1, f"habit {i} " + "x" * 200) for i in range(2000)),
+        )
+        conn.commit()
+    manager = BackupManager(
+        db, str(tmp_path / "backups"), compress=False, pages=1, pause=0.002
+    )
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(p=manager.backup()))
+    thread.start()
+    time.sleep(0.05)
+
+    start = time.perf_counter()
+    db.add_habit(777, "during backup")
+    latency = time.perf_counter() - start
+    assert thread.is_alive()
+    thread.join()
+
+    assert latency < 0.5
+    conn = sqlite3.connect(result["p"])
+    assert conn.execute(
+        "SELECT COUNT(*) FROM habits WHERE user_id = 777"
+    ).fetchone() == (1,)
+    conn.close()
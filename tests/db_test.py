@@ -4,13 +4,14 @@ import pytest
 import sys
 import os
 import sqlite3
-from datetime import date, datetime
+from datetime import date
 
 sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 )  # Указание пути к корню проекта для импорта из директорий на уровень выше
 from db import Database
 from exceptions import DBError
+from models import Habit
 
 
 def convert_to_mock_row(row):
@@ -118,6 +119,21 @@ def test_get_habbit_sucess():
     assert habits[0]["name"] == "qwerty1"
 
 
+def test_get_user_habits_records(tmp_path):
+    """
+    Привычки возвращаются записями Habit, созданными фабрикой строк
+    """
+
+    db = Database(str(tmp_path / "habits.sql"))
+    hid = db.add_habit(12345, "qwerty1")
+    db.add_habit(54321, "qwerty2")
+
+    habits = db.get_user_habits(12345)
+    assert habits == [Habit(hid, "qwerty1", habits[0].created_at, None, 0, 0, 0, 0, 0)]
+    assert isinstance(habits[0], Habit)
+    assert habits[0].name == "qwerty1"
+
+
 def test_delete_habit_sucess():
     """
     Положительный тест удаления привычки
@@ -171,9 +187,15 @@ def test_complete_habit_success():
     habit_data = {
         "id": 1,
         "user_id": 12345,
-        "last_completed": "2025-12-17",
+        "last_completed": date(2025, 12, 17).toordinal(),
         "current_streak": 5,
         "total_completions": 10,
+        "longest_streak": 7,
+        "week_count": 1,
+        "schedule_kind": 0,
+        "schedule_value": 0,
+        # текущий день пользователя из timezones
+        "today": date(2025, 12, 18).toordinal(),
     }
     mock_cursor.fetchone.side_effect = [
         convert_to_mock_row(habit_data),
@@ -182,17 +204,10 @@ def test_complete_habit_success():
 
     db.connect = Mock(return_value=mock_conn)
 
-    with patch("db.datetime") as mock_datetime:
-        mock_now = Mock()
-        mock_now.date.return_value = datetime(2025, 12, 18)
-        mock_datetime.strptime.return_value = Mock()
-        mock_datetime.strptime.return_value.date.return_value = date(
-            2025, 12, 17
-        )
-
-        result = db.complete_habit(1, 12345)
+    result = db.complete_habit(1, 12345)
 
-    assert mock_cursor.execute.call_count == 3
+    assert mock_cursor.execute.call_count == 4
+    assert "INSERT INTO completions" in mock_cursor.execute.call_args_list[2][0][0]
     mock_conn.commit.assert_called_once()
     assert isinstance(result, dict) is True
 
@@ -209,17 +224,240 @@ def test_habit_already_complete():
     habit_data = {
         "id": 1,
         "user_id": 12345,
-        "last_completed": "2025-12-18",
+        "last_completed": date(2025, 12, 18).toordinal(),
         "current_streak": 5,
+        "today": date(2025, 12, 18).toordinal(),
     }
     mock_row = convert_to_mock_row(habit_data)
     mock_cursor.fetchone.return_value = mock_row
     db.connect = Mock(return_value=mock_conn)
 
-    with patch("db.datetime") as mock_datetime:
-        mock_now = Mock()
-        mock_now.date.return_value = date(2025, 12, 18)
-        mock_datetime.now.return_value = mock_now
+    with pytest.raises(DBError, match="Habit is completed today"):
+        db.complete_habit(1, 12345)
+
+
+def test_complete_habits_batch(tmp_path):
+    """
+    Выполнение нескольких привычек одной транзакцией
+    """
+
+    db = Database(str(tmp_path / "habits.sql"))
+    hid1 = db.add_habit(12345, "qwerty1")
+    hid2 = db.add_habit(12345, "qwerty2")
+    foreign = db.add_habit(54321, "qwerty3")
+
+    completed = db.complete_habits(12345, [hid1, hid2, hid2, foreign])
+    assert sorted(habit.id for habit in completed) == [hid1, hid2]
+    assert all(habit.current_streak == 1 for habit in completed)
+    assert all(habit.total_completions == 1 for habit in completed)
+    assert db.get_user_habits(54321)[0].total_completions == 0
+
+    assert db.complete_habits(12345, [hid1, hid2]) == []
+
+
+def test_complete_habits_single_executemany():
+    """
+    Обновления и записи истории выполняются пакетно одним коммитом
+    """
+
+    db = Database(":memory:")
+    mock_conn = Mock()
+    mock_cursor = Mock()
+    mock_conn.cursor.return_value = mock_cursor
+    today = date(2025, 12, 18).toordinal()
+    mock_cursor.fetchall.side_effect = [
+        [
+            (1, 5, 7, today - 1, 1, 0, 0, today),
+            (2, 0, 0, None, 0, 0, 0, today),
+        ],
+        [],
+    ]
+    db.connect = Mock(return_value=mock_conn)
+
+    db.complete_habits(12345, [1, 2])
+    assert mock_cursor.executemany.call_count == 2
+    update, insert = mock_cursor.executemany.call_args_list
+    assert "UPDATE habits" in update[0][0] and len(update[0][1]) == 2
+    assert "INSERT INTO completions" in insert[0][0] and len(insert[0][1]) == 2
+    mock_conn.commit.assert_called_once()
+
+
+def test_search_habits(tmp_path):
+    """
+    Поиск по части названия в пределах привычек пользователя
+    """
+
+    db = Database(str(tmp_path / "habits.sql"))
+    run = db.add_habit(12345, "Утренний бег")
+    read = db.add_habit(12345, "Чтение книг")
+    db.add_habit(54321, "Вечерний бег")
+
+    assert [h.id for h in db.search_habits(12345, "БЕГ")] == [run]
+    assert [h.id for h in db.search_habits(12345, "чт")] == [read]
+    assert db.search_habits(12345, 'бег" OR "книг') == []
+    assert db.search_habits(12345, "  ") == []
 
-        with pytest.raises(DBError, match="Habit is completed today"):
-            db.complete_habit(1, 12345)
+    db.delete_habit(12345, run)
+    assert db.search_habits(12345, "бег") == []
+    assert len(db.search_habits(54321, "бег")) == 1
+
+
+def test_search_index_built_for_existing_habits(tmp_path):
+    """
+    Индекс заполняется для привычек, созданных до его появления
+    """
+
+    path = str(tmp_path / "habits.sql")
+    db = Database(path)
+    hid = db.add_habit(12345, "Медитация")
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE habits_fts")
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    assert [h.id for h in db.search_habits(12345, "медит")] == [hid]
+
+
+def test_reader_pool_readonly_wal(tmp_path):
+    """
+    Чтение идет через read-only соединения пула, база в режиме WAL
+    """
+
+    db = Database(str(tmp_path / "habits.sql"), readers=2)
+    db.add_habit(12345, "qwerty1")
+
+    with db.reader() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("DELETE FROM habits")
+        with db.reader() as other:
+            assert other is not conn
+    with db.reader() as again:
+        assert again in (conn, other)
+    assert db._pool_size == 2
+    assert len(db.get_user_habits(12345)) == 1
+    db.close()
+
+
+def test_writer_rollback_on_error(tmp_path):
+    """
+    Незавершенная транзакция соединения на запись откатывается при ошибке
+    """
+
+    db = Database(str(tmp_path / "habits.sql"))
+    with pytest.raises(RuntimeError):
+        with db.writer() as conn:
+            conn.execute("INSERT INTO habits (user_id, name) VALUES (1, 'q')")
+            raise RuntimeError()
+    assert db.get_user_habits(1) == []
+
+
+def test_complete_habit_records_history(tmp_path):
+    """
+    Выполнение привычки записывается в историю выполнений
+    """
+
+    db = Database(str(tmp_path / "habits.sql"))
+    hid = db.add_habit(12345, "qwerty1")
+
+    res = db.complete_habit(hid, 12345)
+    assert (res["current_streak"], res["total_completions"]) == (1, 1)
+    assert db.get_completion_history(12345) == [(hid, res["last_completed"])]
+    with pytest.raises(DBError, match="Habit is completed today"):
+        db.complete_habit(hid, 12345)
+
+
+def test_complete_foreign_habit_not_found(tmp_path):
+    """
+    Выполнение чужой или удаленной привычки отклоняется как не найденной
+    """
+
+    db = Database(str(tmp_path / "habits.sql"))
+    hid = db.add_habit(12345, "qwerty")
+
+    with pytest.raises(DBError, match="not found"):
+        db.complete_habit(hid, 54321)
+    db.delete_habit(12345, hid)
+    with pytest.raises(DBError, match="not found"):
+        db.complete_habit(hid, 12345)
+
+
+def test_day_numbers_migration(tmp_path):
+    """
+    Перевод дат из строк YYYY-MM-DD в номера дней в существующей базе
+    """
+
+    path = str(tmp_path / "old.sql")
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE habits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_completed DATE,
+            current_streak INTEGER DEFAULT 0,
+            total_completions INTEGER DEFAULT 0,
+            UNIQUE(user_id, name)
+        );
+        CREATE TABLE completions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            habit_id INTEGER NOT NULL,
+            completion_date DATE NOT NULL,
+            UNIQUE(habit_id, completion_date)
+        );
+        CREATE TABLE completions_archive (
+            habit_id INTEGER NOT NULL,
+            completion_date DATE NOT NULL,
+            PRIMARY KEY (habit_id, completion_date)
+        ) WITHOUT ROWID;
+        CREATE TABLE stats_daily (
+            day DATE PRIMARY KEY,
+            active_users INTEGER NOT NULL DEFAULT 0,
+            completions INTEGER NOT NULL DEFAULT 0,
+            habits_created INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+        CREATE TABLE stats_totals (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            habits INTEGER NOT NULL DEFAULT 0,
+            completions INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT INTO habits (user_id, name, created_at, last_completed,
+                            current_streak, total_completions)
+        VALUES (1, 'run', '2025-01-01 10:00:00', '2025-03-02', 2, 3);
+        INSERT INTO completions (habit_id, completion_date)
+        VALUES (1, '2025-03-01'), (1, '2025-03-02');
+        INSERT INTO completions_archive VALUES (1, '2025-01-05');
+        INSERT INTO stats_daily (day, active_users, completions)
+        VALUES ('2025-03-02', 1, 1);
+        INSERT INTO stats_totals VALUES (1, 1, 3);
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    assert db.get_completion_history(1) == [
+        (1, date(2025, 1, 5)),
+        (1, date(2025, 3, 1)),
+        (1, date(2025, 3, 2)),
+    ]
+    assert db.get_user_habits(1)[0].last_completed == date(2025, 3, 2)
+    assert db.get_stats(date(2025, 3, 2))[1:3] == (1, 1)
+    with db.reader() as conn:
+        columns = [
+            row[1] for row in conn.execute("PRAGMA table_info(completions)")
+        ]
+    assert columns == ["habit_id", "completion_date"]
+
+    res = db.complete_habit(1, 1, day=date(2025, 3, 3))
+    assert res["current_streak"] == 3
+    assert res["last_completed"] == date(2025, 3, 3)
+    assert db.get_stats(date(2025, 3, 3))[1:3] == (1, 1)
+    db.close()
+    # повторный запуск миграций ничего не меняет
+    db = Database(path)
+    assert len(db.get_completion_history(1)) == 4
+    db.close()
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)  # Указание пути к корню проекта для импорта из директорий на уровень выше
+from keyboards import COMPLETE_KB, DELETE_KB, KeyboardCache
+from models import Habit
+
+DAY = 739000
+
+
+def test_cache_hit_and_bump():
+    """
+    Тест повторного использования клавиатуры и сброса по версии
+    """
+    cache = KeyboardCache()
+    assert cache.get(1, COMPLETE_KB, DAY) is None
+    cache.put(1, COMPLETE_KB, DAY, "complete")
+    cache.put(1, DELETE_KB, DAY, "delete")
+    cache.put(2, COMPLETE_KB, DAY, "other")
+
+    assert cache.get(1, COMPLETE_KB, DAY) == "complete"
+    assert cache.get(1, DELETE_KB, DAY) == "delete"
+
+    cache.bump(1)
+
+    assert cache.get(1, COMPLETE_KB, DAY) is None
+    assert cache.get(1, DELETE_KB, DAY) is None
+    assert cache.get(2, COMPLETE_KB, DAY) == "other"
+    assert (cache.hits, cache.misses) == (3, 3)
+
+
+def test_cache_day_rollover_and_size():
+    """
+    Тест удаления записей прошлого дня и вытеснения старых записей
+    """
+    cache = KeyboardCache(size=2)
+    cache.put(1, COMPLETE_KB, DAY, "a")
+    cache.put(2, COMPLETE_KB, DAY, "b")
+    cache.get(1, COMPLETE_KB, DAY)
+    cache.put(3, COMPLETE_KB, DAY, "c")
+
+    assert cache.get(2, COMPLETE_KB, DAY) is None
+    assert cache.get(1, COMPLETE_KB, DAY) == "a"
+
+    # записи соседних дней остаются: у пользователей разные часовые пояса
+    assert cache.get(3, COMPLETE_KB, DAY + 1) is None
+    assert cache.get(1, COMPLETE_KB, DAY) == "a"
+
+    cache.bump(1)
+    assert cache.get(3, COMPLETE_KB, DAY + 3) is None
+    assert len(cache) == 0
+    assert cache.version(1) == 0
+
+    for uid in (1, 2, 3):
+        cache.set_offset(uid, uid * 60)
+    assert cache.offset(1) is None
+    assert (cache.offset(2), cache.offset(3)) == (120, 180)
+
+
+@pytest.fixture
+def handler():
+    pytest.importorskip("telegram")
+    from handlers import Handler
+
+    db = MagicMock()
+    db.get_user_offset.return_value = 180
+    db.get_due_habits.return_value = [
+        Habit(1, "Зарядка", None, None, 0, 0, 0, 0, 0),
+        Habit(2, "Чтение", None, None, 0, 0, 0, 0, 0),
+    ]
+    db.complete_habit.return_value = {"name": "Зарядка", "current_streak": 1}
+    handler = Handler(db)
+    handler.reply = AsyncMock()
+    return handler
+
+
+def make_update(text: str) -> MagicMock:
+    update = MagicMock()
+    update.effective_user.id = 42
+    update.message.text = text
+    return update
+
+
+def test_complete_keyboard_reused_until_completion(handler):
+    """
+    Тест: повторное открытие списка не обращается к базе,
+    выполнение привычки сбрасывает клавиатуру
+    """
+    ctx = MagicMock()
+    open_list = make_update("✅ Выполнить привычку")
+
+    asyncio.run(handler.habits_list_to_complete(open_list, ctx))
+    calls = len(handler.db.method_calls)
+    asyncio.run(handler.habits_list_to_complete(open_list, ctx))
+
+    assert len(handler.db.method_calls) == calls
+    assert handler.db.get_user_offset.call_count == 1
+    assert handler.db.get_due_habits.call_count == 1
+    first, second = handler.reply.call_args_list
+    assert first.args[2] is second.args[2]
+
+    asyncio.run(handler.complete_habit(make_update("☑️ Зарядка (ID: 1)"), ctx))
+    asyncio.run(handler.habits_list_to_complete(open_list, ctx))
+
+    assert handler.db.get_due_habits.call_count == 2
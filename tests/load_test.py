@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+BENCHMARKS = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "benchmarks")
+)
+sys.path.insert(0, BENCHMARKS)
+from fake_bot_api import FakeBotApi
+from load_bench import count_errors, run_load, start_bot, stop_bot
+
+
+def test_bot_against_fake_api(tmp_path):
+    """
+    Сквозной прогон сценария пользователей через локальный Bot API
+    """
+
+    pytest.importorskip("telegram")
+    pytest.importorskip("dotenv")
+    log_path = str(tmp_path / "bot.log")
+    with FakeBotApi() as api:
+        proc = start_bot(api, str(tmp_path), log_path)
+        try:
+            assert api.polling.wait(30), open(log_path).read()
+            stats = run_load(api, users=2, rounds=1, habits=2, timeout=10)
+        finally:
+            stop_bot(proc)
+
+    assert not stats.errors, open(log_path).read()
+    assert stats.steps == api.calls["sendMessage"] > 0
+    assert count_errors(log_path) == 0
+    assert (tmp_path / "habits.sql").exists()
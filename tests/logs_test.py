@@ -0,0 +1,82 @@
+import io
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)  # Указание пути к корню проекта для импорта из директорий на уровень выше
+from logs import LazyQueueHandler, setup_logging
+
+
+@pytest.fixture
+def restore_logging():
+    """
+    Восстановление состояния корневого логгера после теста
+    """
+
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    logging.getLogger("noisy").setLevel(logging.NOTSET)
+
+
+def test_setup_logging_writes_through_listener(restore_logging):
+    """
+    Записи форматируются слушателем и попадают в поток вывода
+    """
+
+    out = io.StringIO()
+    listener = setup_logging(
+        "INFO", fmt="%(levelname)s %(message)s", stream=out
+    )
+    logging.getLogger("db").info("Habit %s completed", 42)
+    listener.stop()
+
+    assert out.getvalue() == "INFO Habit 42 completed\n"
+    assert isinstance(logging.getLogger().handlers[0], LazyQueueHandler)
+
+
+def test_setup_logging_module_levels(restore_logging):
+    """
+    Уровни отдельных модулей отсекают записи до постановки в очередь
+    """
+
+    out = io.StringIO()
+    listener = setup_logging(
+        "DEBUG", {"noisy": "WARNING"}, fmt="%(name)s %(message)s", stream=out
+    )
+    logging.getLogger("noisy").info("skipped")
+    logging.getLogger("noisy").warning("kept")
+    logging.getLogger("db").debug("debug")
+    listener.stop()
+    listener.stop()
+
+    assert out.getvalue().splitlines() == ["noisy kept", "db debug"]
+
+
+def test_setup_logging_json(restore_logging):
+    """
+    Структурированный вывод в JSON, включая поля extra
+    """
+
+    out = io.StringIO()
+    listener = setup_logging("INFO", json_format=True, stream=out)
+    logging.getLogger("db").error(
+        "Habit complete error: %s", "locked", extra={"uid": 12345}
+    )
+    listener.stop()
+
+    record = json.loads(out.getvalue())
+    assert record["level"] == "ERROR"
+    assert record["logger"] == "db"
+    assert record["message"] == "Habit complete error: locked"
+    assert record["uid"] == 12345
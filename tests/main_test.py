@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Верхняя граница времени запуска до начала polling, с запасом для CI
+STARTUP_TIME_LIMIT = 5.0
+
+
+def test_import_main_is_lazy():
+    """
+    Импорт main не тянет за собой telegram, dotenv и обработчики
+    """
+
+    code = (
+        "import sys, main; "
+        "print(sorted(m for m in ('telegram', 'dotenv', 'handlers', 'db') "
+        "if m in sys.modules))"
+    )
+    res = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert res.stdout.strip() == "[]"
+
+
+def test_profile_startup_time(tmp_path):
+    """
+    Регрессионный тест на время запуска в режиме --profile-startup
+    """
+
+    pytest.importorskip("telegram")
+    pytest.importorskip("dotenv")
+    env = dict(os.environ, TG_BOT_TOKEN="123456:TEST")
+    start = time.perf_counter()
+    res = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "main.py"), "--profile-startup"],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    elapsed = time.perf_counter() - start
+
+    assert res.returncode == 0, res.stderr
+    assert "import telegram.ext" in res.stdout
+    assert "db init (migrations)" in res.stdout
+    assert (tmp_path / "habits.sql").exists()
+    assert elapsed < STARTUP_TIME_LIMIT
+
+
+def test_parse_admin_ids():
+    """
+    Разбор ADMIN_IDS с пробелами и пустыми элементами
+    """
+
+    sys.path.insert(0, ROOT)
+    from main import parse_admin_ids
+
+    assert parse_admin_ids(None) == frozenset()
+    assert parse_admin_ids("") == frozenset()
+    assert parse_admin_ids(" 12, 34,,") == {12, 34}
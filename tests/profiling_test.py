@@ -0,0 +1,173 @@
+import asyncio
+import os
+import pstats
+import sys
+import time
+from unittest.mock import Mock
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)  # Указание пути к корню проекта для импорта из директорий на уровень выше
+pytest.importorskip("telegram")
+from telegram.ext import Application, CommandHandler, ConversationHandler
+
+from exceptions import ServiceError
+from profiling import Profiler, parse_limit
+from router import TextRouter
+
+
+def busy_work(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def command(update, context):
+    busy_work(0.05)
+
+
+async def button(update, context):
+    busy_work(0.05)
+    return ConversationHandler.END
+
+
+def make_app():
+    app = Application.builder().token("123456:TEST").build()
+    router = TextRouter({"Кнопка": button})
+    app.add_handler(CommandHandler("work", command))
+    app.add_handler(
+        ConversationHandler(
+            entry_points=[router], states={}, fallbacks=[router]
+        )
+    )
+    return app, app.handlers[0][0], router
+
+
+@pytest.mark.parametrize(
+    "text, limit",
+    [("30s", (30.0, None)), ("10 с", (10.0, None)), ("100", (None, 100))],
+)
+def test_parse_limit(text, limit):
+    """
+    Тест разбора ограничения профилирования
+    """
+    assert parse_limit(text) == limit
+
+
+@pytest.mark.parametrize("text", ["0", "abc", "5m"])
+def test_parse_limit_invalid(text):
+    """
+    Тест отказа на неверное ограничение
+    """
+    with pytest.raises(ServiceError):
+        parse_limit(text)
+
+
+def test_cprofile_by_updates_restores_callbacks(tmp_path):
+    """
+    Тест подмены колбэков на время профилирования и записи pstats
+    """
+
+    app, cmd, router = make_app()
+    profiler = Profiler(app, out_dir=str(tmp_path))
+
+    async def run():
+        profiler.start("cprofile", updates=2)
+        with pytest.raises(ServiceError):
+            profiler.start("sample")
+        assert cmd.callback is not command
+        assert router.routes["Кнопка"] is not button
+        await cmd.callback(Mock(), Mock())
+        # обработчик, общий для entry_points и fallbacks, обернут один раз
+        assert await router.routes["Кнопка"](Mock(), Mock()) == -1
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert not profiler.active
+    assert cmd.callback is command and router.routes["Кнопка"] is button
+    assert len(profiler.last_files) == 2
+    names = set()
+    for path in profiler.last_files:
+        names |= {func[2] for func in pstats.Stats(path).stats}
+    assert "busy_work" in names
+
+
+def test_sample_tags_stacks_by_handler(tmp_path):
+    """
+    Тест сэмплирования: стеки помечены именем обработчика
+    """
+
+    app, cmd, _ = make_app()
+    profiler = Profiler(app, out_dir=str(tmp_path), interval=0.001)
+
+    async def run():
+        profiler.start("sample", seconds=0.2)
+        await cmd.callback(Mock(), Mock())
+        await asyncio.sleep(0.3)
+
+    asyncio.run(run())
+    assert not profiler.active and cmd.callback is command
+    (path,) = profiler.last_files
+    with open(path, encoding="utf-8") as f:
+        stacks = [line.rsplit(" ", 1)[0] for line in f]
+    assert any(
+        stack.startswith("command;") and stack.endswith(":busy_work")
+        for stack in stacks
+    )
+
+
+def background_work(seconds: float) -> None:
+    busy_work(seconds)
+
+
+async def waiting(update, context):
+    busy_work(0.02)
+    await asyncio.sleep(0.1)
+    busy_work(0.02)
+
+
+async def background() -> None:
+    # выполняется, пока обработчик ждет в asyncio.sleep
+    await asyncio.sleep(0.01)
+    background_work(0.05)
+
+
+@pytest.mark.parametrize("mode", ["cprofile", "sample"])
+def test_background_task_not_attributed_to_handler(tmp_path, mode):
+    """
+    Тест: задачи, выполняемые во время ожидания обработчика, не
+    приписываются ему
+    """
+
+    app = Application.builder().token("123456:TEST").build()
+    app.add_handler(CommandHandler("wait", waiting))
+    handler = app.handlers[0][0]
+    profiler = Profiler(app, out_dir=str(tmp_path), interval=0.001)
+
+    async def run():
+        profiler.start(mode, updates=1)
+        task = asyncio.create_task(background())
+        await handler.callback(Mock(), Mock())
+        await task
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert not profiler.active and handler.callback is waiting
+    if mode == "cprofile":
+        (path,) = profiler.last_files
+        names = {func[2] for func in pstats.Stats(path).stats}
+        assert "busy_work" in names and "waiting" in names
+        assert "background_work" not in names
+        return
+    (path,) = profiler.last_files
+    with open(path, encoding="utf-8") as f:
+        stacks = [line.rsplit(" ", 1)[0] for line in f]
+    assert any(
+        stack.startswith("waiting;") and stack.endswith(":busy_work")
+        for stack in stacks
+    )
+    background_stacks = [s for s in stacks if ":background_work" in s]
+    assert background_stacks
+    assert all(s.startswith("(idle);") for s in background_stacks)
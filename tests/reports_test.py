@@ -0,0 +1,218 @@
+import asyncio
+import json
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)  # Указание пути к корню проекта для импорта из директорий на уровень выше
+from db import Database
+from exceptions import ServiceError
+from reports import (
+    HabitReport,
+    count_missed,
+    habit_report,
+    period_bounds,
+    render_report,
+    run_reports,
+)
+from schedules import DAILY_SCHEDULE, INTERVAL, WEEKLY, Schedule
+
+TODAY = date(2025, 3, 12)
+
+
+def day(text: str) -> int:
+    return date.fromisoformat(text).toordinal()
+
+
+def test_period_bounds():
+    """
+    Тест границ прошлой недели и прошлого месяца
+    """
+    assert period_bounds("weekly", TODAY) == (
+        date(2025, 3, 3),
+        date(2025, 3, 9),
+    )
+    assert period_bounds("weekly", date(2025, 3, 10)) == (
+        date(2025, 3, 3),
+        date(2025, 3, 9),
+    )
+    assert period_bounds("monthly", TODAY) == (
+        date(2025, 2, 1),
+        date(2025, 2, 28),
+    )
+    assert period_bounds("monthly", date(2025, 1, 1)) == (
+        date(2024, 12, 1),
+        date(2024, 12, 31),
+    )
+    with pytest.raises(ServiceError):
+        period_bounds("yearly", TODAY)
+
+
+def test_habit_report_daily():
+    """
+    Тест итогов ежедневной привычки: пропуски и изменение серии
+    """
+    days = [
+        day(d)
+        for d in [
+            "2025-03-01",
+            "2025-03-02",
+            "2025-03-03",
+            "2025-03-04",
+            "2025-03-07",
+            "2025-03-08",
+            "2025-03-09",
+        ]
+    ]
+    report = habit_report(
+        "Зарядка",
+        DAILY_SCHEDULE,
+        day("2025-01-01"),
+        days,
+        day("2025-03-03"),
+        day("2025-03-09"),
+    )
+
+    assert report == HabitReport("Зарядка", 5, 2, 2, 3)
+
+
+def test_habit_report_created_inside_period():
+    """
+    Тест итогов привычки, созданной в середине периода
+    """
+    report = habit_report(
+        "Чтение",
+        DAILY_SCHEDULE,
+        day("2025-03-08"),
+        [day("2025-03-09")],
+        day("2025-03-03"),
+        day("2025-03-09"),
+    )
+
+    assert report == HabitReport("Чтение", 1, 1, 0, 1)
+
+
+def test_count_missed_weekly_and_interval():
+    """
+    Тест пропусков для расписаний "N раз в неделю" и "раз в K дней"
+    """
+    first, last = day("2025-03-01"), day("2025-03-16")
+    # в периоде две полные недели: 3-9 и 10-16 марта
+    done = {day("2025-03-01"), day("2025-03-04"), day("2025-03-11")}
+    assert count_missed(Schedule(WEEKLY, 2), done, first, last) == 2
+
+    done = {day("2025-03-03"), day("2025-03-04"), day("2025-03-09")}
+    # выполнения сдвигают отсчет, пропущены 2, 6 и 8 марта
+    assert (
+        count_missed(
+            Schedule(INTERVAL, 2),
+            done,
+            day("2025-03-02"),
+            day("2025-03-10"),
+            day("2025-02-28"),
+        )
+        == 3
+    )
+
+
+def test_render_report():
+    """
+    Тест текста отчета
+    """
+    text = render_report(
+        "weekly",
+        date(2025, 3, 3),
+        date(2025, 3, 9),
+        [
+            HabitReport("Зарядка", 5, 2, 2, 3),
+            HabitReport("Чтение", 0, 0, 4, 4),
+        ],
+    )
+
+    assert text.startswith("📊 Итоги недели 03.03.2025 – 09.03.2025")
+    assert "• Зарядка: ✅ 5, пропущено 2, серия 2 → 3 (+1)" in text
+    assert "• Чтение: ✅ 0, серия 4 → 4" in text
+    assert text.endswith("Всего выполнений: 5")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "habits.sql")
+    db = Database(path)
+    for uid in range(1, 11):
+        hid = db.add_habit(uid, f"habit {uid}")
+        with db.writer() as conn:
+            # привычка последнего пользователя создана после периода
+            created = "2025-03-11" if uid == 10 else "2025-01-01"
+            conn.execute(
+                "UPDATE habits SET created_at = ? WHERE id = ?",
+                (created, hid),
+            )
+            conn.executemany(
+                "INSERT INTO completions (habit_id, completion_date)"
+                " VALUES (?, ?)",
+                [
+                    (hid, date(2025, 3, d).toordinal())
+                    for d in range(3, 3 + uid % 7)
+                ],
+            )
+            conn.commit()
+    db.close()
+    return path
+
+
+def test_run_reports_resumes_from_checkpoint(db_path, tmp_path):
+    """
+    Тест рассылки: после сбоя отправки повторный запуск продолжает
+    с контрольной точки и каждый пользователь получает отчет один раз
+    """
+    checkpoint = str(tmp_path / "checkpoint.json")
+    delivered = []
+
+    async def failing(uid, text):
+        if uid == 3:
+            raise ServiceError("blocked")
+        if uid == 6 and uid not in delivered:
+            raise ConnectionError("network down")
+        delivered.append(uid)
+
+    run = dict(
+        kind="weekly",
+        today=TODAY,
+        chunk=2,
+        workers=2,
+        rate=0,
+        checkpoint=checkpoint,
+    )
+    with pytest.raises(ConnectionError):
+        asyncio.run(run_reports(db_path, failing, **run))
+    with open(checkpoint, encoding="utf-8") as f:
+        state = json.load(f)
+    assert state["last_user_id"] == 5
+    assert not state["done"]
+
+    texts = {}
+
+    async def send(uid, text):
+        texts[uid] = text
+        delivered.append(uid)
+
+    stats = asyncio.run(run_reports(db_path, send, **run))
+
+    assert delivered == [1, 2, 4, 5, 6, 7, 8, 9]
+    # выполнения 3-8 марта, пропуск 9 марта прерывает серию
+    assert "• habit 6: ✅ 6, пропущено 1, серия 0 → 0" in texts[6]
+    assert "• habit 7: ✅ 0, пропущено 7, серия 0 → 0" in texts[7]
+    assert (stats.users, stats.sent, stats.skipped, stats.failed) == (
+        10,
+        8,
+        1,
+        1,
+    )
+    # рассылка за период завершена, повторный запуск ничего не шлет
+    assert asyncio.run(run_reports(db_path, send, **run)).sent == 8
+    assert len(delivered) == 8
@@ -0,0 +1,98 @@
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)  # Указание пути к корню проекта для импорта из директорий на уровень выше
+from db import Database
+from retention import CompletionArchiver
+
+DAYS = [
+    date(2025, 1, 10),
+    date(2025, 3, 1),
+    date(2025, 6, 1),
+    date(2025, 6, 2),
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "habits.sql"))
+    yield db
+    db.close()
+
+
+def add_history(db: Database, uid: int, name: str) -> int:
+    hid = db.add_habit(uid, name)
+    with db.writer() as conn:
+        conn.executemany(
+            "INSERT INTO completions (habit_id, completion_date) VALUES (?, ?)",
+            [(hid, day.toordinal()) for day in DAYS],
+        )
+        conn.execute(
+            """
+            UPDATE habits
+            SET total_completions = ?, current_streak = 2, last_completed = ?
+            WHERE id = ?
+            """,
+            (len(DAYS), DAYS[-1].toordinal(), hid),
+        )
+        conn.commit()
+    return hid
+
+
+def count(db: Database, table: str) -> int:
+    with db.reader() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_archive_moves_old_completions(db):
+    """
+    Выполнения старше границы переносятся в архив порциями
+    """
+
+    add_history(db, 12345, "qwerty1")
+    add_history(db, 54321, "qwerty2")
+
+    archiver = CompletionArchiver(db, hot_days=30, batch=1)
+    assert archiver.horizon(date(2025, 6, 10)) == date(2025, 5, 11)
+    assert archiver.archive(date(2025, 6, 10)) == 4
+    assert count(db, "completions") == 4
+    assert count(db, "completions_archive") == 4
+    assert archiver.archive(date(2025, 6, 10)) == 0
+
+
+def test_history_merges_hot_and_archive(db):
+    """
+    История пользователя одинакова до и после архивации, агрегаты не меняются
+    """
+
+    hid = add_history(db, 12345, "qwerty1")
+    add_history(db, 54321, "qwerty2")
+    before = db.get_completion_history(12345)
+
+    CompletionArchiver(db, hot_days=30).archive(date(2025, 6, 10))
+
+    assert db.get_completion_history(12345) == before
+    assert before == [(hid, day) for day in DAYS]
+    assert db.get_completion_history(12345, hid, since=date(2025, 3, 1)) == [
+        (hid, day) for day in DAYS[1:]
+    ]
+    habit = db.get_user_habits(12345)[0]
+    assert (habit.total_completions, habit.current_streak) == (4, 2)
+
+
+def test_delete_habit_removes_archived_history(db):
+    """
+    Удаление привычки удаляет и оперативную, и архивную историю
+    """
+
+    hid = add_history(db, 12345, "qwerty1")
+    CompletionArchiver(db, hot_days=30).archive(date(2025, 6, 10))
+
+    db.delete_habit(12345, hid)
+    assert count(db, "completions") == 0
+    assert count(db, "completions_archive") == 0
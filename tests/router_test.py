@@ -0,0 +1,97 @@
+import asyncio
+import os
+import sys
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)  # Указание пути к корню проекта для импорта из директорий на уровень выше
+pytest.importorskip("telegram")
+from telegram import Chat, Message, Update, User
+
+import config
+from handlers import Handler
+from router import TextRouter
+
+
+def make_update(text=None, **kwargs) -> Update:
+    message = Message(
+        1,
+        datetime.now(),
+        Chat(1, "private"),
+        from_user=User(1, "User", False),
+        text=text,
+    )
+    return Update(1, message=message, **kwargs)
+
+
+async def first(update, context):
+    return "first"
+
+
+async def second(update, context):
+    return "second"
+
+
+async def by_pattern(update, context):
+    return context.matches[0].group(1)
+
+
+def test_router_exact_text_before_patterns():
+    """
+    Тест выбора колбэка: точный текст, затем регулярные выражения
+    """
+
+    router = TextRouter(
+        {"Кнопка": first, "ID: 7": second}, [(r"ID: (\d+)", by_pattern)]
+    )
+
+    assert router.check_update(make_update("Кнопка")) == (first, None)
+    assert router.check_update(make_update("ID: 7")) == (second, None)
+    callback, match = router.check_update(make_update("Привычка (ID: 42)"))
+    assert callback is by_pattern and match.group(1) == "42"
+    assert router.check_update(make_update("Кнопка ")) is None
+    assert router.check_update(make_update()) is None
+    assert router.check_update("text") is None
+
+
+def test_router_returns_callback_result():
+    """
+    Тест передачи результата колбэка (состояния диалога) и совпадения
+    """
+
+    router = TextRouter({"Кнопка": first}, [(r"ID: (\d+)", by_pattern)])
+    context = Mock()
+
+    for text, expected in (("Кнопка", "first"), ("(ID: 42)", "42")):
+        update = make_update(text)
+        check = router.check_update(update)
+        result = asyncio.run(
+            router.handle_update(update, None, check, context)
+        )
+        assert result == expected
+
+
+def test_handler_routes_keyboard_buttons():
+    """
+    Тест маршрутов основной клавиатуры бота
+    """
+
+    handler = Handler(Mock())
+    (router,) = handler.get_message_handlers()
+
+    assert router.check_update(make_update("📋 Мои привычки"))[0] == (
+        handler.habits_list
+    )
+    assert router.check_update(make_update(config.back_btn_text))[0] == (
+        handler.cancel_command
+    )
+    assert router.check_update(make_update("☑️ Бег (ID: 3)"))[0] == (
+        handler.complete_habit
+    )
+    # кнопки диалогов разбираются соответствующими ConversationHandler
+    assert router.check_update(make_update("➕ Добавить привычку")) is None
+    assert router.check_update(make_update("🗑️ Бег (ID: 3)")) is None
@@ -0,0 +1,111 @@
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)  # Указание пути к корню проекта для импорта из директорий на уровень выше
+from db import Database
+from schedules import (
+    DAILY_SCHEDULE,
+    INTERVAL,
+    WEEKDAYS,
+    WEEKLY,
+    Schedule,
+    parse_schedule,
+    weekday,
+)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "habits.sql"))
+    yield db
+    db.close()
+
+
+@pytest.mark.parametrize(
+    "text, schedule",
+    [
+        ("Каждый день", DAILY_SCHEDULE),
+        ("пн ср пт", Schedule(WEEKDAYS, 0b10101)),
+        ("сб, вс", Schedule(WEEKDAYS, 0b1100000)),
+        ("пн вт ср чт пт сб вс", DAILY_SCHEDULE),
+        ("3 раза в неделю", Schedule(WEEKLY, 3)),
+        ("1 раз в неделю", Schedule(WEEKLY, 1)),
+        ("Каждые 2 дня", Schedule(INTERVAL, 2)),
+        ("раз в 10 дней", Schedule(INTERVAL, 10)),
+    ],
+)
+def test_parse_schedule(text, schedule):
+    """
+    Тест разбора расписаний, введенных пользователем
+    """
+    assert parse_schedule(text) == schedule
+
+
+@pytest.mark.parametrize("text", ["иногда", "8 раз в неделю", "пн и ср"])
+def test_parse_schedule_invalid(text):
+    """
+    Тест отказа на нераспознанные расписания
+    """
+    with pytest.raises(ValueError):
+        parse_schedule(text)
+
+
+def test_weekdays_missed_matches_brute_force():
+    """
+    Тест проверки пропущенных дней по маске против перебора дней
+    """
+    rnd = random.Random(36)
+    for _ in range(2000):
+        schedule = Schedule(WEEKDAYS, rnd.randrange(1, 128))
+        last = rnd.randrange(1000, 1100)
+        day = last + rnd.randrange(1, 20)
+        expected = any(
+            schedule.value >> weekday(d) & 1 for d in range(last + 1, day)
+        )
+        assert schedule.missed(last, day) == expected
+
+
+def test_due_habits_matches_python(db):
+    """
+    Тест совпадения отбора привычек на день в SQL с Schedule.is_due
+    """
+    rnd = random.Random(36)
+    start = date(2025, 3, 3)
+    schedules = [
+        DAILY_SCHEDULE,
+        Schedule(WEEKDAYS, 0b0010101),
+        Schedule(WEEKDAYS, 0b1100000),
+        Schedule(WEEKLY, 2),
+        Schedule(INTERVAL, 3),
+    ]
+    hids = [
+        db.add_habit(1, f"habit {i}", schedules[i % len(schedules)])
+        for i in range(25)
+    ]
+    for offset in range(28):
+        day = start + timedelta(days=offset)
+        habits = {h.id: h for h in db.get_user_habits(1)}
+        with db.reader() as conn:
+            counts = dict(conn.execute("SELECT id, week_count FROM habits"))
+        expected = {
+            hid
+            for hid, habit in habits.items()
+            if habit.schedule.is_due(
+                (
+                    habit.last_completed.toordinal()
+                    if habit.last_completed
+                    else None
+                ),
+                counts[hid],
+                day.toordinal(),
+            )
+        }
+        assert {h.id for h in db.get_due_habits(1, day)} == expected
+        done = [hid for hid in hids if rnd.random() < 0.5]
+        db.complete_habits(1, done, day=day)
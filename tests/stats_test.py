@@ -0,0 +1,210 @@
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)  # Указание пути к корню проекта для импорта из директорий на уровень выше
+from db import Database
+from leaderboard import Leaderboard, LeaderboardEntry
+
+TODAY = date.today()
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "habits.sql"))
+    yield db
+    db.close()
+
+
+def test_stats_updated_with_habits(db):
+    """
+    Тест обновления сводной статистики при работе с привычками
+    """
+    run = db.add_habit(1, "run")
+    read = db.add_habit(1, "read")
+    db.add_habit(2, "swim")
+    db.complete_habits(1, [run, read])
+    db.complete_habit(run, 1, day=TODAY - timedelta(days=1))
+    db.delete_habit(1, read)
+
+    stats = db.get_stats()
+    assert stats.day == TODAY
+    assert (stats.active_users, stats.completions, stats.habits_created) == (
+        2,
+        2,
+        3,
+    )
+    # выполнение удаленной привычки read уходит из общего счетчика
+    assert (stats.total_habits, stats.total_completions) == (2, 2)
+    yesterday = db.get_stats(TODAY - timedelta(days=1))
+    assert (yesterday.active_users, yesterday.completions) == (1, 1)
+    assert db.get_stats(date(2000, 1, 1))[1:4] == (0, 0, 0)
+
+
+def test_stats_backfilled_on_migration(tmp_path):
+    """
+    Тест заполнения сводных таблиц по данным существующей базы
+    """
+    path = str(tmp_path / "habits.sql")
+    db = Database(path)
+    hid = db.add_habit(1, "run")
+    db.add_habit(2, "swim")
+    db.complete_habit(hid, 1)
+    expected = db.get_stats()
+    db.close()
+
+    conn = sqlite3.connect(path)
+    for table in ("stats_daily", "daily_active", "stats_totals"):
+        conn.execute(f"DROP TABLE {table}")
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    assert db.get_stats() == expected
+    db.close()
+
+
+def test_stats_day_independent_of_server_timezone(tmp_path, monkeypatch):
+    """
+    Тест: день статистики - день пояса пользователей, а не дата сервера
+    """
+    monkeypatch.setenv("TZ", "Pacific/Kiritimati")  # UTC+14
+    time.tzset()
+    try:
+        db = Database(str(tmp_path / "habits.sql"), utc_offset=-300)
+        # 15:00 1 июня в UTC-5, на сервере уже 2 июня
+        db.roll_days(datetime(2025, 6, 1, 20, tzinfo=timezone.utc))
+        hid = db.add_habit(1, "run")
+        db.add_habit(2, "swim")
+        db.complete_habit(hid, 1)
+
+        stats = db.get_stats()
+        assert stats.day == date(2025, 6, 1)
+        assert (stats.active_users, stats.completions) == (2, 1)
+        assert stats.habits_created == 2
+        db.close()
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_deleted_habit_completions_leave_totals(tmp_path):
+    """
+    Тест: выполнения удаленной привычки вычитаются из общего счетчика,
+    расхождение от прежней версии триггера исправляется при запуске
+    """
+    path = str(tmp_path / "habits.sql")
+    db = Database(path)
+    hid = db.add_habit(1, "run")
+    db.complete_habit(hid, 1, day=TODAY - timedelta(days=1))
+    db.complete_habit(hid, 1)
+    with db.writer() as conn:
+        conn.executescript("""
+            DROP TRIGGER stats_habit_delete;
+            CREATE TRIGGER stats_habit_delete
+            AFTER DELETE ON habits BEGIN
+                UPDATE stats_totals SET habits = habits - 1;
+            END;
+            """)
+    db.delete_habit(1, hid)
+    assert db.get_stats().total_completions == 2
+    db.close()
+
+    db = Database(path)
+    assert db.get_stats()[-2:] == (0, 0)
+    hid = db.add_habit(1, "run")
+    db.complete_habit(hid, 1)
+    db.delete_habit(1, hid)
+    assert db.get_stats()[-2:] == (0, 0)
+    db.close()
+
+
+def test_leaderboard_eviction_and_refill():
+    """
+    Тест вытеснения и исчерпания запаса таблицы лидеров
+    """
+    board = Leaderboard(size=2)
+    board.update(LeaderboardEntry(1, 1, 5))
+    assert not board.loaded and board.top() == []
+
+    board.load([LeaderboardEntry(i, 1, 10 - i) for i in range(1, 5)])
+    board.update(LeaderboardEntry(9, 1, 1))
+    board.update(LeaderboardEntry(8, 1, 20))
+    assert [e.habit_id for e in board.top()] == [8, 1]
+    board.remove(8)
+    board.remove(1)
+    assert board.loaded
+    board.remove(2)
+    assert not board.loaded
+
+
+def test_leaderboard_streak_decrease_reloads():
+    """
+    Тест: уменьшение серии отслеживаемой привычки перезагружает топ
+    """
+    board = Leaderboard(size=1)
+    board.load([LeaderboardEntry(1, 1, 5), LeaderboardEntry(2, 1, 4)])
+    board.update(LeaderboardEntry(2, 1, 6))
+    assert board.loaded and [e.habit_id for e in board.top()] == [2]
+    board.update(LeaderboardEntry(2, 1, 1))
+    assert not board.loaded
+
+    board.load([LeaderboardEntry(1, 1, 5)])
+    board.update(LeaderboardEntry(1, 1, 1))
+    assert board.loaded and board.top() == [LeaderboardEntry(1, 1, 1)]
+
+
+def test_top_streaks_matches_full_scan(db):
+    """
+    Тест совпадения таблицы лидеров в памяти с сортировкой всей таблицы
+    """
+    rnd = random.Random(35)
+    db.leaderboard = Leaderboard(size=3)
+    habits = {}
+    for i in range(30):
+        uid = rnd.randrange(5)
+        habits[db.add_habit(uid, f"habit {i}")] = uid
+    assert db.top_streaks() == []
+
+    for offset in range(60):
+        day = TODAY - timedelta(days=60 - offset)
+        for hid, uid in habits.items():
+            if rnd.random() < 0.8:
+                db.complete_habit(hid, uid, day=day)
+        if offset % 10 == 9:
+            hid = rnd.choice(list(habits))
+            db.delete_habit(habits.pop(hid), hid)
+
+        with db.writer() as conn:
+            expected = [tuple(row) for row in conn.execute("""
+                    SELECT id, user_id, current_streak, name FROM habits
+                    WHERE current_streak > 0
+                    ORDER BY current_streak DESC, id
+                    LIMIT 3
+                    """)]
+        assert [(*e, name) for e, name in db.top_streaks()] == expected
+
+
+def test_archive_prunes_daily_active(db):
+    """
+    Тест очистки отметок активности при переносе истории в архив
+    """
+    hid = db.add_habit(1, "run")
+    old = TODAY - timedelta(days=200)
+    db.complete_habit(hid, 1, day=old)
+    db.complete_habit(hid, 1)
+
+    db.archive_completions(TODAY - timedelta(days=90))
+
+    with db.writer() as conn:
+        days = [row[0] for row in conn.execute("SELECT day FROM daily_active")]
+    assert days == [TODAY.toordinal()]
+    assert db.get_stats(old).active_users == 1
+    assert db.get_stats().total_completions == 2
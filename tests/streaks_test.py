@@ -0,0 +1,177 @@
+import os
+import random
+import sqlite3
+import sys
+from datetime import date, datetime, time, timedelta, timezone
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)  # Указание пути к корню проекта для импорта из директорий на уровень выше
+from db import Database
+from schedules import DAILY_SCHEDULE, INTERVAL, WEEKDAYS, WEEKLY, Schedule
+from streaks import StreakState, advance, extend_run, replay
+
+START = date(2025, 1, 1)
+SCHEDULES = [
+    DAILY_SCHEDULE,
+    Schedule(WEEKDAYS, 0b0101011),
+    Schedule(WEEKLY, 3),
+    Schedule(INTERVAL, 2),
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "habits.sql"))
+    yield db
+    db.close()
+
+
+def test_advance():
+    """
+    Тест продолжения, повтора и разрыва серии
+    """
+    state = replay([10, 11, 12])
+    assert state == StreakState(3, 3, 12, 3)
+    assert advance(state, 12) == state
+    state = advance(state, 14)
+    assert state == StreakState(1, 3, 14, 4)
+    assert replay([15, 16, 17], state) == StreakState(4, 4, 17, 3)
+
+
+def test_advance_with_schedules():
+    """
+    Тест продолжения серии по расписанию
+    """
+    # 8 - понедельник; расписание пн, ср, пт
+    mwf = Schedule(WEEKDAYS, 0b10101)
+    assert replay([8, 10, 12, 15], schedule=mwf).current == 4
+    assert replay([8, 12], schedule=mwf).current == 1
+    assert replay([8, 9, 10], schedule=mwf).current == 3
+    # раз в 3 дня
+    every3 = Schedule(INTERVAL, 3)
+    assert replay([1, 4, 6, 9], schedule=every3).current == 4
+    assert replay([1, 5], schedule=every3).current == 1
+    # 2 раза в неделю: вторая неделя выполнена не полностью
+    twice = Schedule(WEEKLY, 2)
+    assert replay([8, 12, 16, 21, 22], schedule=twice).current == 5
+    assert replay([8, 12, 16, 22], schedule=twice).current == 1
+
+
+def test_extend_run_matches_advance():
+    """
+    Тест совпадения учета серии дней целиком с учетом по одному дню
+    """
+    runs = [(1, 3), (4, 4), (6, 10), (12, 13), (14, 15), (17, 30)]
+    for schedule in SCHEDULES:
+        state = StreakState()
+        for first, last in runs:
+            expected = replay(range(first, last + 1), state, schedule)
+            state = extend_run(state, first, last, schedule)
+            assert state == expected
+    assert extend_run(StreakState(), 1, 15) == StreakState(15, 15, 15, 1)
+
+
+def test_incremental_matches_recompute(db):
+    """
+    Тест совпадения инкрементального расчета серий с пересчетом по истории
+    """
+    rnd = random.Random(34)
+    hids = [
+        db.add_habit(1, f"habit {i}", SCHEDULES[i % len(SCHEDULES)])
+        for i in range(20)
+    ]
+    for offset in range(120):
+        day = START + timedelta(days=offset)
+        done = [hid for hid in hids if rnd.random() < 0.7]
+        if offset % 2:
+            db.complete_habits(1, done, day=day)
+        else:
+            for hid in done:
+                db.complete_habit(hid, 1, day=day)
+    db.archive_completions(START + timedelta(days=60))
+
+    # день пользователя - последний день истории, затем через 3 недели:
+    # пересчет не восстанавливает сброшенные при смене дня серии
+    db.set_user_offset(1, 0)
+    for offset in (119, 140):
+        now = datetime.combine(START + timedelta(days=offset), time(12))
+        db.roll_days(now.replace(tzinfo=timezone.utc))
+        db.rollover_streaks(0)
+
+        incremental = db.get_user_habits(1)
+        assert any(
+            habit.longest_streak > habit.current_streak
+            for habit in incremental
+        )
+        with db.writer() as conn:
+            conn.execute("""
+                UPDATE habits
+                SET current_streak = 0, longest_streak = 0,
+                    total_completions = 0, last_completed = NULL
+                """)
+            conn.commit()
+
+        assert db.recompute_streaks(chunk=7) == len(hids)
+        assert db.get_user_habits(1) == incremental
+    assert all(habit.current_streak == 0 for habit in incremental)
+
+
+def test_recompute_repairs_counters(db):
+    """
+    Тест восстановления счетчиков после записи истории в обход бота
+    """
+    hid = db.add_habit(1, "habit")
+    empty = db.add_habit(1, "empty")
+    with db.writer() as conn:
+        conn.executemany(
+            "INSERT INTO completions (habit_id, completion_date) VALUES (?, ?)",
+            [
+                (hid, date(2025, 3, day).toordinal())
+                for day in [1, 2, 3, 5]
+            ],
+        )
+        conn.commit()
+    # текущий день пользователя - день последнего выполнения
+    db.set_user_offset(1, 0)
+    db.roll_days(datetime(2025, 3, 5, 12, tzinfo=timezone.utc))
+
+    db.recompute_streaks()
+
+    habits = {habit.id: habit for habit in db.get_user_habits(1)}
+    habit = habits[hid]
+    assert (habit.current_streak, habit.longest_streak) == (1, 3)
+    assert (habit.total_completions, habit.last_completed) == (4, date(2025, 3, 5))
+    assert habits[empty].total_completions == 0
+    assert habits[empty].last_completed is None
+
+
+def test_longest_streak_migration(tmp_path):
+    """
+    Тест добавления столбца longest_streak в существующую базу
+    """
+    path = str(tmp_path / "old.sql")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE habits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_completed DATE,
+            current_streak INTEGER DEFAULT 0,
+            total_completions INTEGER DEFAULT 0,
+            UNIQUE(user_id, name)
+        )
+        """)
+    conn.execute(
+        "INSERT INTO habits (user_id, name, current_streak) VALUES (1, 'old', 4)"
+    )
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    assert db.get_user_habits(1)[0].longest_streak == 4
+    db.close()
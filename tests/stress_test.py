@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+BENCHMARKS = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "benchmarks")
+)
+sys.path.insert(0, BENCHMARKS)
+from stress_bench import check_invariants, run_stress
+
+
+@pytest.mark.parametrize("processes, threads", [(1, 8), (3, 4)])
+def test_concurrent_operations_keep_invariants(tmp_path, processes, threads):
+    """
+    Тест инвариантов базы при случайных операциях из потоков и процессов
+    """
+
+    path = str(tmp_path / "habits.sql")
+    result = run_stress(path, processes, threads, ops=150, users=3)
+
+    assert result["errors"] == []
+    assert check_invariants(path, result["completed"]) == []
+    assert result["ops"]["complete ok"] + result["ops"]["complete_batch ok"]
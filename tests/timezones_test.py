@@ -0,0 +1,168 @@
+import os
+import sys
+from datetime import date, datetime, timezone
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)  # Указание пути к корню проекта для импорта из директорий на уровень выше
+from db import Database
+from timezones import DayRollover, format_offset, next_rollover, parse_offset
+
+MOSCOW, LONDON = 12345, 54321
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "habits.sql"), utc_offset=0)
+    db.add_habit(MOSCOW, "Зарядка")
+    db.add_habit(LONDON, "Чтение")
+    db.set_user_offset(MOSCOW, 180)
+    db.roll_days(utc(2025, 6, 1, 12))
+    yield db
+    db.close()
+
+
+@pytest.mark.parametrize(
+    "text, offset",
+    [
+        ("+3", 180),
+        ("-4", -240),
+        ("UTC+05:30", 330),
+        ("gmt+5:45", 345),
+        ("+0530", 330),
+        ("UTC", 0),
+        ("+14", 840),
+    ],
+)
+def test_parse_offset(text, offset):
+    assert parse_offset(text) == offset
+
+
+@pytest.mark.parametrize(
+    "text", ["", "Москва", "+15", "-13", "+3:10", "+3:75"]
+)
+def test_parse_offset_invalid(text):
+    with pytest.raises(ValueError):
+        parse_offset(text)
+
+
+def test_format_offset_and_next_rollover():
+    assert format_offset(180) == "UTC+03:00"
+    assert format_offset(-210) == "UTC-03:30"
+    assert format_offset(0) == "UTC+00:00"
+    assert next_rollover(utc(2025, 6, 1, 20, 7, 30)) == utc(2025, 6, 1, 20, 15)
+    assert next_rollover(utc(2025, 6, 1, 23, 45)) == utc(2025, 6, 2)
+
+
+def test_day_boundary_per_user(db):
+    """
+    Новый день наступает в полночь часового пояса пользователя
+    """
+
+    assert db.get_user_offset(MOSCOW) == 180
+    assert db.get_user_offset(LONDON) == 0
+    (moscow,) = db.get_due_habits(MOSCOW)
+    (london,) = db.get_due_habits(LONDON)
+    db.complete_habit(moscow.id, MOSCOW)
+    db.complete_habit(london.id, LONDON)
+    assert db.get_due_habits(MOSCOW) == db.get_due_habits(LONDON) == []
+
+    # 21:00 UTC - полночь в Москве, в Лондоне еще 1 июня
+    assert db.roll_days(utc(2025, 6, 1, 21)) == [180]
+    assert db.roll_days(utc(2025, 6, 1, 21)) == []
+    assert db.get_user_today(MOSCOW) == date(2025, 6, 2)
+    assert db.get_user_today(LONDON) == date(2025, 6, 1)
+    assert [habit.id for habit in db.get_due_habits(MOSCOW)] == [moscow.id]
+    assert db.get_due_habits(LONDON) == []
+
+    result = db.complete_habit(moscow.id, MOSCOW)
+    assert result["last_completed"] == date(2025, 6, 2)
+    assert result["current_streak"] == 2
+    assert db.complete_habits(LONDON, [london.id]) == []
+
+
+def test_rollover_resets_streaks_in_bucket(db):
+    """
+    Прерванные серии сбрасываются только в поясах, где наступила полночь
+    """
+
+    with db.writer() as conn:
+        conn.execute(
+            """
+            UPDATE habits
+            SET current_streak = 3, longest_streak = 3, last_completed = ?
+            """,
+            (date(2025, 5, 31).toordinal(),),
+        )
+        conn.commit()
+
+    db.leaderboard.invalidate()
+    assert len(db.top_streaks()) == 2
+
+    rollover = DayRollover(db)
+    assert rollover.roll(utc(2025, 6, 1, 21)) == {180: 1}
+    assert db.get_user_habits(MOSCOW)[0].current_streak == 0
+    assert db.get_user_habits(LONDON)[0].current_streak == 3
+
+    assert [entry.user_id for entry, _ in db.top_streaks()] == [LONDON]
+
+    assert rollover.roll(utc(2025, 6, 2)) == {0: 1}
+    assert db.get_user_habits(LONDON)[0].current_streak == 0
+    assert db.get_user_habits(LONDON)[0].longest_streak == 3
+    assert db.top_streaks() == []
+
+
+def test_rollover_after_restart(db):
+    """
+    Полночь, пройденная во время простоя, сбрасывает серии при запуске
+    """
+
+    with db.writer() as conn:
+        conn.execute(
+            """
+            UPDATE habits
+            SET current_streak = 4, longest_streak = 4, last_completed = ?
+            """,
+            (date(2025, 5, 31).toordinal(),),
+        )
+        conn.commit()
+    db.close()
+
+    db = Database(db.db, utc_offset=0)
+    # миграции при запуске не сдвигают дни поясов
+    assert db.get_user_today(LONDON) == date(2025, 6, 1)
+    assert DayRollover(db).roll(utc(2025, 6, 3, 12)) == {0: 1, 180: 1}
+    assert [
+        habit.current_streak
+        for uid in (MOSCOW, LONDON)
+        for habit in db.get_user_habits(uid)
+    ] == [0, 0]
+    db.close()
+
+
+def test_user_without_timezone_uses_default(db):
+    """
+    Привычки, добавленные в обход бота, используют пояс по умолчанию
+    """
+
+    with db.writer() as conn:
+        hids = [
+            conn.execute(
+                "INSERT INTO habits (user_id, name) VALUES (777, ?)", (name,)
+            ).lastrowid
+            for name in ("Бег", "Сон")
+        ]
+        conn.commit()
+
+    assert db.get_user_today(777) == date(2025, 6, 1)
+    assert [habit.id for habit in db.get_due_habits(777)] == hids
+    result = db.complete_habit(hids[0], 777)
+    assert result["last_completed"] == date(2025, 6, 1)
+    (habit,) = db.complete_habits(777, hids)
+    assert habit.last_completed == date(2025, 6, 1)
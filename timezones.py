@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import config
+from db import Database
+from exceptions import DBError
+
+logger = logging.getLogger(__name__)
+
+# Смещения от UTC в минутах, кратные 15 (есть пояса +05:45 и +12:45)
+MIN_OFFSET = -12 * 60
+MAX_OFFSET = 14 * 60
+OFFSET_STEP = 15
+
+_OFFSET_RE = re.compile(r"(?:utc|gmt)?\s*([+-])\s*(\d{1,2})(?:[:.]?(\d{2}))?")
+
+
+def parse_offset(text: str) -> int:
+    """
+    Разбор часового пояса, введенного пользователем
+
+    Поддерживаются "+3", "-4", "+05:30", "UTC+5:45", "GMT-3" и "UTC"
+
+    :param text: Текст часового пояса
+    :type text: str
+    :returns: Смещение от UTC в минутах
+    :type: int
+    :raises ValueError: Если часовой пояс не распознан
+    """
+
+    text = text.strip().casefold()
+    if text in ("utc", "gmt", "0", "+0", "-0"):
+        return 0
+    match = _OFFSET_RE.fullmatch(text)
+    if not match:
+        raise ValueError(f"Unknown UTC offset: {text}")
+    sign, hours, minutes = match.groups()
+    offset = int(hours) * 60 + int(minutes or 0)
+    if sign == "-":
+        offset = -offset
+    if (
+        int(minutes or 0) >= 60
+        or offset % OFFSET_STEP
+        or not MIN_OFFSET <= offset <= MAX_OFFSET
+    ):
+        raise ValueError(f"Invalid UTC offset: {text}")
+    return offset
+
+
+def format_offset(offset: int) -> str:
+    """
+    Часовой пояс для вывода пользователю
+
+    :param offset: Смещение от UTC в минутах
+    :type offset: int
+    :returns: Строка вида UTC+03:00
+    :type: str
+    """
+
+    sign = "-" if offset < 0 else "+"
+    hours, minutes = divmod(abs(offset), 60)
+    return f"UTC{sign}{hours:02d}:{minutes:02d}"
+
+
+def next_rollover(now: datetime) -> datetime:
+    """
+    Ближайший момент, когда в каком-либо поясе может начаться новый день
+
+    Полночь любого пояса приходится на границу 15 минут по UTC
+
+    :param now: Текущий момент с часовым поясом
+    :type now: datetime
+    :returns: Следующая граница 15 минут по UTC
+    :type: datetime
+    """
+
+    now = now.astimezone(timezone.utc)
+    step = timedelta(minutes=OFFSET_STEP)
+    start = now.replace(minute=0, second=0, microsecond=0)
+    return start + step * ((now - start) // step + 1)
+
+
+class DayRollover:
+    """
+    Смена дня по часовым поясам пользователей
+
+    На каждой границе 15 минут по UTC текущие дни поясов пересчитываются
+    одним запросом (Database.roll_days). Для поясов, где наступила
+    полночь, сбрасываются прерванные серии их пользователей, остальные
+    пользователи не затрагиваются
+
+    :ivar db: База данных бота
+    :type db: Database
+    :ivar chunk: Размер порции пользователей при сбросе серий
+    :type chunk: int
+    """
+
+    def __init__(self, db: Database, chunk: int = config.rollover_chunk):
+        self.db = db
+        self.chunk = chunk
+
+    def roll(self, now: Optional[datetime] = None) -> Dict[int, int]:
+        """
+        Смена дня в поясах, где наступила полночь
+
+        :param now: Текущий момент с часовым поясом (по умолчанию сейчас)
+        :type now: datetime или None
+        :returns: Количество сброшенных серий по смещениям поясов
+        :type: Dict[int, int]
+        :raises DBError: Если произошла ошибка при обновлении
+        """
+
+        start = time.perf_counter()
+        reset = {
+            offset: self.db.rollover_streaks(offset, self.chunk)
+            for offset in self.db.roll_days(now)
+        }
+        if reset:
+            logger.info(
+                "Day rollover in %s: %d streaks reset in %.1f s",
+                ", ".join(map(format_offset, reset)),
+                sum(reset.values()),
+                time.perf_counter() - start,
+            )
+        return reset
+
+    async def run(self) -> None:
+        """
+        Смена дня на каждой границе 15 минут в фоновом потоке
+
+        Первая смена выполняется сразу при запуске: полночь, пройденная
+        поясами, пока бот был остановлен, сбрасывает их прерванные серии
+        """
+
+        while True:
+            try:
+                await asyncio.to_thread(self.roll)
+            except DBError as e:
+                logger.error("Periodic day rollover failed: %s", e)
+            except Exception:
+                logger.exception("Periodic day rollover error")
+            now = datetime.now(timezone.utc)
+            await asyncio.sleep((next_rollover(now) - now).total_seconds())